@@ -2,19 +2,25 @@
 
 from .service import (
     DomainUsage,
+    SingleFlight,
+    UsageSnapshot,
     UsageSnapshotCache,
     UsageSummary,
     UsageTrend,
     build_dashboard_payload,
     build_usage_summary,
+    merge_usage_summaries,
 )
 
 __all__ = [
     "DomainUsage",
+    "SingleFlight",
+    "UsageSnapshot",
     "UsageSnapshotCache",
     "UsageSummary",
     "UsageTrend",
     "build_dashboard_payload",
     "build_usage_summary",
+    "merge_usage_summaries",
 ]
 
@@ -0,0 +1,228 @@
+"""Backends compartidos para los snapshots del dashboard.
+
+``UsageSnapshotCache`` mantiene siempre su LRU en memoria; si además tiene un backend,
+escribe cada snapshot en él y lo consulta cuando la copia local falta o está caducada.
+Así varios workers de uvicorn (o un reinicio) reutilizan la última consulta a Crawlbase.
+El backend recibe el cuerpo ya serializado y la hora de pared en que se guardó, y hace
+cumplir el TTL por su cuenta: Redis con la expiración de la clave y SQLite con una
+columna ``expires_at``.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from time import monotonic
+from typing import Any, Callable, Optional, Tuple
+
+import redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# hora de pared (epoch) en que se guardó el snapshot, antepuesta al cuerpo en Redis
+_STORED_AT = struct.Struct("<d")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_expires_at ON snapshots (expires_at);
+"""
+
+
+class SnapshotBackendError(Exception):
+    """Backend de caché del dashboard mal configurado."""
+
+
+class SnapshotBackend(ABC):
+    """Almacén clave → (cuerpo serializado, hora de guardado) con expiración propia.
+
+    Las subclases implementan ``_get``/``_set``/``_delete``/``_clear``/``_purge`` y declaran en
+    ``errors`` las excepciones de su driver. Si una operación falla, se registra y el backend
+    se omite durante ``backoff`` segundos: la caché sigue solo en memoria en vez de esperar
+    un timeout en cada petición.
+    """
+
+    name = "base"
+    errors: Tuple[type, ...] = ()
+
+    def __init__(self, backoff: float = 30.0) -> None:
+        self.backoff = backoff
+        self._suspended_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return monotonic() >= self._suspended_until
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Cuerpo y hora de pared del snapshot, o ``None`` si no existe, ya expiró o el backend falla."""
+        return self._call("leer", self._get, key)
+
+    def set(self, key: str, body: bytes, stored_at: float, ttl: float) -> None:
+        self._call("guardar", self._set, key, body, stored_at, ttl)
+
+    def delete(self, key: str) -> None:
+        self._call("borrar", self._delete, key)
+
+    def clear(self) -> None:
+        self._call("vaciar", self._clear)
+
+    def purge(self) -> int:
+        """Borra las entradas expiradas; los backends que expiran solos no hacen nada."""
+        return self._call("purgar", self._purge) or 0
+
+    def close(self) -> None:
+        return None
+
+    def _call(self, action: str, operation: Callable[..., Any], *args: Any) -> Any:
+        if not self.available:
+            return None
+        try:
+            return operation(*args)
+        except self.errors as exc:
+            self._suspended_until = monotonic() + self.backoff
+            logger.warning(
+                "No se pudo %s en la caché %s del dashboard (%s); se omite durante %.0fs",
+                action,
+                self.name,
+                exc,
+                self.backoff,
+            )
+            return None
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        ...
+
+    @abstractmethod
+    def _set(self, key: str, body: bytes, stored_at: float, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def _clear(self) -> None:
+        ...
+
+    def _purge(self) -> int:
+        return 0
+
+
+class SQLiteSnapshotBackend(SnapshotBackend):
+    """Snapshots en un fichero SQLite local, compartido por los workers de la misma máquina."""
+
+    name = "sqlite"
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path: Path, clock: Callable[[], float] = time.time, backoff: float = 30.0) -> None:
+        super().__init__(backoff=backoff)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, stored_at, expires_at FROM snapshots WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            body, stored_at, expires_at = row
+            if expires_at <= self._clock():
+                self._conn.execute("DELETE FROM snapshots WHERE key = ? AND expires_at = ?", (key, expires_at))
+                return None
+        return bytes(body), stored_at
+
+    def _set(self, key: str, body: bytes, stored_at: float, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (key, body, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, body, stored_at, stored_at + ttl),
+            )
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM snapshots WHERE key = ?", (key,))
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM snapshots")
+
+    def _purge(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM snapshots WHERE expires_at <= ?", (self._clock(),)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisSnapshotBackend(SnapshotBackend):
+    """Snapshots en Redis con ``PX``; los errores de conexión degradan a solo memoria local."""
+
+    name = "redis"
+    errors = (RedisError,)
+
+    def __init__(
+        self,
+        url: str,
+        prefix: str = "crawlbase:dashboard:",
+        client: Any = None,
+        backoff: float = 30.0,
+    ) -> None:
+        super().__init__(backoff=backoff)
+        if client is None:
+            client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self._client = client
+        self.prefix = prefix
+
+    def _get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        record = self._client.get(self.prefix + key)
+        if not record:
+            return None
+        (stored_at,) = _STORED_AT.unpack_from(record)
+        return bytes(record[_STORED_AT.size:]), stored_at
+
+    def _set(self, key: str, body: bytes, stored_at: float, ttl: float) -> None:
+        self._client.set(self.prefix + key, _STORED_AT.pack(stored_at) + body, px=max(1, int(ttl * 1000)))
+
+    def _delete(self, key: str) -> None:
+        self._client.delete(self.prefix + key)
+
+    def _clear(self) -> None:
+        keys = list(self._client.scan_iter(match=self.prefix + "*", count=500))
+        if keys:
+            self._client.delete(*keys)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def build_snapshot_backend() -> Optional[SnapshotBackend]:
+    backend = settings.dashboard_cache_backend.lower()
+    backoff = settings.dashboard_cache_backend_backoff
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        return SQLiteSnapshotBackend(Path(settings.dashboard_cache_path), backoff=backoff)
+    if backend == "redis":
+        return RedisSnapshotBackend(settings.dashboard_cache_redis_url, backoff=backoff)
+    raise SnapshotBackendError(f"Backend de caché del dashboard no soportado: {settings.dashboard_cache_backend}")
@@ -0,0 +1,183 @@
+"""Histórico de uso por perfil, producto y dominio con resolución horaria y diaria.
+
+Cada consulta a ``/account`` se resume en ``UsageSummary`` y se vuelca con ``record_usage``
+en los intervalos de hora y de día que la contienen: una fila por intervalo que guarda el
+último valor observado. Así el histórico ya está agregado al escribirse y ``query_history``
+solo lee las filas del rango, sin recalcular nada a partir de los payloads crudos. Cada
+resolución tiene su retención (``USAGE_HISTORY_*_RETENTION_DAYS``) y ``prune_history`` borra
+lo que la excede.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.analytics.models import UsageSample
+from app.analytics.service import UsageSummary
+from app.core.config import settings
+
+ACCOUNT_TOTALS = ""
+RESOLUTIONS = ("hour", "day")
+
+
+def _utc(moment: datetime) -> datetime:
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+def _bucket(moment: datetime, resolution: str) -> datetime:
+    moment = _utc(moment)
+    if resolution == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Resolución no soportada: {resolution}")
+
+
+def _retention(resolution: str) -> timedelta:
+    if resolution == "hour":
+        return timedelta(days=settings.usage_history_hourly_retention_days)
+    return timedelta(days=settings.usage_history_daily_retention_days)
+
+
+def record_usage(
+    session: Session,
+    profile_id: int,
+    product: str,
+    summary: UsageSummary,
+    now: Optional[datetime] = None,
+) -> None:
+    """Actualiza los intervalos de hora y día que contienen ``now`` con los valores de ``summary``."""
+    now = _utc(now or datetime.now(timezone.utc))
+    values: Dict[str, Dict[str, Any]] = {
+        ACCOUNT_TOTALS: {
+            "success": summary.total_success,
+            "failed": summary.total_failed,
+            "total_requests": summary.total_requests,
+            "total_due": summary.total_due,
+            "remaining_credits": summary.remaining_credits,
+        }
+    }
+    # ``summary.domains`` ya viene ordenado por volumen: solo se guardan los más activos
+    for domain in summary.domains[: settings.usage_history_max_domains]:
+        values[domain.domain] = {
+            "success": domain.success,
+            "failed": domain.failed,
+            "total_requests": domain.total_requests,
+        }
+
+    for resolution in RESOLUTIONS:
+        bucket = _bucket(now, resolution)
+        existing = {
+            row.domain: row
+            for row in session.exec(
+                select(UsageSample).where(
+                    UsageSample.profile_id == profile_id,
+                    UsageSample.product == product,
+                    UsageSample.resolution == resolution,
+                    UsageSample.bucket == bucket,
+                )
+            )
+        }
+        for domain, fields in values.items():
+            row = existing.get(domain)
+            if row is None:
+                row = UsageSample(
+                    profile_id=profile_id,
+                    product=product,
+                    resolution=resolution,
+                    bucket=bucket,
+                    domain=domain,
+                )
+            for name, value in fields.items():
+                setattr(row, name, value)
+            row.samples += 1
+            row.updated_at = now
+            session.add(row)
+    prune_history(session, now=now, profile_id=profile_id)
+    session.commit()
+
+
+def prune_history(session: Session, now: Optional[datetime] = None, profile_id: Optional[int] = None) -> int:
+    """Borra las filas más antiguas que la retención de su resolución; devuelve cuántas."""
+    now = _utc(now or datetime.now(timezone.utc))
+    removed = 0
+    for resolution in RESOLUTIONS:
+        statement = delete(UsageSample).where(
+            UsageSample.resolution == resolution,
+            UsageSample.bucket < _bucket(now - _retention(resolution), resolution),
+        )
+        if profile_id is not None:
+            statement = statement.where(UsageSample.profile_id == profile_id)
+        removed += session.execute(statement).rowcount
+    return removed
+
+
+def _point(row: UsageSample, previous: Optional[UsageSample]) -> Dict[str, Any]:
+    success_delta = row.success - previous.success if previous else 0
+    failed_delta = row.failed - previous.failed if previous else 0
+    total = row.success + row.failed
+    if success_delta < 0 or failed_delta < 0:
+        # Los contadores se reinician con el mes: el intervalo arranca desde cero
+        success_delta, failed_delta = row.success, row.failed
+    return {
+        "bucket": row.bucket.isoformat(),
+        "success": row.success,
+        "failed": row.failed,
+        "total_requests": row.total_requests,
+        "success_rate": round(row.success / total * 100, 2) if total else 0.0,
+        "success_delta": success_delta,
+        "failed_delta": failed_delta,
+        "samples": row.samples,
+    }
+
+
+def query_history(
+    session: Session,
+    profile_id: int,
+    product: str,
+    resolution: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_domains: bool = True,
+) -> Dict[str, Any]:
+    """Serie de totales (y por dominio) entre ``start`` y ``end`` a la resolución pedida."""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Resolución no soportada: {resolution}")
+    end = _utc(end or datetime.now(timezone.utc))
+    start = _utc(start) if start else end - _retention(resolution)
+
+    statement = select(UsageSample).where(
+        UsageSample.profile_id == profile_id,
+        UsageSample.product == product,
+        UsageSample.resolution == resolution,
+        UsageSample.bucket >= _bucket(start, resolution),
+        UsageSample.bucket <= end,
+    )
+    if not include_domains:
+        statement = statement.where(UsageSample.domain == ACCOUNT_TOTALS)
+
+    grouped: Dict[str, List[UsageSample]] = {}
+    for row in session.exec(statement.order_by(UsageSample.bucket)):
+        grouped.setdefault(row.domain, []).append(row)
+
+    def series(rows: List[UsageSample]) -> List[Dict[str, Any]]:
+        return [_point(row, rows[index - 1] if index else None) for index, row in enumerate(rows)]
+
+    totals = grouped.pop(ACCOUNT_TOTALS, [])
+    points = series(totals)
+    for point, row in zip(points, totals, strict=True):
+        point["total_due"] = row.total_due
+        point["remaining_credits"] = row.remaining_credits
+    return {
+        "profile_id": profile_id,
+        "product": product,
+        "resolution": resolution,
+        "start": _bucket(start, resolution).isoformat(),
+        "end": end.isoformat(),
+        "totals": points,
+        "domains": {domain: series(rows) for domain, rows in grouped.items()},
+    }
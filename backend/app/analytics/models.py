@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+
+class UsageSample(SQLModel, table=True):
+    """Último snapshot de uso observado en un intervalo (hora o día) por perfil, producto y dominio.
+
+    Las fechas se guardan en UTC y ``domain`` vacío guarda los totales de la cuenta. Los
+    contadores de Crawlbase son acumulados del mes, así que cada fila conserva el último
+    valor visto en su intervalo.
+    """
+
+    __tablename__ = "usage_sample"
+    __table_args__ = (
+        UniqueConstraint("profile_id", "product", "resolution", "bucket", "domain", name="uq_usage_sample_bucket"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    profile_id: int = Field(index=True)
+    product: str = Field(max_length=40)
+    resolution: str = Field(max_length=8)
+    bucket: datetime = Field(index=True)
+    domain: str = Field(default="", max_length=255)
+    success: int = 0
+    failed: int = 0
+    total_requests: int = 0
+    total_due: float = 0.0
+    remaining_credits: Optional[int] = None
+    samples: int = 0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), nullable=False)
@@ -1,15 +1,32 @@
-from typing import Any, Dict
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Dict, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel import Session
 
-from app.analytics.service import UsageSnapshotCache, build_dashboard_payload, build_usage_summary
+from app.analytics.backends import build_snapshot_backend
+from app.analytics.history import query_history, record_usage
+from app.analytics.service import (
+    SingleFlight,
+    UsageSnapshotCache,
+    UsageSummary,
+    build_dashboard_payload,
+    build_usage_summary,
+    merge_usage_summaries,
+)
 from app.core.config import settings
-from app.core.database import get_session
-from app.crawlbase.client import CrawlbaseClient, CrawlbaseClientError
+from app.core.database import get_session, session_scope
+from app.crawlbase.client import AsyncCrawlbaseClient, CrawlbaseClientError
+from app.crawlbase.ratelimit import rate_limiters
 from app.profiles.schemas import ProfileReadSchema
 from app.profiles.service import ProfileService
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
@@ -17,28 +34,21 @@ def get_profile_service(session: Session = Depends(get_session)) -> ProfileServi
     return ProfileService(session=session)
 
 
-usage_cache = UsageSnapshotCache(ttl=settings.dashboard_cache_ttl)
-
-
-@router.get("/usage")
-def get_usage_snapshot(
-    profile_id: int = Query(..., description="ID del perfil a consultar"),
-    include_previous: bool = Query(False, description="Incluir estadísticas del mes anterior"),
-    product: str = Query("crawling-api", description="Producto Crawlbase a consultar"),
-    force_refresh: bool = Query(False, description="Ignorar el caché y forzar consulta al API"),
-    service: ProfileService = Depends(get_profile_service),
-):
-    profile: ProfileReadSchema = service.get(profile_id=profile_id, include_tokens=True)
+usage_cache = UsageSnapshotCache(
+    ttl=settings.dashboard_cache_ttl,
+    stale_ttl=settings.dashboard_cache_stale_ttl,
+    max_entries=settings.dashboard_cache_max_entries,
+    max_bytes=settings.dashboard_cache_max_bytes,
+    sweep_interval=settings.dashboard_cache_sweep_interval,
+    backend=build_snapshot_backend(),
+)
+usage_fetches = SingleFlight()
 
-    cache_key = (profile.id, product, include_previous)
-    if not force_refresh:
-        cached = usage_cache.get(cache_key)
-        if cached:
-            return {**cached, "cached": True}
 
+async def _fetch_usage(profile: ProfileReadSchema, product: str, include_previous: bool) -> Dict[str, Any]:
     try:
-        with CrawlbaseClient(profile=profile) as client:
-            response = client.get_account_snapshot(product=product, include_previous=include_previous)
+        async with AsyncCrawlbaseClient(profile=profile) as client:
+            response = await client.get_account_snapshot(product=product, include_previous=include_previous)
     except CrawlbaseClientError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
@@ -73,6 +83,189 @@ def get_usage_snapshot(
         "cached": False,
     }
 
-    usage_cache.set(cache_key, result)
+    # Histórico y caché hacen E/S bloqueante (SQLite, Redis): fuera del event loop
+    await run_in_threadpool(_store_usage, profile.id, product, include_previous, summary, result)
     return result
 
+
+def _store_usage(
+    profile_id: int,
+    product: str,
+    include_previous: bool,
+    summary: UsageSummary,
+    result: Dict[str, Any],
+) -> None:
+    if settings.usage_history_enabled:
+        try:
+            with session_scope() as session:
+                record_usage(session, profile_id, product, summary)
+        except SQLAlchemyError as exc:
+            # El histórico es accesorio: no debe impedir mostrar el snapshot actual
+            logger.warning("No se pudo guardar el histórico de uso del perfil %s: %s", profile_id, exc)
+    # Se guarda ya marcado como cacheado: los aciertos envían los bytes sin decodificarlos
+    usage_cache.set((profile_id, product, include_previous), {**result, "cached": True})
+
+
+@router.get("/usage")
+async def get_usage_snapshot(
+    profile_id: int = Query(..., description="ID del perfil a consultar"),
+    include_previous: bool = Query(False, description="Incluir estadísticas del mes anterior"),
+    product: str = Query("crawling-api", description="Producto Crawlbase a consultar"),
+    force_refresh: bool = Query(False, description="Ignorar el caché y forzar consulta al API"),
+    service: ProfileService = Depends(get_profile_service),
+):
+    profile: ProfileReadSchema = await run_in_threadpool(service.get, profile_id=profile_id, include_tokens=True)
+
+    cache_key = (profile.id, product, include_previous)
+
+    def fetch() -> Awaitable[Dict[str, Any]]:
+        return _fetch_usage(profile, product, include_previous)
+
+    if not force_refresh:
+        cached = await run_in_threadpool(usage_cache.get_snapshot, cache_key, allow_stale=True)
+        if cached is not None:
+            if usage_cache.is_fresh(cached):
+                return Response(content=cached.body, media_type="application/json", headers={"X-Cache": "hit"})
+            # Stale-while-revalidate: se responde con el snapshot anterior y se refresca aparte
+            usage_fetches.refresh(cache_key, fetch)
+            return Response(content=cached.body, media_type="application/json", headers={"X-Cache": "stale"})
+
+    # Las peticiones concurrentes para la misma clave esperan una única consulta a Crawlbase
+    return await usage_fetches.run(cache_key, fetch)
+
+
+async def _cached_usage(
+    profile: ProfileReadSchema,
+    product: str,
+    include_previous: bool,
+    force_refresh: bool,
+) -> Dict[str, Any]:
+    """Igual que ``/usage`` (caché, stale-while-revalidate y single-flight) pero decodificado."""
+    cache_key = (profile.id, product, include_previous)
+
+    def fetch() -> Awaitable[Dict[str, Any]]:
+        return _fetch_usage(profile, product, include_previous)
+
+    if not force_refresh:
+        cached = await run_in_threadpool(usage_cache.get_snapshot, cache_key, allow_stale=True)
+        if cached is not None:
+            if not usage_cache.is_fresh(cached):
+                usage_fetches.refresh(cache_key, fetch)
+            return cached.to_dict()
+    return await usage_fetches.run(cache_key, fetch)
+
+
+@router.get("/usage/aggregate")
+async def get_aggregated_usage(
+    profile_ids: Optional[List[int]] = Query(None, description="Perfiles a incluir; por defecto, todos los activos"),
+    products: List[str] = Query(["crawling-api"], description="Productos Crawlbase a consultar"),
+    include_previous: bool = Query(False, description="Incluir estadísticas del mes anterior"),
+    force_refresh: bool = Query(False, description="Ignorar el caché y forzar consulta al API"),
+    service: ProfileService = Depends(get_profile_service),
+) -> Dict[str, Any]:
+    """Consumo de varios perfiles consultado en paralelo y sumado por producto.
+
+    Las consultas a ``/account`` se lanzan a la vez con un máximo de
+    ``DASHBOARD_AGGREGATE_CONCURRENCY`` en vuelo. Un perfil que falla aparece con su error
+    en ``profiles`` y queda fuera de los agregados, sin hacer fallar la llamada completa.
+    """
+    products = list(dict.fromkeys(products))
+    profiles = await run_in_threadpool(service.list, include_tokens=True)
+    entries: List[Dict[str, Any]] = []
+    if profile_ids:
+        known = {profile.id: profile for profile in profiles}
+        profiles = [known[profile_id] for profile_id in dict.fromkeys(profile_ids) if profile_id in known]
+        entries.extend(
+            {
+                "profile_id": profile_id,
+                "name": None,
+                "product": product,
+                "ok": False,
+                "status_code": status.HTTP_404_NOT_FOUND,
+                "error": "Perfil no encontrado",
+            }
+            for profile_id in dict.fromkeys(profile_ids)
+            if profile_id not in known
+            for product in products
+        )
+    else:
+        profiles = [profile for profile in profiles if profile.is_active]
+
+    semaphore = asyncio.Semaphore(max(1, settings.dashboard_aggregate_concurrency))
+
+    async def fetch_one(profile: ProfileReadSchema, product: str) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {"profile_id": profile.id, "name": profile.name, "product": product}
+        try:
+            async with semaphore:
+                result = await _cached_usage(profile, product, include_previous, force_refresh)
+        except HTTPException as exc:
+            return {**entry, "ok": False, "status_code": exc.status_code, "error": exc.detail}
+        except Exception as exc:
+            logger.exception("Error inesperado al consultar el uso del perfil %s", profile.id)
+            return {**entry, "ok": False, "status_code": status.HTTP_502_BAD_GATEWAY, "error": str(exc)}
+        return {
+            **entry,
+            "ok": True,
+            "status_code": result.get("status_code"),
+            "cached": result.get("cached", False),
+            "summary": result["summary"],
+        }
+
+    entries.extend(await asyncio.gather(*(fetch_one(profile, product) for profile in profiles for product in products)))
+
+    aggregates: Dict[str, Any] = {}
+    for product in products:
+        summaries = [
+            UsageSummary.model_validate(entry["summary"])
+            for entry in entries
+            if entry["product"] == product and entry["ok"]
+        ]
+        merged = merge_usage_summaries(summaries, product=product)
+        aggregates[product] = {
+            "profiles_ok": len(summaries),
+            "profiles_failed": sum(1 for entry in entries if entry["product"] == product and not entry["ok"]),
+            "summary": merged.model_dump(),
+            "dashboard": build_dashboard_payload(merged),
+        }
+
+    return {
+        "profiles": entries,
+        "aggregates": aggregates,
+        "errors": sum(1 for entry in entries if not entry["ok"]),
+    }
+
+
+@router.get("/usage/history")
+def get_usage_history(
+    profile_id: int = Query(..., description="ID del perfil a consultar"),
+    product: str = Query("crawling-api", description="Producto Crawlbase a consultar"),
+    resolution: Literal["hour", "day"] = Query("day", description="Granularidad de la serie"),
+    start: Optional[datetime] = Query(None, description="Inicio del rango (UTC); por defecto, toda la retención"),
+    end: Optional[datetime] = Query(None, description="Fin del rango (UTC); por defecto, ahora"),
+    include_domains: bool = Query(True, description="Incluir la serie de cada dominio"),
+    session: Session = Depends(get_session),
+) -> Dict[str, Any]:
+    """Series ya agregadas por hora o día, guardadas en cada consulta a ``/usage``."""
+    return query_history(
+        session,
+        profile_id=profile_id,
+        product=product,
+        resolution=resolution,
+        start=start,
+        end=end,
+        include_domains=include_domains,
+    )
+
+
+@router.get("/rate-limits")
+def get_rate_limits(
+    profile_id: Optional[int] = Query(None, description="Filtrar por perfil"),
+) -> List[Dict[str, Any]]:
+    """Estado de los limitadores por perfil/tipo de token: tasa actual, esperas (bucket y cola de concurrencia) y 429/503."""
+    return rate_limiters.snapshot(profile_id=profile_id)
+
+
+@router.get("/cache")
+def get_cache_stats() -> Dict[str, Any]:
+    """Entradas, bytes y contadores de aciertos, fallos y desalojos del caché de uso."""
+    return usage_cache.stats()
@@ -1,11 +1,22 @@
 from __future__ import annotations
 
-import copy
-from time import monotonic
-from typing import Any, Dict, Iterable, Optional
-
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic, time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, TypeVar
+
+import orjson
 from pydantic import BaseModel, Field
 
+from app.analytics.backends import SnapshotBackend
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
 
 class DomainUsage(BaseModel):
     domain: str
@@ -129,6 +140,49 @@ def build_usage_summary(
     return summary
 
 
+def merge_usage_summaries(summaries: Iterable[UsageSummary], product: str) -> UsageSummary:
+    """Suma los snapshots de varios perfiles; los dominios repetidos se combinan en una fila."""
+    summaries = list(summaries)
+    domains: Dict[str, DomainUsage] = {}
+    for summary in summaries:
+        for entry in summary.domains:
+            merged = domains.get(entry.domain)
+            if merged is None:
+                domains[entry.domain] = entry.model_copy()
+                continue
+            merged.success += entry.success
+            merged.failed += entry.failed
+            merged.total_requests += entry.total_requests
+    for entry in domains.values():
+        entry.success_rate = _compute_success_rate(entry.success, entry.failed)
+
+    remaining = [summary.remaining_credits for summary in summaries if summary.remaining_credits is not None]
+    total_success = sum(summary.total_success for summary in summaries)
+    total_failed = sum(summary.total_failed for summary in summaries)
+    merged_summary = UsageSummary(
+        product=product,
+        total_success=total_success,
+        total_failed=total_failed,
+        total_due=round(sum(summary.total_due for summary in summaries), 2),
+        remaining_credits=sum(remaining) if remaining else None,
+        success_rate=_compute_success_rate(total_success, total_failed),
+        domains=sorted(domains.values(), key=lambda item: item.total_requests, reverse=True),
+    )
+
+    # La tendencia conjunta solo tiene sentido si todos los perfiles traen el mes anterior
+    if summaries and all(summary.trend is not None for summary in summaries):
+        success_delta = sum(summary.trend.total_success_delta for summary in summaries)
+        failed_delta = sum(summary.trend.total_failed_delta for summary in summaries)
+        previous_rate = _compute_success_rate(total_success - success_delta, total_failed - failed_delta)
+        merged_summary.trend = UsageTrend(
+            total_success_delta=success_delta,
+            total_failed_delta=failed_delta,
+            total_due_delta=round(sum(summary.trend.total_due_delta for summary in summaries), 2),
+            success_rate_delta=round(merged_summary.success_rate - previous_rate, 2),
+        )
+    return merged_summary
+
+
 def build_dashboard_payload(summary: UsageSummary) -> Dict[str, Any]:
     return {
         "product": summary.product,
@@ -160,26 +214,233 @@ def build_dashboard_payload(summary: UsageSummary) -> Dict[str, Any]:
     }
 
 
-class UsageSnapshotCache:
-    """Cache en memoria para snapshots de uso del dashboard."""
+@dataclass(frozen=True)
+class UsageSnapshot:
+    """Respuesta del dashboard serializada una sola vez; se comparte entre lecturas sin copiarse."""
 
-    def __init__(self, ttl: int = 180):
+    body: bytes
+    stored_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return orjson.loads(self.body)
+
+
+def serialize_snapshot(value: Dict[str, Any]) -> bytes:
+    """JSON compacto en UTF-8, el mismo formato que ``JSONResponse``, para enviarlo tal cual."""
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+class UsageSnapshotCache:
+    """Cache LRU en memoria para snapshots de uso del dashboard.
+
+    Los valores se serializan al guardarse y se comparten como ``UsageSnapshot`` inmutables,
+    así que una lectura no copia nada. El tamaño está acotado por número de entradas y por
+    bytes serializados; las entradas caducadas se descartan al leerlas o con ``sweep``, que
+    ``start_sweeper`` ejecuta periódicamente en un hilo de fondo. Durante ``stale_ttl``
+    segundos después de caducar, una entrada aún puede leerse con ``allow_stale=True`` para
+    servirla mientras se refresca.
+
+    Con un ``backend`` (ver ``app.analytics.backends``) cada snapshot se escribe también ahí
+    y se consulta cuando la copia local falta o caducó, de modo que los workers comparten
+    las consultas a Crawlbase y sobreviven a los reinicios.
+    """
+
+    def __init__(
+        self,
+        ttl: int = 180,
+        stale_ttl: float = 0.0,
+        max_entries: int = 512,
+        max_bytes: int = 64 * 1024 * 1024,
+        sweep_interval: float = 60.0,
+        backend: Optional[SnapshotBackend] = None,
+    ):
         self.ttl = ttl
-        self._store: dict[tuple[Any, ...], tuple[float, Dict[str, Any]]] = {}
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.backend = backend
+        self._store: OrderedDict[tuple[Any, ...], UsageSnapshot] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "backend_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def get_snapshot(self, key: tuple[Any, ...], allow_stale: bool = False) -> Optional[UsageSnapshot]:
+        with self._lock:
+            snapshot = self._store.get(key)
+            if snapshot is not None and monotonic() - snapshot.stored_at > self.ttl + self.stale_ttl:
+                self._discard(key)
+                self._counters["expirations"] += 1
+                snapshot = None
+
+        if self.backend is not None and (snapshot is None or not self.is_fresh(snapshot)):
+            shared = self._load(key)
+            if shared is not None and (snapshot is None or shared.stored_at > snapshot.stored_at):
+                snapshot = shared
+                with self._lock:
+                    self._counters["backend_hits"] += 1
+                    self._insert(key, shared)
+
+        with self._lock:
+            if snapshot is None:
+                self._counters["misses"] += 1
+                return None
+            fresh = self.is_fresh(snapshot)
+            if not fresh and not allow_stale:
+                self._counters["misses"] += 1
+                return None
+            if key in self._store:
+                self._store.move_to_end(key)
+            self._counters["hits" if fresh else "stale_hits"] += 1
+            return snapshot
+
+    def is_fresh(self, snapshot: UsageSnapshot) -> bool:
+        return monotonic() - snapshot.stored_at <= self.ttl
 
     def get(self, key: tuple[Any, ...]) -> Optional[Dict[str, Any]]:
-        item = self._store.get(key)
-        if not item:
-            return None
-        timestamp, value = item
-        if monotonic() - timestamp > self.ttl:
-            self._store.pop(key, None)
-            return None
-        return copy.deepcopy(value)
-
-    def set(self, key: tuple[Any, ...], value: Dict[str, Any]) -> None:
-        self._store[key] = (monotonic(), copy.deepcopy(value))
+        """Copia decodificada e independiente del snapshot; para enviarlo, use ``get_snapshot``."""
+        snapshot = self.get_snapshot(key)
+        return snapshot.to_dict() if snapshot is not None else None
+
+    def set(self, key: tuple[Any, ...], value: Dict[str, Any]) -> UsageSnapshot:
+        snapshot = UsageSnapshot(body=serialize_snapshot(value), stored_at=monotonic())
+        with self._lock:
+            self._insert(key, snapshot)
+        if self.backend is not None:
+            self.backend.set(_backend_key(key), snapshot.body, time(), self.ttl + self.stale_ttl)
+        return snapshot
+
+    def sweep(self) -> int:
+        """Elimina las entradas caducadas y devuelve cuántas se quitaron."""
+        now = monotonic()
+        with self._lock:
+            limit = self.ttl + self.stale_ttl
+            expired = [key for key, snapshot in self._store.items() if now - snapshot.stored_at > limit]
+            for key in expired:
+                self._discard(key)
+            self._counters["expirations"] += len(expired)
+        if self.backend is not None:
+            self.backend.purge()
+        return len(expired)
+
+    def start_sweeper(self) -> None:
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="usage-cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+    def close(self) -> None:
+        self.stop_sweeper()
+        if self.backend is not None:
+            self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.backend.name if self.backend is not None else "memory",
+                "backend_available": self.backend.available if self.backend is not None else True,
+                "entries": len(self._store),
+                "bytes": self._bytes,
+                **self._counters,
+            }
 
     def clear(self) -> None:
-        self._store.clear()
-
+        with self._lock:
+            self._store.clear()
+            self._bytes = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def _load(self, key: tuple[Any, ...]) -> Optional[UsageSnapshot]:
+        record = self.backend.get(_backend_key(key)) if self.backend is not None else None
+        if record is None:
+            return None
+        body, stored_at = record
+        # La hora de pared del backend se traduce al reloj monótono local conservando la edad
+        age = max(0.0, time() - stored_at)
+        return UsageSnapshot(body=body, stored_at=monotonic() - age)
+
+    def _insert(self, key: tuple[Any, ...], snapshot: UsageSnapshot) -> None:
+        self._discard(key)
+        if snapshot.size > self.max_bytes:
+            # Nunca cabría: no vale la pena vaciar el caché por él
+            self._counters["evictions"] += 1
+            return
+        self._store[key] = snapshot
+        self._bytes += snapshot.size
+        while len(self._store) > self.max_entries or self._bytes > self.max_bytes:
+            self._discard(next(iter(self._store)))
+            self._counters["evictions"] += 1
+
+    def _discard(self, key: tuple[Any, ...]) -> None:
+        snapshot = self._store.pop(key, None)
+        if snapshot is not None:
+            self._bytes -= snapshot.size
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
+
+
+def _backend_key(key: tuple[Any, ...]) -> str:
+    return orjson.dumps(list(key), default=str).decode("utf-8")
+
+
+class SingleFlight:
+    """Agrupa las llamadas concurrentes con la misma clave en una única corrutina en vuelo.
+
+    Quien llega mientras hay una consulta en curso espera su resultado (o su excepción) en
+    lugar de lanzar otra. La tarea compartida está protegida con ``asyncio.shield``: si un
+    cliente se desconecta, la consulta sigue para los demás.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        return await asyncio.shield(self._task(key, factory))
+
+    def refresh(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> None:
+        """Lanza ``factory`` en segundo plano salvo que ya haya una consulta en vuelo."""
+        if key not in self._inflight:
+            self._task(key, factory).add_done_callback(_log_refresh_error)
+
+    def _task(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return task
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+
+def _log_refresh_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Falló el refresco en segundo plano del dashboard: %s", task.exception())
@@ -1,6 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -37,7 +37,63 @@ class Settings(BaseSettings):
     )
     encryption_key: Optional[str] = Field(default=None, alias="ENCRYPTION_KEY")
     dashboard_cache_ttl: int = Field(default=180, alias="DASHBOARD_CACHE_TTL")
+    dashboard_cache_stale_ttl: float = Field(default=600.0, alias="DASHBOARD_CACHE_STALE_TTL")
+    dashboard_cache_max_entries: int = Field(default=512, alias="DASHBOARD_CACHE_MAX_ENTRIES")
+    dashboard_cache_max_bytes: int = Field(default=64 * 1024 * 1024, alias="DASHBOARD_CACHE_MAX_BYTES")
+    dashboard_cache_sweep_interval: float = Field(default=60.0, alias="DASHBOARD_CACHE_SWEEP_INTERVAL")
+    dashboard_cache_backend: str = Field(default="memory", alias="DASHBOARD_CACHE_BACKEND")
+    dashboard_cache_path: str = Field(default=str(DATA_DIR / "dashboard_cache.sqlite"), alias="DASHBOARD_CACHE_PATH")
+    dashboard_cache_redis_url: str = Field(default="redis://localhost:6379/2", alias="DASHBOARD_CACHE_REDIS_URL")
+    dashboard_cache_backend_backoff: float = Field(default=30.0, alias="DASHBOARD_CACHE_BACKEND_BACKOFF")
+    dashboard_aggregate_concurrency: int = Field(default=8, alias="DASHBOARD_AGGREGATE_CONCURRENCY")
+    usage_history_enabled: bool = Field(default=True, alias="USAGE_HISTORY_ENABLED")
+    usage_history_hourly_retention_days: int = Field(default=14, alias="USAGE_HISTORY_HOURLY_RETENTION_DAYS")
+    usage_history_daily_retention_days: int = Field(default=400, alias="USAGE_HISTORY_DAILY_RETENTION_DAYS")
+    usage_history_max_domains: int = Field(default=50, alias="USAGE_HISTORY_MAX_DOMAINS")
     default_profile_seed_path: str = Field(default=str(DEFAULT_SEED_PATH))
+    crawlbase_timeout: float = Field(default=30.0, alias="CRAWLBASE_TIMEOUT")
+    crawlbase_http2: bool = Field(default=True, alias="CRAWLBASE_HTTP2")
+    crawlbase_pool_max_connections: int = Field(default=100, alias="CRAWLBASE_POOL_MAX_CONNECTIONS")
+    crawlbase_pool_max_keepalive: int = Field(default=20, alias="CRAWLBASE_POOL_MAX_KEEPALIVE")
+    crawlbase_pool_keepalive_expiry: float = Field(default=30.0, alias="CRAWLBASE_POOL_KEEPALIVE_EXPIRY")
+    crawlbase_rate_limit_rps: Dict[str, float] = Field(
+        default_factory=lambda: {"normal": 20.0, "javascript": 20.0, "proxy": 20.0, "storage": 20.0},
+        alias="CRAWLBASE_RATE_LIMIT_RPS",
+    )
+    crawlbase_rate_limit_burst: Dict[str, int] = Field(
+        default_factory=lambda: {"normal": 20, "javascript": 20, "proxy": 20, "storage": 20},
+        alias="CRAWLBASE_RATE_LIMIT_BURST",
+    )
+    crawlbase_max_in_flight: int = Field(default=64, alias="CRAWLBASE_MAX_IN_FLIGHT")
+    crawlbase_retry_max_attempts: int = Field(default=3, alias="CRAWLBASE_RETRY_MAX_ATTEMPTS")
+    crawlbase_retry_base_delay: float = Field(default=0.5, alias="CRAWLBASE_RETRY_BASE_DELAY")
+    crawlbase_retry_max_delay: float = Field(default=10.0, alias="CRAWLBASE_RETRY_MAX_DELAY")
+    crawlbase_retry_status_codes: List[int] = Field(
+        default_factory=lambda: [429, 500, 502, 503, 504, 520],
+        alias="CRAWLBASE_RETRY_STATUS_CODES",
+    )
+    crawlbase_retry_attempt_timeout: Optional[float] = Field(default=None, alias="CRAWLBASE_RETRY_ATTEMPT_TIMEOUT")
+    crawlbase_retry_total_timeout: Optional[float] = Field(default=None, alias="CRAWLBASE_RETRY_TOTAL_TIMEOUT")
+    crawlbase_cache_enabled: bool = Field(default=False, alias="CRAWLBASE_CACHE_ENABLED")
+    crawlbase_cache_dir: str = Field(default=str(DATA_DIR / "response_cache"), alias="CRAWLBASE_CACHE_DIR")
+    crawlbase_cache_ttl: float = Field(default=86400.0, alias="CRAWLBASE_CACHE_TTL")
+    crawlbase_cache_max_bytes: int = Field(default=512 * 1024 * 1024, alias="CRAWLBASE_CACHE_MAX_BYTES")
+    scraper_max_concurrency: int = Field(default=8, alias="SCRAPER_MAX_CONCURRENCY")
+    scraper_max_concurrency_limit: int = Field(default=64, alias="SCRAPER_MAX_CONCURRENCY_LIMIT")
+    scraper_deduplicate_urls: bool = Field(default=True, alias="SCRAPER_DEDUPLICATE_URLS")
+    scraper_summary_max_errors: int = Field(default=100, alias="SCRAPER_SUMMARY_MAX_ERRORS")
+    scraper_journal_enabled: bool = Field(default=True, alias="SCRAPER_JOURNAL_ENABLED")
+    scraper_journal_max_runs: int = Field(default=200, alias="SCRAPER_JOURNAL_MAX_RUNS")
+    scraper_journal_retention_days: int = Field(default=30, alias="SCRAPER_JOURNAL_RETENTION_DAYS")
+    scraper_archive_enabled: bool = Field(default=False, alias="SCRAPER_ARCHIVE_ENABLED")
+    scraper_archive_dir: str = Field(default=str(BASE_DIR / "output" / "archive"), alias="SCRAPER_ARCHIVE_DIR")
+    scraper_archive_segment_bytes: int = Field(default=256 * 1024 * 1024, alias="SCRAPER_ARCHIVE_SEGMENT_BYTES")
+    link_factory_inline_export_limit: int = Field(default=10_000, alias="LINK_FACTORY_INLINE_EXPORT_LIMIT")
+    task_backend: str = Field(default="local", alias="TASK_BACKEND")
+    task_workers: int = Field(default=2, alias="TASK_WORKERS")
+    task_history_limit: int = Field(default=500, alias="TASK_HISTORY_LIMIT")
+    celery_broker_url: str = Field(default="redis://localhost:6379/0", alias="CELERY_BROKER_URL")
+    celery_result_backend: str = Field(default="redis://localhost:6379/1", alias="CELERY_RESULT_BACKEND")
 
 
 @lru_cache
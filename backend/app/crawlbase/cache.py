@@ -0,0 +1,204 @@
+"""Caché en disco de respuestas del Crawling API.
+
+Los cuerpos se guardan comprimidos y direccionados por contenido (``blobs/<ab>/<sha256>``),
+así que dos URLs que devuelven el mismo documento comparten fichero. Un índice SQLite
+relaciona cada clave de petición con su blob, guarda cuándo se almacenó y cuándo se leyó
+por última vez, y permite desalojar por LRU cuando el tamaño total supera el límite.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from app.core.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+"""
+
+# Cabeceras que vale la pena conservar; el resto (fechas, cookies, etc.) no aporta al resultado
+_KEPT_HEADERS = ("content-type", "original_status", "pc_status", "url")
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    data: Any
+    headers: Dict[str, str]
+    stored_at: float
+
+
+class ResponseCache:
+    """Caché thread-safe con TTL por lectura y tope de tamaño en bytes comprimidos."""
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int,
+        default_ttl: float,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        # Total de bytes en disco, mantenido al insertar y borrar blobs para no sumarlo en cada put
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    @staticmethod
+    def key_for(params: Mapping[str, Any], token_type: str) -> str:
+        """Clave estable a partir de los parámetros de la petición (sin el token en sí)."""
+        relevant = {name: str(value) for name, value in params.items() if name != "token" and value is not None}
+        raw = json.dumps({"token_type": token_type, "params": relevant}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[CachedResponse]:
+        max_age = self.default_ttl if max_age is None else max_age
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, status_code, headers, stored_at FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            digest, status_code, headers, stored_at = row
+            if now - stored_at >= max_age:
+                return None
+            try:
+                payload = zlib.decompress(self._blob_path(digest).read_bytes())
+            except (OSError, zlib.error):
+                # Blob perdido o corrupto: la entrada ya no sirve
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._drop_blob_if_unused(digest)
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return CachedResponse(status_code=status_code, data=json.loads(payload), headers=json.loads(headers), stored_at=stored_at)
+
+    def put(self, key: str, status_code: int, data: Any, headers: Mapping[str, str]) -> None:
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(payload).hexdigest()
+        kept = {name: value for name, value in headers.items() if name.lower() in _KEPT_HEADERS}
+        path = self._blob_path(digest)
+        with self._lock:
+            known = self._conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+
+        # Comprimir y escribir es lo caro: se hace sin el lock, en un temporal propio del hilo
+        tmp: Optional[Path] = None
+        size = 0
+        if not known:
+            compressed = zlib.compress(payload, 6)
+            size = len(compressed)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(compressed)
+
+        now = self._clock()
+        with self._lock:
+            stored = self._conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if stored and tmp is not None:
+                # Otro hilo guardó el mismo contenido mientras comprimíamos
+                tmp.unlink(missing_ok=True)
+            elif not stored:
+                if tmp is None:
+                    # Caso raro: el blob se desalojó entre las dos secciones críticas
+                    compressed = zlib.compress(payload, 6)
+                    size = len(compressed)
+                    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+                    tmp.write_bytes(compressed)
+                os.replace(tmp, path)
+                self._conn.execute("INSERT INTO blobs (digest, size) VALUES (?, ?)", (digest, size))
+                self._total_bytes += size
+            previous = self._conn.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, digest, status_code, headers, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, digest, status_code, json.dumps(kept), now, now),
+            )
+            if previous and previous[0] != digest:
+                self._drop_blob_if_unused(previous[0])
+            self._evict()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            blobs = self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+            size = self._total_bytes
+        return {"entries": entries, "blobs": blobs, "bytes": size, "max_bytes": self.max_bytes}
+
+    def clear(self) -> None:
+        with self._lock:
+            for (digest,) in self._conn.execute("SELECT digest FROM blobs").fetchall():
+                self._blob_path(digest).unlink(missing_ok=True)
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM blobs")
+            self._total_bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / digest
+
+    def _drop_blob_if_unused(self, digest: str) -> int:
+        if self._conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return 0
+        row = self._conn.execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        self._blob_path(digest).unlink(missing_ok=True)
+        freed = row[0] if row else 0
+        self._total_bytes -= freed
+        return freed
+
+    def _evict(self) -> None:
+        """Desaloja las entradas menos usadas hasta quedar por debajo de ``max_bytes``."""
+        while self._total_bytes > self.max_bytes:
+            oldest = self._conn.execute(
+                "SELECT key, digest FROM entries ORDER BY accessed_at LIMIT 32"
+            ).fetchall()
+            if not oldest:
+                break
+            for key, digest in oldest:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._drop_blob_if_unused(digest)
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+
+@lru_cache
+def get_response_cache() -> ResponseCache:
+    return ResponseCache(
+        Path(settings.crawlbase_cache_dir),
+        max_bytes=settings.crawlbase_cache_max_bytes,
+        default_ttl=settings.crawlbase_cache_ttl,
+    )
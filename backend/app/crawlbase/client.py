@@ -1,10 +1,20 @@
+"""Clientes y adaptadores para las APIs de Crawlbase."""
+
 from __future__ import annotations
 
+import asyncio
+import time
 from dataclasses import dataclass
+from time import monotonic
 from typing import Any, Dict, Optional
 
 import httpx
 
+from app.core.config import settings
+from app.crawlbase.cache import ResponseCache
+from app.crawlbase.pool import client_pool
+from app.crawlbase.ratelimit import RateLimiter, parse_retry_after, rate_limiters
+from app.crawlbase.retry import RetryPolicy
 from app.profiles.schemas import ProfileReadSchema
 
 BASE_URL = "https://api.crawlbase.com"
@@ -14,20 +24,49 @@ class CrawlbaseClientError(Exception):
     """Error base para interacciones con Crawlbase."""
 
 
+class CrawlbaseTransportError(CrawlbaseClientError):
+    """Error de red que persistió tras agotar los reintentos."""
+
+    def __init__(self, message: str, attempts: int, elapsed: float) -> None:
+        super().__init__(message)
+        self.attempts = attempts
+        self.elapsed = elapsed
+
+
 @dataclass
 class CrawlbaseResponse:
     status_code: int
     data: Any
     headers: Dict[str, str]
+    attempts: int = 1
+    elapsed: float = 0.0
+    cached: bool = False
+
 
+def _account_params(product: str, include_previous: bool) -> Dict[str, Any]:
+    params = {"product": product}
+    if include_previous:
+        params["previous_month"] = "true"
+    return params
 
-class CrawlbaseClient:
-    def __init__(self, profile: ProfileReadSchema, timeout: float = 30.0) -> None:
+
+class _BaseCrawlbaseClient:
+    def __init__(
+        self,
+        profile: ProfileReadSchema,
+        timeout: Optional[float] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache: Optional[ResponseCache] = None,
+        cache_max_age: Optional[float] = None,
+    ) -> None:
         if not profile.tokens:
             raise CrawlbaseClientError("El perfil seleccionado no tiene tokens asociados.")
         self.profile = profile
-        self.timeout = timeout
-        self._client = httpx.Client(timeout=timeout)
+        # ``CRAWLBASE_TIMEOUT`` salvo que el llamador pida otro explícitamente
+        self.timeout = settings.crawlbase_timeout if timeout is None else timeout
+        self.retry_policy = retry_policy or RetryPolicy.from_settings()
+        self.cache = cache
+        self.cache_max_age = cache_max_age
 
     def _build_params(self, params: Optional[Dict[str, Any]] = None, token_override: Optional[str] = None) -> Dict[str, Any]:
         params = params.copy() if params else {}
@@ -35,24 +74,132 @@ class CrawlbaseClient:
         params.setdefault("token", token)
         return params
 
-    def get(self, path: str, params: Optional[Dict[str, Any]] = None, token: Optional[str] = None) -> CrawlbaseResponse:
+    def _token_type(self, params: Dict[str, Any]) -> str:
+        tokens = self.profile.tokens
+        token = params.get("token")
+        token_type = "normal"
+        for candidate, value in (
+            ("normal", tokens.normal),
+            ("javascript", tokens.javascript),
+            ("proxy", tokens.proxy),
+            ("storage", tokens.storage),
+        ):
+            if value and value == token:
+                token_type = candidate
+                break
+        return token_type
+
+    def _limiter(self, params: Dict[str, Any]) -> RateLimiter:
+        """Limitador del perfil según el tipo de token que lleva la petición."""
+        return rate_limiters.for_profile(self.profile, self._token_type(params))
+
+    def _cache_key(self, path: str, params: Dict[str, Any]) -> Optional[str]:
+        """Solo se cachean las peticiones GET al endpoint de crawling (``/``)."""
+        if self.cache is None or path != "/":
+            return None
+        return self.cache.key_for(params, self._token_type(params))
+
+    def _cached_response(self, key: Optional[str]) -> Optional[CrawlbaseResponse]:
+        if key is None:
+            return None
+        hit = self.cache.get(key, max_age=self.cache_max_age)
+        if hit is None:
+            return None
+        return CrawlbaseResponse(status_code=hit.status_code, data=hit.data, headers=hit.headers, attempts=0, cached=True)
+
+    def _store_response(self, key: Optional[str], response: CrawlbaseResponse) -> CrawlbaseResponse:
+        if key is not None and response.status_code == 200:
+            self.cache.put(key, response.status_code, response.data, response.headers)
+        return response
+
+    @staticmethod
+    def _to_response(response: httpx.Response, attempts: int = 1, elapsed: float = 0.0) -> CrawlbaseResponse:
+        return CrawlbaseResponse(
+            status_code=response.status_code,
+            data=response.json(),
+            headers=dict(response.headers),
+            attempts=attempts,
+            elapsed=elapsed,
+        )
+
+    def _retry_delay(self, attempt: int, started: float, response: Optional[httpx.Response]) -> Optional[float]:
+        """Espera antes de reintentar o ``None`` si la respuesta/excepción es definitiva."""
+        retry_after = None
+        if response is not None:
+            if not self.retry_policy.is_retryable_status(response.status_code):
+                return None
+            retry_after = parse_retry_after(response.headers)
+        return self.retry_policy.next_delay(attempt, monotonic() - started, retry_after=retry_after)
+
+    def _transport_error(self, exc: Exception, attempt: int, started: float) -> CrawlbaseTransportError:
+        return CrawlbaseTransportError(
+            f"Error de red tras {attempt} intento(s): {exc}",
+            attempts=attempt,
+            elapsed=monotonic() - started,
+        )
+
+
+class CrawlbaseClient(_BaseCrawlbaseClient):
+    """Cliente síncrono.
+
+    Si el pool compartido está activo (startup de la app) reutiliza la conexión keep-alive
+    del perfil; en caso contrario abre un ``httpx.Client`` propio que se cierra en ``close``.
+    """
+
+    def __init__(
+        self,
+        profile: ProfileReadSchema,
+        timeout: Optional[float] = None,
+        http_client: Optional[httpx.Client] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache: Optional[ResponseCache] = None,
+        cache_max_age: Optional[float] = None,
+    ) -> None:
+        super().__init__(profile, timeout=timeout, retry_policy=retry_policy, cache=cache, cache_max_age=cache_max_age)
+        if http_client is None and client_pool.started:
+            http_client = client_pool.get_client(profile.id)
+        self._owns_client = http_client is None
+        self._client = http_client or httpx.Client(timeout=self.timeout)
+
+    def _request(self, method: str, path: str, payload: Dict[str, Any], payload_key: str) -> CrawlbaseResponse:
         url = f"{BASE_URL}{path}"
-        response = self._client.get(url, params=self._build_params(params, token_override=token))
-        return CrawlbaseResponse(status_code=response.status_code, data=response.json(), headers=dict(response.headers))
+        limiter = self._limiter(payload)
+        started = monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self.retry_policy.attempt_timeout_for(self.timeout, monotonic() - started)
+            try:
+                with limiter.slot():
+                    response = self._client.request(method, url, timeout=timeout, **{payload_key: payload})
+            except httpx.TransportError as exc:
+                delay = self._retry_delay(attempt, started, None)
+                if delay is None:
+                    raise self._transport_error(exc, attempt, started) from exc
+            else:
+                limiter.observe(response.status_code, response.headers)
+                delay = self._retry_delay(attempt, started, response)
+                if delay is None:
+                    return self._to_response(response, attempts=attempt, elapsed=monotonic() - started)
+            time.sleep(delay)
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, token: Optional[str] = None) -> CrawlbaseResponse:
+        payload = self._build_params(params, token_override=token)
+        key = self._cache_key(path, payload)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        return self._store_response(key, self._request("GET", path, payload, "params"))
 
     def post(self, path: str, data: Optional[Dict[str, Any]] = None, token: Optional[str] = None) -> CrawlbaseResponse:
-        url = f"{BASE_URL}{path}"
-        response = self._client.post(url, data=self._build_params(data, token_override=token))
-        return CrawlbaseResponse(status_code=response.status_code, data=response.json(), headers=dict(response.headers))
+        return self._request("POST", path, self._build_params(data, token_override=token), "data")
 
     def get_account_snapshot(self, product: str = "crawling-api", include_previous: bool = False) -> CrawlbaseResponse:
-        params = {"product": product}
-        if include_previous:
-            params["previous_month"] = "true"
-        return self.get("/account", params=params)
+        return self.get("/account", params=_account_params(product, include_previous))
 
     def close(self) -> None:
-        self._client.close()
+        if self._owns_client:
+            self._client.close()
 
     def __enter__(self) -> "CrawlbaseClient":
         return self
@@ -60,3 +207,67 @@ class CrawlbaseClient:
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         self.close()
 
+
+class AsyncCrawlbaseClient(_BaseCrawlbaseClient):
+    """Variante asíncrona de ``CrawlbaseClient`` respaldada por ``httpx.AsyncClient``."""
+
+    def __init__(
+        self,
+        profile: ProfileReadSchema,
+        timeout: Optional[float] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache: Optional[ResponseCache] = None,
+        cache_max_age: Optional[float] = None,
+    ) -> None:
+        super().__init__(profile, timeout=timeout, retry_policy=retry_policy, cache=cache, cache_max_age=cache_max_age)
+        if http_client is None and client_pool.started:
+            http_client = client_pool.get_async_client(profile.id)
+        self._owns_client = http_client is None
+        self._client = http_client or httpx.AsyncClient(timeout=self.timeout)
+
+    async def _request(self, method: str, path: str, payload: Dict[str, Any], payload_key: str) -> CrawlbaseResponse:
+        url = f"{BASE_URL}{path}"
+        limiter = self._limiter(payload)
+        started = monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self.retry_policy.attempt_timeout_for(self.timeout, monotonic() - started)
+            try:
+                async with limiter.slot_async():
+                    response = await self._client.request(method, url, timeout=timeout, **{payload_key: payload})
+            except httpx.TransportError as exc:
+                delay = self._retry_delay(attempt, started, None)
+                if delay is None:
+                    raise self._transport_error(exc, attempt, started) from exc
+            else:
+                limiter.observe(response.status_code, response.headers)
+                delay = self._retry_delay(attempt, started, response)
+                if delay is None:
+                    return self._to_response(response, attempts=attempt, elapsed=monotonic() - started)
+            await asyncio.sleep(delay)
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None, token: Optional[str] = None) -> CrawlbaseResponse:
+        payload = self._build_params(params, token_override=token)
+        key = self._cache_key(path, payload)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        return self._store_response(key, await self._request("GET", path, payload, "params"))
+
+    async def post(self, path: str, data: Optional[Dict[str, Any]] = None, token: Optional[str] = None) -> CrawlbaseResponse:
+        return await self._request("POST", path, self._build_params(data, token_override=token), "data")
+
+    async def get_account_snapshot(self, product: str = "crawling-api", include_previous: bool = False) -> CrawlbaseResponse:
+        return await self.get("/account", params=_account_params(product, include_previous))
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncCrawlbaseClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.aclose()
@@ -0,0 +1,102 @@
+"""Pool de conexiones HTTP compartido entre routers y servicios."""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+import threading
+from typing import Any, Dict
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 requiere el paquete opcional ``h2`` (``pip install httpx[http2]``)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class CrawlbaseClientPool:
+    """Mantiene un ``httpx.Client`` y un ``httpx.AsyncClient`` keep-alive por perfil.
+
+    Se arranca en el startup de la aplicación; mientras está activo, ``CrawlbaseClient`` y
+    ``AsyncCrawlbaseClient`` reutilizan estas conexiones en lugar de abrir una nueva sesión
+    TCP/TLS por petición. Los límites se configuran vía ``CRAWLBASE_POOL_*``.
+    """
+
+    def __init__(self) -> None:
+        self._clients: Dict[Any, httpx.Client] = {}
+        self._async_clients: Dict[Any, httpx.AsyncClient] = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    def start(self) -> None:
+        self._started = True
+        logger.info(
+            "Pool de conexiones Crawlbase activo (max=%s, keepalive=%s, http2=%s)",
+            settings.crawlbase_pool_max_connections,
+            settings.crawlbase_pool_max_keepalive,
+            self.http2,
+        )
+
+    @property
+    def http2(self) -> bool:
+        return settings.crawlbase_http2 and _http2_available()
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.crawlbase_pool_max_connections,
+            max_keepalive_connections=settings.crawlbase_pool_max_keepalive,
+            keepalive_expiry=settings.crawlbase_pool_keepalive_expiry,
+        )
+
+    def get_client(self, profile_id: Any) -> httpx.Client:
+        with self._lock:
+            client = self._clients.get(profile_id)
+            if client is None or client.is_closed:
+                client = httpx.Client(
+                    timeout=settings.crawlbase_timeout,
+                    limits=self._limits(),
+                    http2=self.http2,
+                )
+                self._clients[profile_id] = client
+            return client
+
+    def get_async_client(self, profile_id: Any) -> httpx.AsyncClient:
+        with self._lock:
+            client = self._async_clients.get(profile_id)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    timeout=settings.crawlbase_timeout,
+                    limits=self._limits(),
+                    http2=self.http2,
+                )
+                self._async_clients[profile_id] = client
+            return client
+
+    def close(self) -> None:
+        """Cierra los clientes síncronos; los asíncronos se cierran con ``aclose``."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._started = False
+        for client in clients:
+            client.close()
+
+    async def aclose(self) -> None:
+        with self._lock:
+            async_clients = list(self._async_clients.values())
+            self._async_clients.clear()
+        for client in async_clients:
+            await client.aclose()
+        self.close()
+
+
+client_pool = CrawlbaseClientPool()
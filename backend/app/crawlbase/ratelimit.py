@@ -0,0 +1,317 @@
+"""Limitador de tasa por perfil y tipo de token para las llamadas a Crawlbase."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict, dataclass
+from time import monotonic
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from app.core.config import settings
+from app.profiles.schemas import ProfileReadSchema
+
+THROTTLE_STATUS_CODES = frozenset({429, 503})
+
+
+@dataclass
+class RateLimitMetrics:
+    acquired: int = 0
+    waits: int = 0
+    wait_seconds: float = 0.0
+    throttled: int = 0
+
+
+@dataclass
+class QueueMetrics:
+    waits: int = 0
+    wait_seconds: float = 0.0
+
+
+class TokenBucket:
+    """Token bucket con reservas y ajuste adaptativo (AIMD).
+
+    Cada ``acquire`` reserva un token aunque el balance quede negativo y duerme el tiempo
+    necesario para saldarlo, de modo que los llamadores se atienden en orden de llegada.
+    Ante un 429/503 la tasa se reduce a la mitad (y se respeta ``Retry-After``); cada
+    respuesta correcta la recupera de forma aditiva hasta la tasa configurada.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        min_rate: float = 0.5,
+        clock: Callable[[], float] = monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.base_rate = max(float(rate), 0.001)
+        self.rate = self.base_rate
+        self.burst = max(1, int(burst))
+        self.min_rate = min(float(min_rate), self.base_rate)
+        self.metrics = RateLimitMetrics()
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reconfigure(self, rate: float, burst: int) -> None:
+        """Aplica límites nuevos conservando métricas y el recorte adaptativo vigente."""
+        with self._lock:
+            self.base_rate = max(float(rate), 0.001)
+            self.rate = min(self.rate, self.base_rate)
+            self.burst = max(1, int(burst))
+            self.min_rate = min(self.min_rate, self.base_rate)
+            self._tokens = min(self._tokens, float(self.burst))
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = max(0.0, -self._tokens / self.rate, self._blocked_until - now)
+            self.metrics.acquired += 1
+            if delay > 0:
+                self.metrics.waits += 1
+                self.metrics.wait_seconds += delay
+            return delay
+
+    def acquire(self) -> float:
+        delay = self._reserve()
+        if delay > 0:
+            self._sleep(delay)
+        return delay
+
+    async def acquire_async(self) -> float:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def observe(self, status_code: Optional[int], retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            if status_code in THROTTLE_STATUS_CODES:
+                self.metrics.throttled += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, self._clock() + retry_after)
+            elif status_code is not None and status_code < 400 and self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+
+
+class ConcurrencyGovernor:
+    """Limita las peticiones en vuelo de un perfil, sumando todos sus llamadores.
+
+    Hilos y corrutinas comparten los mismos permisos y esperan en una única cola FIFO. Al
+    liberar, el permiso pasa directamente al primero de la cola: a un hilo despertando su
+    ``Event`` y a una corrutina resolviendo su ``Future`` en su propio event loop, sin ocupar
+    hilos mientras espera. Si la corrutina se cancela, su permiso vuelve a la cola. El
+    tiempo pasado en la cola se acumula en ``metrics``.
+    """
+
+    def __init__(self, max_in_flight: int, clock: Callable[[], float] = monotonic) -> None:
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.metrics = QueueMetrics()
+        self._clock = clock
+        self._available = self.max_in_flight
+        self._waiters: Deque[Union[threading.Event, Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return self.max_in_flight - self._available
+
+    def resize(self, max_in_flight: int) -> None:
+        """Cambia el tope sin soltar los permisos en uso; si crece, despierta a los que esperan."""
+        with self._lock:
+            delta = max(1, int(max_in_flight)) - self.max_in_flight
+            self.max_in_flight += delta
+            if delta < 0:
+                # Puede quedar negativo: los permisos sobrantes se absorben al liberarse
+                self._available += delta
+        for _ in range(max(delta, 0)):
+            self._release()
+
+    def _record_wait(self, started: float) -> None:
+        with self._lock:
+            self.metrics.waits += 1
+            self.metrics.wait_seconds += self._clock() - started
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        with self._lock:
+            if self._available > 0 and not self._waiters:
+                self._available -= 1
+                event = None
+            else:
+                event = threading.Event()
+                self._waiters.append(event)
+        if event is not None:
+            started = self._clock()
+            event.wait()
+            self._record_wait(started)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def slot_async(self) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._available > 0 and not self._waiters:
+                self._available -= 1
+                waiter = None
+            else:
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+        if waiter is not None:
+            started = self._clock()
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self._lock:
+                    queued = waiter in self._waiters
+                    if queued:
+                        self._waiters.remove(waiter)
+                # Si ya se le había cedido el permiso, hay que devolverlo; si la cesión aún
+                # está pendiente, ``_grant`` verá el Future cancelado y lo devolverá
+                if not queued and waiter[1].done() and not waiter[1].cancelled():
+                    self._release()
+                raise
+            self._record_wait(started)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        with self._lock:
+            if not self._waiters or self._available < 0:
+                self._available += 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+            return
+        loop, future = waiter
+        try:
+            loop.call_soon_threadsafe(self._grant, future)
+        except RuntimeError:
+            # Event loop cerrado: nadie va a recoger el permiso
+            self._release()
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self._release()
+        else:
+            future.set_result(None)
+
+
+def parse_retry_after(headers: Dict[str, str]) -> Optional[float]:
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Bucket por tipo de token más el gobernador de concurrencia del perfil."""
+
+    def __init__(self, bucket: TokenBucket, governor: ConcurrencyGovernor) -> None:
+        self.bucket = bucket
+        self.governor = governor
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        with self.governor.slot():
+            self.bucket.acquire()
+            yield
+
+    @asynccontextmanager
+    async def slot_async(self) -> AsyncIterator[None]:
+        async with self.governor.slot_async():
+            await self.bucket.acquire_async()
+            yield
+
+    def observe(self, status_code: Optional[int], headers: Optional[Dict[str, str]] = None) -> None:
+        self.bucket.observe(status_code, parse_retry_after(headers or {}))
+
+
+def _profile_limits(profile: ProfileReadSchema, token_type: str) -> Tuple[float, int]:
+    rate = settings.crawlbase_rate_limit_rps.get(token_type, settings.crawlbase_rate_limit_rps.get("normal", 20.0))
+    burst = settings.crawlbase_rate_limit_burst.get(token_type, settings.crawlbase_rate_limit_burst.get("normal", 20))
+    overrides: Any = (profile.metadata or {}).get("rate_limits", {}).get(token_type, {})
+    return float(overrides.get("rps", rate)), int(overrides.get("burst", burst))
+
+
+class RateLimiterRegistry:
+    """Limitadores del proceso indexados por ``(profile_id, token_type)``.
+
+    Los límites salen de ``CRAWLBASE_RATE_LIMIT_RPS``/``CRAWLBASE_RATE_LIMIT_BURST`` y pueden
+    sobrescribirse en los metadatos del perfil (``rate_limits`` y ``max_in_flight``). Se
+    vuelven a leer del perfil en cada ``for_profile``, así que editarlo surte efecto sin
+    reiniciar el proceso.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: Dict[Tuple[Any, str], TokenBucket] = {}
+        self._governors: Dict[Any, ConcurrencyGovernor] = {}
+        self._lock = threading.Lock()
+
+    def for_profile(self, profile: ProfileReadSchema, token_type: str = "normal") -> RateLimiter:
+        key = (profile.id, token_type)
+        rate, burst = _profile_limits(profile, token_type)
+        max_in_flight = max(1, int((profile.metadata or {}).get("max_in_flight", settings.crawlbase_max_in_flight)))
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate=rate, burst=burst)
+            elif (bucket.base_rate, bucket.burst) != (max(rate, 0.001), max(1, burst)):
+                bucket.reconfigure(rate, burst)
+            governor = self._governors.get(profile.id)
+            if governor is None:
+                governor = self._governors[profile.id] = ConcurrencyGovernor(max_in_flight)
+            elif governor.max_in_flight != max_in_flight:
+                governor.resize(max_in_flight)
+        return RateLimiter(bucket, governor)
+
+    def snapshot(self, profile_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._buckets.items())
+            governors = dict(self._governors)
+        snapshot = []
+        for key, bucket in items:
+            if profile_id is not None and key[0] != profile_id:
+                continue
+            governor = governors.get(key[0])
+            snapshot.append({
+                "profile_id": key[0],
+                "token_type": key[1],
+                "rate": round(bucket.rate, 3),
+                "base_rate": bucket.base_rate,
+                "burst": bucket.burst,
+                **asdict(bucket.metrics),
+                # La cola de concurrencia es del perfil: se repite en cada tipo de token
+                "max_in_flight": governor.max_in_flight if governor else None,
+                "in_flight": governor.in_flight if governor else 0,
+                "queue_waits": governor.metrics.waits if governor else 0,
+                "queue_wait_seconds": round(governor.metrics.wait_seconds, 6) if governor else 0.0,
+            })
+        return snapshot
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._governors.clear()
+
+
+rate_limiters = RateLimiterRegistry()
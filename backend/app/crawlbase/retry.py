@@ -0,0 +1,61 @@
+"""Política de reintentos para las peticiones a Crawlbase."""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field, replace
+from typing import FrozenSet, Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Reintentos con backoff exponencial y jitter completo.
+
+    ``attempt_timeout`` limita cada intento y ``total_timeout`` el presupuesto total
+    (intentos más esperas); ``None`` deja el timeout propio del cliente.
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 10.0
+    retryable_status_codes: FrozenSet[int] = field(default_factory=lambda: frozenset({429, 500, 502, 503, 504, 520}))
+    attempt_timeout: Optional[float] = None
+    total_timeout: Optional[float] = None
+
+    @classmethod
+    def from_settings(cls, **overrides: object) -> "RetryPolicy":
+        policy = cls(
+            max_attempts=settings.crawlbase_retry_max_attempts,
+            base_delay=settings.crawlbase_retry_base_delay,
+            max_delay=settings.crawlbase_retry_max_delay,
+            retryable_status_codes=frozenset(settings.crawlbase_retry_status_codes),
+            attempt_timeout=settings.crawlbase_retry_attempt_timeout,
+            total_timeout=settings.crawlbase_retry_total_timeout,
+        )
+        return replace(policy, **overrides) if overrides else policy
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        return status_code in self.retryable_status_codes
+
+    def attempt_timeout_for(self, default: float, elapsed: float) -> float:
+        timeout = self.attempt_timeout or default
+        if self.total_timeout is not None:
+            timeout = min(timeout, max(self.total_timeout - elapsed, 0.001))
+        return timeout
+
+    def next_delay(self, attempt: int, elapsed: float, retry_after: Optional[float] = None) -> Optional[float]:
+        """Espera antes del siguiente intento, o ``None`` si ya no se debe reintentar."""
+        if attempt >= self.max_attempts:
+            return None
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_delay))
+        if self.total_timeout is not None and elapsed + delay >= self.total_timeout:
+            return None
+        return delay
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
@@ -1,9 +1,18 @@
 from typing import Dict, Iterable, List, Optional
 
 from fastapi import APIRouter, Body, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 
+from app.core.config import settings
 from app.link_factory.presets import LinkPreset, list_presets
-from app.link_factory.service import LinkFactoryError, export_as_base64, generate_links
+from app.link_factory.service import (
+    LinkFactoryError,
+    LinkSet,
+    export_as_base64,
+    generate_links,
+    gzip_chunks,
+    iter_export,
+)
 
 router = APIRouter(prefix="/link-factory", tags=["link-factory"])
 
@@ -29,16 +38,13 @@ def generate(
     overrides: Optional[Dict[str, List[str]]] = Body(default=None, description="Valores personalizados para las variables"),
     export_format: Optional[str] = Query(
         default=None,
-        description="Formato opcional de exportación (xlsx, csv, txt, md, json)",
+        description="Formato opcional de exportación (xlsx, csv, txt, md, json, parquet, feather)",
     ),
     preview_limit: int = Query(default=25, ge=1, le=200, description="Cantidad máxima de enlaces a previsualizar"),
+    shard_index: Optional[int] = Query(default=None, ge=0, description="Parte a generar (requiere shard_count)"),
+    shard_count: Optional[int] = Query(default=None, ge=1, description="Número de partes en que se reparten las combinaciones"),
 ):
-    try:
-        preset, links = generate_links(preset_id=preset_id, overrides=overrides)
-    except KeyError as exc:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
-    except LinkFactoryError as exc:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    preset, links = _generate(preset_id, overrides, shard_index, shard_count)
 
     payload = {
         "preset": {
@@ -49,10 +55,19 @@ def generate(
             "notes": preset.notes,
         },
         "total": len(links),
-        "preview": links[:preview_limit],
+        "preview": links.preview(preview_limit),
     }
 
     if export_format:
+        # El export embebido (base64 dentro del JSON) es solo para listas pequeñas
+        if len(links) > settings.link_factory_inline_export_limit:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=(
+                    f"{len(links)} enlaces superan el límite de exportación embebida "
+                    f"({settings.link_factory_inline_export_limit}); use POST /link-factory/export"
+                ),
+            )
         try:
             payload["export"] = export_as_base64(links, export_format=export_format)
         except LinkFactoryError as exc:
@@ -60,3 +75,42 @@ def generate(
 
     return payload
 
+
+@router.post("/export")
+def export(
+    preset_id: str = Query(..., description="Identificador del preset de enlaces"),
+    overrides: Optional[Dict[str, List[str]]] = Body(default=None, description="Valores personalizados para las variables"),
+    export_format: str = Query(default="csv", description="Formato de exportación (csv, txt, jsonl, json, md, xlsx, parquet, feather)"),
+    gzip: bool = Query(default=False, description="Comprimir la respuesta con gzip (Content-Encoding)"),
+    shard_index: Optional[int] = Query(default=None, ge=0, description="Parte a exportar (requiere shard_count)"),
+    shard_count: Optional[int] = Query(default=None, ge=1, description="Número de partes en que se reparten las combinaciones"),
+) -> StreamingResponse:
+    """Descarga todos los enlaces generados como un archivo emitido por fragmentos."""
+    _, links = _generate(preset_id, overrides, shard_index, shard_count)
+    try:
+        filename, chunks, mimetype = iter_export(links, export_format)
+    except LinkFactoryError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "X-Total-Links": str(len(links))}
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=mimetype, headers=headers)
+
+
+def _generate(
+    preset_id: str,
+    overrides: Optional[Dict[str, List[str]]],
+    shard_index: Optional[int] = None,
+    shard_count: Optional[int] = None,
+) -> tuple[LinkPreset, LinkSet]:
+    if (shard_index is None) != (shard_count is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="shard_index y shard_count van juntos")
+    shard = (shard_index, shard_count) if shard_count is not None else None
+    try:
+        return generate_links(preset_id=preset_id, overrides=overrides, shard=shard)
+    except KeyError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except LinkFactoryError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
@@ -2,13 +2,28 @@ from __future__ import annotations
 
 import base64
 import csv
-from io import BytesIO, StringIO
-from itertools import product
-from typing import Dict, Iterable, List, Tuple
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from dataclasses import dataclass, replace
+from functools import cached_property
+from io import StringIO
+from itertools import chain, islice, product
+from math import prod
+from pathlib import Path
+from string import Formatter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from openpyxl import Workbook
 
 from app.link_factory.presets import LinkPreset, get_preset, list_presets
+from app.scrapers.columnar import COLUMNAR_FORMATS, MEDIA_TYPES, pyarrow_available, write_column
+
+# Enlaces por fragmento al exportar en streaming
+EXPORT_CHUNK_LINKS = 1000
+FILE_CHUNK_BYTES = 64 * 1024
 
 
 class LinkFactoryError(Exception):
@@ -36,66 +51,349 @@ def _resolve_values(preset: LinkPreset, overrides: Dict[str, Iterable[str]]) ->
     return resolved
 
 
-def generate_links(preset_id: str, overrides: Dict[str, Iterable[str]] | None = None) -> Tuple[LinkPreset, List[str]]:
+@dataclass(frozen=True)
+class LinkSet:
+    """Enlaces de un preset generados bajo demanda, sin materializar el producto cartesiano.
+
+    Solo participan las variables que aparecen en el patrón, con sus valores sin repetir;
+    el orden es el de ``itertools.product`` (la primera variable es la más externa). Si el
+    patrón garantiza que combinaciones distintas dan enlaces distintos (``unique``), el total
+    es el producto de los tamaños de cada conjunto y no hace falta deduplicar.
+
+    ``start``/``stop`` acotan el rango de combinaciones (índices en base mixta sobre el
+    producto) y ``shard`` reparte por huella los enlaces de patrones ambiguos; ambos se
+    fijan con ``slice`` y ``partition``.
+    """
+
+    preset: LinkPreset
+    names: Tuple[str, ...]
+    values: Tuple[Tuple[str, ...], ...]
+    template: str
+    unique: bool
+    start: int = 0
+    stop: Optional[int] = None
+    shard: Tuple[int, int] = (0, 1)
+
+    def __iter__(self) -> Iterator[str]:
+        stop = self._stop
+        if self.start == 0 and stop == self.combinations:
+            combos: Iterable[Tuple[str, ...]] = product(*self.values)
+        else:
+            combos = _iter_combinations(self.values, self.start, stop)
+        links = (self.template.format(*combo) for combo in combos)
+        return links if self.unique else _skip_repeated(links, self.shard)
+
+    def __len__(self) -> int:
+        return self.total
+
+    @cached_property
+    def combinations(self) -> int:
+        """Tamaño del espacio completo de combinaciones, sin acotar."""
+        return prod(len(values) for values in self.values)
+
+    @cached_property
+    def total(self) -> int:
+        if self.unique:
+            return self._stop - self.start
+        # Solo con patrones ambiguos: hay que recorrerlos para saber cuántos son distintos
+        return sum(1 for _ in self)
+
+    @property
+    def _stop(self) -> int:
+        return self.combinations if self.stop is None else self.stop
+
+    def preview(self, limit: int) -> List[str]:
+        return list(islice(self, limit))
+
+    def link_at(self, index: int) -> str:
+        """Enlace de la combinación ``index`` del espacio completo, en O(número de variables)."""
+        if not 0 <= index < self.combinations:
+            raise LinkFactoryError(f"Índice fuera de rango: {index} (hay {self.combinations} combinaciones)")
+        digits = _decode(index, [len(values) for values in self.values])
+        return self.template.format(*(values[digit] for values, digit in zip(self.values, digits, strict=True)))
+
+    def slice(self, start: int, stop: int) -> "LinkSet":
+        """Combinaciones ``[start, stop)`` del espacio completo; solo para patrones inyectivos."""
+        if not self.unique:
+            raise LinkFactoryError("El patrón puede repetir enlaces; use partition para repartirlo sin duplicados.")
+        if not 0 <= start <= stop <= self.combinations:
+            raise LinkFactoryError(f"Rango inválido [{start}, {stop}) para {self.combinations} combinaciones")
+        return replace(self, start=start, stop=stop)
+
+    def partition(self, index: int, count: int) -> "LinkSet":
+        """Parte ``index`` de ``count``: deterministas, disjuntas y que juntas cubren todo el conjunto.
+
+        Con patrones inyectivos cada parte es un rango contiguo de combinaciones, que un
+        worker puede generar sin recorrer el resto. Con patrones ambiguos cada parte recorre
+        todas las combinaciones y se queda con los enlaces cuya huella le corresponde, para
+        que un enlace repetido caiga siempre en la misma parte.
+        """
+        if count < 1 or not 0 <= index < count:
+            raise LinkFactoryError(f"Partición inválida {index}/{count}")
+        if not self.unique:
+            return replace(self, shard=(index, count))
+        size = self._stop - self.start
+        return replace(
+            self,
+            start=self.start + size * index // count,
+            stop=self.start + size * (index + 1) // count,
+        )
+
+
+def _decode(index: int, radices: Sequence[int]) -> List[int]:
+    """Dígitos en base mixta de ``index``; el último radix es el de la variable más interna."""
+    digits = [0] * len(radices)
+    for position in range(len(radices) - 1, -1, -1):
+        index, digits[position] = divmod(index, radices[position])
+    return digits
+
+
+def _iter_combinations(values: Sequence[Sequence[str]], start: int, stop: int) -> Iterator[Tuple[str, ...]]:
+    """Como ``product(*values)`` pero empezando en la combinación ``start`` (cuenta tipo odómetro)."""
+    if start >= stop:
+        return
+    radices = [len(options) for options in values]
+    digits = _decode(start, radices)
+    combo = [options[digit] for options, digit in zip(values, digits, strict=True)]
+    for _ in range(stop - start):
+        yield tuple(combo)
+        position = len(radices) - 1
+        while position >= 0:
+            digits[position] += 1
+            if digits[position] < radices[position]:
+                combo[position] = values[position][digits[position]]
+                break
+            digits[position] = 0
+            combo[position] = values[position][0]
+            position -= 1
+
+
+def _skip_repeated(links: Iterable[str], shard: Tuple[int, int] = (0, 1)) -> Iterator[str]:
+    index, count = shard
+    seen = set()
+    for link in links:
+        digest = hashlib.blake2b(link.encode("utf-8"), digest_size=16).digest()
+        if count > 1 and int.from_bytes(digest[:8], "little") % count != index:
+            continue
+        if digest not in seen:
+            seen.add(digest)
+            yield link
+
+
+def _compile_pattern(pattern: str, values: Dict[str, List[str]]) -> Tuple[Tuple[str, ...], str, bool]:
+    """Traduce el patrón a uno posicional y decide si puede producir enlaces repetidos.
+
+    Devuelve las variables referenciadas (en orden de aparición), la plantilla posicional y
+    si el resultado es inyectivo: cada campo va seguido de un literal no vacío que no aparece
+    en ninguno de sus valores, de modo que el enlace solo se puede descomponer de una forma.
+    """
+    names: List[str] = []
+    template: List[str] = []
+    fields: List[Tuple[str, bool]] = []
+    following: List[str] = []
+    for literal, field_name, format_spec, conversion in Formatter().parse(pattern):
+        template.append(literal.replace("{", "{{").replace("}", "}}"))
+        if fields:
+            following.append(literal)
+        if field_name is None:
+            continue
+        name = field_name.split(".", 1)[0].split("[", 1)[0]
+        if not name or name.isdigit():
+            raise LinkFactoryError("El patrón solo admite variables con nombre.")
+        if name not in values:
+            raise LinkFactoryError(f"Variable '{name}' no está definida en el preset ni en los overrides.")
+        if name not in names:
+            names.append(name)
+        position = names.index(name)
+        template.append(
+            "{" + str(position) + field_name[len(name):]
+            + (f"!{conversion}" if conversion else "")
+            + (f":{format_spec}" if format_spec else "") + "}"
+        )
+        fields.append((name, bool(format_spec or conversion or field_name != name)))
+
+    unique = True
+    for index, (name, transformed) in enumerate(fields):
+        if transformed:
+            unique = False
+            break
+        if index < len(fields) - 1:
+            separator = following[index] if index < len(following) else ""
+            if not separator or _overlaps(separator, values[name], values[fields[index + 1][0]]):
+                unique = False
+                break
+    return tuple(names), "".join(template), unique
+
+
+def _overlaps(separator: str, before: List[str], after: List[str]) -> bool:
+    """Si el separador puede confundirse con el final de un valor o el inicio del siguiente.
+
+    Además de contenerlo, un valor que termina con un prefijo del separador (``us-`` antes
+    de ``--``) o uno que empieza con un sufijo (``-x`` después) permite partir el enlace de
+    dos maneras: ``us-`` + ``--`` + ``x`` y ``us`` + ``--`` + ``-x`` dan ``us---x``.
+    """
+    prefixes = tuple(separator[:size] for size in range(1, len(separator)))
+    suffixes = tuple(separator[-size:] for size in range(1, len(separator)))
+    if any(separator in value or value.endswith(prefixes) for value in before):
+        return True
+    return any(value.startswith(suffixes) for value in after)
+
+
+def generate_links(
+    preset_id: str,
+    overrides: Dict[str, Iterable[str]] | None = None,
+    shard: Optional[Tuple[int, int]] = None,
+) -> Tuple[LinkPreset, LinkSet]:
+    """Enlaces del preset; con ``shard=(índice, total)`` solo la parte que toca a ese worker."""
     preset = get_preset(preset_id)
     overrides = overrides or {}
     values = _resolve_values(preset, overrides)
+    names, template, unique = _compile_pattern(preset.pattern, values)
+    link_set = LinkSet(
+        preset=preset,
+        names=names,
+        # Valores repetidos dentro de un conjunto solo duplicarían enlaces
+        values=tuple(tuple(dict.fromkeys(values[name])) for name in names),
+        template=template,
+        unique=unique,
+    )
+    if shard is not None:
+        link_set = link_set.partition(*shard)
+    return preset, link_set
 
-    variable_names = list(values.keys())
-    combinations = product(*(values[name] for name in variable_names))
 
-    links: List[str] = []
-    for combo in combinations:
-        context = dict(zip(variable_names, combo))
-        try:
-            links.append(preset.pattern.format(**context))
-        except KeyError as exc:
-            raise LinkFactoryError(
-                f"Variable '{exc.args[0]}' no está definida en el preset ni en los overrides."
-            ) from exc
+def _iter_text(prefix: str, lines: Iterable[str], suffix: str = "", separator: str = "\n") -> Iterator[bytes]:
+    """Une ``lines`` con ``separator`` en fragmentos de ``EXPORT_CHUNK_LINKS`` líneas."""
+    iterator = iter(lines)
+    first = True
+    yield prefix.encode("utf-8")
+    while batch := list(islice(iterator, EXPORT_CHUNK_LINKS)):
+        chunk = separator.join(batch)
+        yield (chunk if first else separator + chunk).encode("utf-8")
+        first = False
+    if suffix:
+        yield suffix.encode("utf-8")
 
-    return preset, sorted(set(links))
 
+def _iter_csv(links: Iterable[str]) -> Iterator[bytes]:
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["url"])
+    iterator = iter(links)
+    while True:
+        batch = list(islice(iterator, EXPORT_CHUNK_LINKS))
+        writer.writerows([link] for link in batch)
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if not batch:
+            return
 
-def export_links(links: List[str], export_format: str) -> Tuple[str, bytes, str]:
-    export_format = export_format.lower()
-    if export_format == "xlsx":
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = "Links"
+
+def _iter_json(links: Iterable[str]) -> Iterator[bytes]:
+    # Mismo resultado que json.dumps({"links": links}, indent=2), escrito por fragmentos
+    iterator = iter(links)
+    first = next(iterator, None)
+    if first is None:
+        yield b'{\n  "links": []\n}'
+        return
+    yield from _iter_text(
+        '{\n  "links": [\n',
+        (f"    {json.dumps(link)}" for link in chain([first], iterator)),
+        suffix="\n  ]\n}",
+        separator=",\n",
+    )
+
+
+def _iter_temp_file(write: Callable[[Path], None], suffix: str) -> Iterator[bytes]:
+    """Genera el archivo en un temporal y lo emite por bloques, borrándolo al terminar."""
+    fd, name = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    path = Path(name)
+    try:
+        write(path)
+        with path.open("rb") as handle:
+            while chunk := handle.read(FILE_CHUNK_BYTES):
+                yield chunk
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def _write_xlsx(links: Iterable[str]) -> Callable[[Path], None]:
+    def write(path: Path) -> None:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Links")
         sheet.append(["url"])
         for link in links:
             sheet.append([link])
-        buffer = BytesIO()
-        workbook.save(buffer)
-        return ("links.xlsx", buffer.getvalue(), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        workbook.save(path)
+
+    return write
+
+
+def iter_export(links: Iterable[str], export_format: str) -> Tuple[str, Iterator[bytes], str]:
+    """Como ``export_links`` pero devuelve el contenido como un iterador de fragmentos.
+
+    Los enlaces se consumen una sola vez y nunca se acumulan: los formatos de texto se emiten
+    según se generan y XLSX/Parquet/Feather se escriben en streaming a un archivo temporal.
+    """
+    export_format = export_format.lower()
+    if export_format == "xlsx":
+        return (
+            "links.xlsx",
+            _iter_temp_file(_write_xlsx(links), ".xlsx"),
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
 
     if export_format == "csv":
-        buffer = StringIO()
-        writer = csv.writer(buffer)
-        writer.writerow(["url"])
-        for link in links:
-            writer.writerow([link])
-        return ("links.csv", buffer.getvalue().encode("utf-8"), "text/csv")
+        return ("links.csv", _iter_csv(links), "text/csv")
 
     if export_format == "md":
-        content = "# Lista de enlaces\n\n" + "\n".join(f"- {link}" for link in links)
-        return ("links.md", content.encode("utf-8"), "text/markdown")
+        return ("links.md", _iter_text("# Lista de enlaces\n\n", (f"- {link}" for link in links)), "text/markdown")
 
     if export_format in {"txt", "text"}:
-        content = "\n".join(links)
-        return ("links.txt", content.encode("utf-8"), "text/plain")
+        return ("links.txt", _iter_text("", links), "text/plain")
 
     if export_format == "json":
-        import json
+        return ("links.json", _iter_json(links), "application/json")
+
+    if export_format == "jsonl":
+        return (
+            "links.jsonl",
+            _iter_text("", (json.dumps({"url": link}) + "\n" for link in links), separator=""),
+            "application/x-ndjson",
+        )
+
+    if export_format in COLUMNAR_FORMATS:
+        if not pyarrow_available():
+            raise LinkFactoryError("La exportación Parquet/Feather requiere pyarrow (pip install .[columnar])")
+        suffix = COLUMNAR_FORMATS[export_format]
 
-        content = json.dumps({"links": links}, indent=2)
-        return ("links.json", content.encode("utf-8"), "application/json")
+        def write(path: Path) -> None:
+            write_column(path, "url", links, export_format)
+
+        return (f"links{suffix}", _iter_temp_file(write, suffix), MEDIA_TYPES[suffix])
 
     raise LinkFactoryError(f"Formato de exportación no soportado: {export_format}")
 
 
-def export_as_base64(links: List[str], export_format: str) -> Dict[str, str]:
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprime en gzip un flujo de fragmentos sin reunirlos en memoria."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_links(links: Iterable[str], export_format: str) -> Tuple[str, bytes, str]:
+    filename, chunks, mimetype = iter_export(links, export_format)
+    return filename, b"".join(chunks), mimetype
+
+
+def export_as_base64(links: Iterable[str], export_format: str) -> Dict[str, str]:
     filename, content, mimetype = export_links(links, export_format)
     encoded = base64.b64encode(content).decode("utf-8")
     return {
@@ -103,4 +401,3 @@ def export_as_base64(links: List[str], export_format: str) -> Dict[str, str]:
         "mimetype": mimetype,
         "content_base64": encoded,
     }
-
@@ -3,13 +3,16 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app import __version__
 from app.analytics.router import router as analytics_router
+from app.analytics.router import usage_cache
 from app.core.config import settings
 from app.core.database import init_db
+from app.crawlbase.pool import client_pool
 from app.docs.router import router as docs_router
 from app.link_factory.router import router as link_factory_router
 from app.profiles.router import router as profiles_router
 from app.projects.router import router as projects_router
 from app.scrapers.router import router as scrapers_router
+from app.tasks.router import router as tasks_router
 
 
 def create_application() -> FastAPI:
@@ -24,6 +27,13 @@ def create_application() -> FastAPI:
     @app.on_event("startup")
     def on_startup() -> None:
         init_db()
+        client_pool.start()
+        usage_cache.start_sweeper()
+
+    @app.on_event("shutdown")
+    async def on_shutdown() -> None:
+        usage_cache.close()
+        await client_pool.aclose()
 
     app.add_middleware(
         CORSMiddleware,
@@ -43,6 +53,7 @@ def create_application() -> FastAPI:
     app.include_router(projects_router, prefix="/api")
     app.include_router(link_factory_router, prefix="/api")
     app.include_router(scrapers_router, prefix="/api")
+    app.include_router(tasks_router, prefix="/api")
 
     return app
 
@@ -0,0 +1,266 @@
+"""Archivo de cuerpos crudos de Crawlbase para poder re-extraer sin volver a scrapear.
+
+Cada respuesta se comprime (zstd si está instalado el extra ``archive``, zlib si no) y se
+agrega al final del segmento activo (``segment-00000.bin``, ``segment-00001.bin``...). El
+índice ``index.bin`` es una tabla hash de direccionamiento abierto con ranuras de ancho
+fijo, indexada por la huella ``url_digest`` de la URL y leída con ``mmap``: buscar una URL
+cuesta O(1) sin cargar el índice en memoria. Volver a archivar una URL apunta su ranura al
+registro nuevo; el anterior queda en el segmento sin referencias.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+from app.scrapers.urls import url_digest
+
+_MAGIC = b"CBAX"
+_VERSION = 1
+# magic, versión, capacidad (ranuras) y ranuras ocupadas
+_HEADER = struct.Struct("<4sH2xQQ")
+# huella de la URL, segmento, offset, longitud comprimida y códec
+_SLOT = struct.Struct("<16sIQIB3x")
+_EMPTY = bytes(16)
+
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+MAX_LOAD = 0.7
+DEFAULT_CAPACITY = 1024
+DEFAULT_SEGMENT_BYTES = 256 * 1024 * 1024
+
+
+class ArchiveError(Exception):
+    """Error al leer o escribir el archivo de respuestas."""
+
+
+@dataclass
+class ArchivedResponse:
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    data: Any
+
+
+def zstd_available() -> bool:
+    return importlib.util.find_spec("zstandard") is not None
+
+
+def _compress(payload: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=6).compress(payload)
+    return zlib.compress(payload, 6)
+
+
+def _decompress(blob: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        if not zstd_available():
+            raise ArchiveError("El registro está comprimido con zstd; instale el extra archive (pip install .[archive])")
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(blob)
+    raise ArchiveError(f"Códec desconocido en el archivo: {codec}")
+
+
+class ResponseArchive:
+    """Segmentos append-only con índice hash mapeado en memoria; seguro entre hilos."""
+
+    def __init__(
+        self,
+        root: Path,
+        segment_max_bytes: int = DEFAULT_SEGMENT_BYTES,
+        initial_capacity: int = DEFAULT_CAPACITY,
+    ) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.codec = CODEC_ZSTD if zstd_available() else CODEC_ZLIB
+        self._lock = threading.Lock()
+        self._index_path = self.root / "index.bin"
+        if not self._index_path.exists():
+            self._write_empty_index(self._index_path, _power_of_two(initial_capacity))
+        self._open_index()
+        self._segment, self._segment_size = self._last_segment()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return self._find(url_digest(url))[1] is not None
+
+    def put(self, url: str, status_code: int, data: Any, headers: Optional[Mapping[str, str]] = None) -> None:
+        record = {"url": url, "status_code": status_code, "headers": dict(headers or {}), "data": data}
+        payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        blob = _compress(payload, self.codec)
+        digest = url_digest(url)
+        with self._lock:
+            if self._segment_size and self._segment_size + len(blob) > self.segment_max_bytes:
+                self._segment += 1
+                self._segment_size = 0
+            offset = self._segment_size
+            with open(self._segment_path(self._segment), "ab") as handle:
+                handle.write(blob)
+            self._segment_size += len(blob)
+
+            position, existing = self._find(digest)
+            if existing is None:
+                if (self._count + 1) > self._capacity * MAX_LOAD:
+                    self._grow()
+                    position, _ = self._find(digest)
+                self._count += 1
+                _HEADER.pack_into(self._index, 0, _MAGIC, _VERSION, self._capacity, self._count)
+            _SLOT.pack_into(self._index, position, digest, self._segment, offset, len(blob), self.codec)
+
+    def get(self, url: str) -> Optional[ArchivedResponse]:
+        with self._lock:
+            _, slot = self._find(url_digest(url))
+        return None if slot is None else self._read(slot)
+
+    def iter_responses(self) -> Iterator[ArchivedResponse]:
+        """Recorre el archivo en orden de segmento y offset, es decir, en lecturas secuenciales."""
+        with self._lock:
+            slots = sorted(slot for _, slot in self._iter_slots())
+        for slot in slots:
+            yield self._read(slot)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            segments = sorted(self.root.glob("segment-*.bin"))
+            return {
+                "entries": self._count,
+                "capacity": self._capacity,
+                "segments": len(segments),
+                "bytes": sum(path.stat().st_size for path in segments),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._index.flush()
+            self._index.close()
+            self._index_file.close()
+
+    def __enter__(self) -> "ResponseArchive":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _read(self, slot: Tuple[int, int, int, int]) -> ArchivedResponse:
+        segment, offset, length, codec = slot
+        try:
+            # Cada lectura abre su propio handle, así seek + read no compiten entre hilos
+            # (``os.pread`` no existe en Windows)
+            with open(self._segment_path(segment), "rb") as handle:
+                handle.seek(offset)
+                blob = handle.read(length)
+            if len(blob) != length:
+                raise ValueError(f"se esperaban {length} bytes y se leyeron {len(blob)}")
+            record = json.loads(_decompress(blob, codec))
+        except (OSError, zlib.error, ValueError) as e:
+            raise ArchiveError(f"Registro ilegible en el segmento {segment} (offset {offset}): {e}") from e
+        return ArchivedResponse(
+            url=record["url"],
+            status_code=record["status_code"],
+            headers=record.get("headers") or {},
+            data=record.get("data"),
+        )
+
+    def _find(self, digest: bytes) -> Tuple[int, Optional[Tuple[int, int, int, int]]]:
+        """Posición en bytes de la ranura de ``digest`` (o de la libre donde iría) y su contenido."""
+        mask = self._capacity - 1
+        slot_index = int.from_bytes(digest[:8], "little") & mask
+        while True:
+            position = _HEADER.size + slot_index * _SLOT.size
+            key, segment, offset, length, codec = _SLOT.unpack_from(self._index, position)
+            if key == _EMPTY:
+                return position, None
+            if key == digest:
+                return position, (segment, offset, length, codec)
+            slot_index = (slot_index + 1) & mask
+
+    def _iter_slots(self) -> Iterator[Tuple[bytes, Tuple[int, int, int, int]]]:
+        for slot_index in range(self._capacity):
+            key, segment, offset, length, codec = _SLOT.unpack_from(
+                self._index, _HEADER.size + slot_index * _SLOT.size
+            )
+            if key != _EMPTY:
+                yield key, (segment, offset, length, codec)
+
+    def _grow(self) -> None:
+        """Duplica la tabla reinsertando las ranuras en un índice nuevo que reemplaza al actual."""
+        entries = list(self._iter_slots())
+        capacity = self._capacity * 2
+        tmp = self._index_path.with_suffix(".tmp")
+        self._write_empty_index(tmp, capacity, count=len(entries))
+        with open(tmp, "r+b") as handle, mmap.mmap(handle.fileno(), 0) as table:
+            mask = capacity - 1
+            for key, (segment, offset, length, codec) in entries:
+                slot_index = int.from_bytes(key[:8], "little") & mask
+                while _SLOT.unpack_from(table, _HEADER.size + slot_index * _SLOT.size)[0] != _EMPTY:
+                    slot_index = (slot_index + 1) & mask
+                _SLOT.pack_into(table, _HEADER.size + slot_index * _SLOT.size, key, segment, offset, length, codec)
+            table.flush()
+        self._index.close()
+        self._index_file.close()
+        os.replace(tmp, self._index_path)
+        self._open_index()
+
+    def _open_index(self) -> None:
+        self._index_file = open(self._index_path, "r+b")
+        self._index = mmap.mmap(self._index_file.fileno(), 0)
+        magic, version, capacity, count = _HEADER.unpack_from(self._index, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ArchiveError(f"{self._index_path} no es un índice de archivo válido")
+        self._capacity = capacity
+        self._count = count
+
+    @staticmethod
+    def _write_empty_index(path: Path, capacity: int, count: int = 0) -> None:
+        with open(path, "wb") as handle:
+            handle.write(_HEADER.pack(_MAGIC, _VERSION, capacity, count))
+            handle.truncate(_HEADER.size + capacity * _SLOT.size)
+
+    def _last_segment(self) -> Tuple[int, int]:
+        segments = sorted(self.root.glob("segment-*.bin"))
+        if not segments:
+            return 0, 0
+        last = segments[-1]
+        return int(last.stem.split("-")[1]), last.stat().st_size
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.root / f"segment-{segment:05d}.bin"
+
+
+def _power_of_two(value: int) -> int:
+    capacity = 1
+    while capacity < max(value, 8):
+        capacity <<= 1
+    return capacity
+
+
+_ARCHIVES: Dict[Path, ResponseArchive] = {}
+_ARCHIVES_LOCK = threading.Lock()
+
+
+def open_archive(root: Path, segment_max_bytes: int = DEFAULT_SEGMENT_BYTES) -> ResponseArchive:
+    """Instancia compartida por directorio: el índice mapeado admite un único escritor por proceso."""
+    root = Path(root).resolve()
+    with _ARCHIVES_LOCK:
+        archive = _ARCHIVES.get(root)
+        if archive is None:
+            archive = _ARCHIVES[root] = ResponseArchive(root, segment_max_bytes=segment_max_bytes)
+        return archive
+
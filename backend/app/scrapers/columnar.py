@@ -0,0 +1,242 @@
+"""Escritura de resultados en formatos columnares (Parquet y Arrow IPC/Feather).
+
+Requiere el extra opcional ``columnar`` (``pip install .[columnar]``, que instala
+``pyarrow``). Las filas se acumulan en lotes de ``batch_size`` y cada lote se escribe como
+un row group (Parquet) o un record batch (IPC), así que la memoria no crece con la corrida.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import logging
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from app.scrapers.excel import EXTRA_COLUMN, format_cell, infer_columns
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_FORMATS = {"parquet": ".parquet", "feather": ".arrow"}
+MEDIA_TYPES = {".parquet": "application/vnd.apache.parquet", ".arrow": "application/vnd.apache.arrow.file"}
+# Columnas con pocos valores distintos que se repiten fila tras fila
+DICTIONARY_COLUMNS = frozenset({"status_code", "content_type", "success", "error", "currency"})
+DEFAULT_BATCH_SIZE = 5000
+_REJECTED = object()
+
+
+def pyarrow_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _require_pyarrow():
+    if not pyarrow_available():
+        raise ValueError("La exportación Parquet/Feather requiere pyarrow (pip install .[columnar])")
+    import pyarrow
+
+    return pyarrow
+
+
+def _infer_type(pa, values: List[Any]):
+    kinds = {type(value) for value in values if value is not None and value != ""}
+    if kinds == {bool}:
+        return pa.bool_()
+    if kinds == {int}:
+        return pa.int64()
+    if kinds and kinds <= {int, float}:
+        return pa.float64()
+    return pa.string()
+
+
+def _coerce(pa, arrow_type, value: Any) -> Any:
+    """Ajusta ``value`` al tipo fijado para la columna; ``_REJECTED`` si no cabe sin perder datos."""
+    if value is None or value == "":
+        return None
+    if pa.types.is_string(arrow_type):
+        return value if isinstance(value, str) else format_cell(value)
+    if pa.types.is_boolean(arrow_type):
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        return text == "true" if text in ("true", "false") else _REJECTED
+    if pa.types.is_integer(arrow_type):
+        if isinstance(value, int):
+            return int(value)
+        if isinstance(value, float):
+            return int(value) if value.is_integer() else _REJECTED
+        try:
+            return int(str(value).strip())
+        except ValueError:
+            return _REJECTED
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return _REJECTED
+
+
+class ColumnarWriter:
+    """Escritor en streaming con la misma interfaz que ``StreamingExcelWriter``.
+
+    El esquema se fija con el primer lote (o con ``columns`` si se declaran); las claves que
+    aparezcan después se guardan como JSON en la columna ``extra``. Con ``keep_types`` los
+    tipos se deducen de los valores; si no, todas las columnas son texto, igual que en Excel.
+    Como el tipo queda fijado con el primer lote, un valor posterior que no encaja (``"N/A"``
+    en una columna entera) se guarda tal cual en ``extra`` y la celda tipada queda vacía.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        sheet_name: str,
+        export_format: str = "parquet",
+        columns: Optional[Sequence[str]] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        keep_types: bool = False,
+    ) -> None:
+        if export_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Formato columnar no soportado: {export_format}")
+        self._pa = _require_pyarrow()
+        self.path = path
+        self.sheet_name = sheet_name
+        self.export_format = export_format
+        self.batch_size = max(1, batch_size)
+        self.keep_types = keep_types
+        self.rows_written = 0
+        self._declared_columns = list(columns) if columns else None
+        self._columns: Optional[List[str]] = None
+        self._with_extra = False
+        self._schema = None
+        self._writer = None
+        self._buffer: List[Dict[str, Any]] = []
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self._flush(partial=True)
+
+    def close(self) -> tuple[str, str]:
+        self._flush(partial=False)
+        if self._writer is None:
+            # Corrida sin filas: se deja un archivo válido con el esquema mínimo
+            self._open_schema([])
+        self._writer.close()
+        logger.info(f"{self.export_format.capitalize()} guardado en: {self.path.absolute()}")
+        return str(self.path.absolute()), self.sheet_name
+
+    def _flush(self, partial: bool) -> None:
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        if self._schema is None:
+            self._open_schema(batch, partial=partial)
+        pa = self._pa
+        arrays = []
+        rejected: List[Dict[str, Any]] = [{} for _ in batch]
+        for field in self._schema:
+            if field.name == EXTRA_COLUMN and self._with_extra:
+                # Es la última columna: se arma cuando ya se sabe qué valores no encajaron
+                arrays.append(pa.array(
+                    [self._extra(row, moved) for row, moved in zip(batch, rejected, strict=True)], type=pa.string()
+                ))
+                continue
+            value_type = field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+            if self.keep_types:
+                values = []
+                for position, row in enumerate(batch):
+                    value = _coerce(pa, value_type, row.get(field.name))
+                    if value is _REJECTED:
+                        rejected[position][field.name] = row[field.name]
+                        value = None
+                    values.append(value)
+            else:
+                values = [None if row.get(field.name) is None else format_cell(row[field.name]) for row in batch]
+            array = pa.array(values, type=value_type)
+            arrays.append(array.dictionary_encode() if pa.types.is_dictionary(field.type) else array)
+        table = pa.Table.from_arrays(arrays, schema=self._schema)
+        if self.export_format == "parquet":
+            self._writer.write_table(table)
+        else:
+            self._writer.write(table)
+        self.rows_written += len(batch)
+
+    def _extra(self, row: Dict[str, Any], rejected: Dict[str, Any]) -> Optional[str]:
+        extra = {key: value for key, value in row.items() if key not in self._columns}
+        extra.update(rejected)
+        return json.dumps(extra, ensure_ascii=False, default=str) if extra else None
+
+    def _open_schema(self, sample: List[Dict[str, Any]], partial: bool = False) -> None:
+        pa = self._pa
+        if self._declared_columns:
+            self._columns = list(self._declared_columns)
+            self._with_extra = True
+        else:
+            self._columns = infer_columns(sample) if sample else ["url", "success", "status_code", "error"]
+            # Con tipos, ``extra`` también recibe los valores que no encajen en lotes posteriores
+            self._with_extra = partial or self.keep_types
+
+        fields = []
+        for name in self._columns:
+            arrow_type = _infer_type(pa, [row.get(name) for row in sample]) if self.keep_types else pa.string()
+            if name in DICTIONARY_COLUMNS:
+                arrow_type = pa.dictionary(pa.int32(), arrow_type)
+            fields.append(pa.field(name, arrow_type))
+        if self._with_extra:
+            fields.append(pa.field(EXTRA_COLUMN, pa.string()))
+        self._schema = pa.schema(fields, metadata={"sheet_name": self.sheet_name})
+
+        if self.export_format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(
+                str(self.path),
+                self._schema,
+                compression="zstd",
+                use_dictionary=[name for name in self._columns if name in DICTIONARY_COLUMNS],
+            )
+        else:
+            import pyarrow.ipc as ipc
+
+            self._writer = ipc.new_file(str(self.path), self._schema)
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+
+
+def write_column(
+    path: Path,
+    name: str,
+    values: Iterable[str],
+    export_format: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Escribe una sola columna de texto en Parquet o Arrow IPC por lotes; devuelve las filas."""
+    pa = _require_pyarrow()
+    if export_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Formato columnar no soportado: {export_format}")
+    schema = pa.schema([pa.field(name, pa.string())])
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(str(path), schema, compression="zstd")
+        write = writer.write_table
+    else:
+        import pyarrow.ipc as ipc
+
+        writer = ipc.new_file(str(path), schema)
+        write = writer.write
+    rows = 0
+    try:
+        iterator = iter(values)
+        while batch := list(islice(iterator, batch_size)):
+            write(pa.Table.from_arrays([pa.array(batch, type=pa.string())], schema=schema))
+            rows += len(batch)
+    finally:
+        writer.close()
+    return rows
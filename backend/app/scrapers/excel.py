@@ -0,0 +1,212 @@
+"""Escritura de resultados de scraping en Excel."""
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+logger = logging.getLogger(__name__)
+
+BASE_COLUMNS = ["url", "success", "status_code", "error"]
+EMPTY_HEADERS = ["URL", "Estado", "Código de Estado", "Error"]
+EXTRA_COLUMN = "extra"
+MAX_COLUMN_WIDTH = 50
+
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+
+
+def format_cell(value: Any) -> str:
+    """Convierte un valor a texto para Excel (objetos complejos como JSON)."""
+    return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+
+
+def typed_cell(value: Any) -> Any:
+    """Como ``format_cell`` pero conserva números y booleanos como celdas tipadas."""
+    if value is None:
+        return ""
+    if isinstance(value, (bool, int, float)):
+        return value
+    return format_cell(value)
+
+
+def infer_columns(rows: Sequence[Dict[str, Any]]) -> List[str]:
+    """Columnas base primero y el resto en orden alfabético."""
+    keys = set()
+    for row in rows:
+        keys.update(row.keys())
+    columns = list(BASE_COLUMNS)
+    columns.extend(sorted(key for key in keys if key not in BASE_COLUMNS))
+    return columns
+
+
+def estimate_widths(columns: Sequence[str], rows: Sequence[List[str]]) -> List[float]:
+    """Ancho de cada columna a partir de la cabecera y de las filas muestreadas."""
+    widths = [len(column) for column in columns]
+    for row in rows:
+        for index, cell in enumerate(row):
+            length = len(cell) if isinstance(cell, str) else len(str(cell))
+            if length > widths[index]:
+                widths[index] = length
+    return [min(width + 2, MAX_COLUMN_WIDTH) for width in widths]
+
+
+class StreamingExcelWriter:
+    """Escribe filas en un libro nuevo usando el modo ``write_only`` de openpyxl.
+
+    Las primeras ``sample_size`` filas se retienen para fijar el esquema de columnas (si no
+    se declaró uno) y estimar los anchos; a partir de ahí cada fila se vuelca al escribirla.
+    Si el esquema quedó fijado antes de ver todas las filas, las claves desconocidas se
+    serializan como JSON en la columna ``extra``. Con ``keep_types`` los números y booleanos
+    se escriben como tales en lugar de como texto.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        sheet_name: str,
+        columns: Optional[Sequence[str]] = None,
+        sample_size: int = 200,
+        keep_types: bool = False,
+    ) -> None:
+        self.path = path
+        self.sheet_name = sheet_name
+        self.sample_size = max(1, sample_size)
+        self._cell = typed_cell if keep_types else format_cell
+        self.rows_written = 0
+        self._declared_columns = list(columns) if columns else None
+        self._columns: Optional[List[str]] = None
+        self._with_extra = False
+        self._sample: List[Dict[str, Any]] = []
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(sheet_name)
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        columns = self._columns
+        if columns is None:
+            self._sample.append(row)
+            if len(self._sample) >= self.sample_size:
+                self._start(partial=True)
+            return
+        self._sheet.append(self._format_row(row, columns))
+        self.rows_written += 1
+
+    def close(self) -> tuple[str, str]:
+        if self._columns is None:
+            self._start(partial=False)
+        self._workbook.save(self.path)
+        logger.info(f"Excel guardado en: {self.path.absolute()}")
+        return str(self.path.absolute()), self.sheet_name
+
+    def _start(self, partial: bool) -> None:
+        sample, self._sample = self._sample, []
+        if not sample and not self._declared_columns:
+            self._columns = []
+            self._write_header(EMPTY_HEADERS, estimate_widths(EMPTY_HEADERS, []))
+            return
+
+        if self._declared_columns:
+            columns = list(self._declared_columns)
+            self._with_extra = True
+        else:
+            columns = infer_columns(sample)
+            self._with_extra = partial
+        self._columns = columns
+        header = columns + ([EXTRA_COLUMN] if self._with_extra else [])
+
+        formatted = [self._format_row(row, columns) for row in sample]
+        self._write_header(header, estimate_widths(header, formatted))
+        for values in formatted:
+            self._sheet.append(values)
+        self.rows_written += len(formatted)
+
+    def _write_header(self, header: Sequence[str], widths: Sequence[float]) -> None:
+        # En modo write_only las dimensiones deben fijarse antes de la primera fila.
+        for index, width in enumerate(widths, 1):
+            self._sheet.column_dimensions[get_column_letter(index)].width = width
+        cells = []
+        for title in header:
+            cell = WriteOnlyCell(self._sheet, value=title)
+            cell.fill = HEADER_FILL
+            cell.font = HEADER_FONT
+            cells.append(cell)
+        self._sheet.append(cells)
+
+    def _format_row(self, row: Dict[str, Any], columns: List[str]) -> List[str]:
+        values = [self._cell(row.get(key, "")) for key in columns]
+        if self._with_extra:
+            extra = {key: value for key, value in row.items() if key not in columns}
+            values.append(format_cell(extra) if extra else "")
+        return values
+
+    def __enter__(self) -> "StreamingExcelWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+
+
+class WorkbookAppendWriter:
+    """Agrega una hoja a un libro existente (requiere cargarlo completo al cerrar)."""
+
+    def __init__(
+        self,
+        path: Path,
+        sheet_name: str,
+        columns: Optional[Sequence[str]] = None,
+        keep_types: bool = False,
+    ) -> None:
+        self.path = path
+        self.sheet_name = sheet_name
+        self.rows_written = 0
+        self._cell = typed_cell if keep_types else format_cell
+        self._declared_columns = list(columns) if columns else None
+        self._rows: List[Dict[str, Any]] = []
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        self._rows.append(row)
+        self.rows_written += 1
+
+    def close(self) -> tuple[str, str]:
+        wb = load_workbook(self.path)
+        sheet_name = self.sheet_name
+        counter = 1
+        while sheet_name in wb.sheetnames:
+            sheet_name = f"{self.sheet_name}_{counter}"
+            counter += 1
+        self.sheet_name = sheet_name
+        ws = wb.create_sheet(sheet_name)
+
+        if self._rows or self._declared_columns:
+            columns = self._declared_columns or infer_columns(self._rows)
+            formatted = [[self._cell(row.get(key, "")) for key in columns] for row in self._rows]
+        else:
+            columns, formatted = EMPTY_HEADERS, []
+        ws.append(list(columns))
+        for values in formatted:
+            ws.append(values)
+
+        for cell in ws[1]:
+            cell.fill = HEADER_FILL
+            cell.font = HEADER_FONT
+        for index, width in enumerate(estimate_widths(columns, formatted), 1):
+            ws.column_dimensions[get_column_letter(index)].width = width
+
+        wb.save(self.path)
+        logger.info(f"Excel guardado en: {self.path.absolute()}")
+        return str(self.path.absolute()), sheet_name
+
+    def __enter__(self) -> "WorkbookAppendWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
@@ -0,0 +1,120 @@
+"""Extracción de metadatos HTML en una sola pasada.
+
+Un único escáner de etiquetas recorre el cuerpo de izquierda a derecha y solo se detiene en
+las que interesan (``title``, ``h1``, ``meta``, ``link``, ``a``); comentarios, ``<script>`` y
+``<style>`` se saltan enteros para no contar enlaces que no son del documento. No se
+construye ningún árbol ni se copia el cuerpo: solo se recortan el título y el primer ``<h1>``.
+
+``html.parser`` resolvería lo mismo, pero tokeniza cada etiqueta y cada nodo de texto en
+Python y resulta un orden de magnitud más lento en páginas grandes (ver ``benchmarks/bench_extraction.py``).
+"""
+
+from __future__ import annotations
+
+import re
+from html import unescape
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+TITLE_MAX_LENGTH = 200
+TEXT_MAX_LENGTH = 500
+
+_TAG_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<(?P<raw>script|style)\b[^>]*>.*?</(?P=raw)\s*>"
+    r"|<(?P<tag>title|h1|meta|link|a)\b(?P<attrs>[^>]*)>",
+    re.IGNORECASE | re.DOTALL,
+)
+_ATTR_RE = re.compile(r"""([\w:.-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+_HREF_RE = re.compile(r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE)
+_INNER_TAG_RE = re.compile(r"<[^>]*>")
+_CLOSE_RE = {
+    "title": re.compile(r"</title\s*>", re.IGNORECASE),
+    "h1": re.compile(r"</h1\s*>", re.IGNORECASE),
+}
+_SKIPPED_HREFS = ("#", "javascript:", "mailto:", "tel:")
+
+
+def _attributes(raw: str) -> Dict[str, str]:
+    return {
+        match.group(1).lower(): unescape(next(value for value in match.groups()[1:] if value is not None))
+        for match in _ATTR_RE.finditer(raw)
+    }
+
+
+def _link_host(href: str) -> Optional[str]:
+    """Host de un enlace absoluto o ``None`` si es relativo (y por tanto interno)."""
+    if href.startswith("//") or "://" in href[:12]:
+        return urlsplit(href if "://" in href[:12] else "http:" + href).hostname or ""
+    return None
+
+
+def _clean_text(fragment: str, limit: int) -> Optional[str]:
+    text = " ".join(unescape(_INNER_TAG_RE.sub(" ", fragment)).split())
+    return text[:limit] or None
+
+
+def extract_html_metadata(body: str, base_url: str = "") -> Dict[str, Any]:
+    """Título, meta description, canonical, ``og:*``, primer ``<h1>`` y recuento de enlaces.
+
+    ``base_url`` permite separar enlaces internos de externos; las etiquetas se reconocen
+    sin importar mayúsculas ni atributos (``<TITLE lang="es">``).
+    """
+    base_host = urlsplit(base_url).hostname or ""
+    fields: Dict[str, Any] = {}
+    h1_count = link_count = internal_links = external_links = 0
+
+    for match in _TAG_RE.finditer(body):
+        tag = match.group("tag")
+        if tag is None:
+            continue
+        tag = tag.lower()
+        if tag == "a":
+            found = _HREF_RE.search(match.group("attrs"))
+            if found is None:
+                continue
+            href = next(value for value in found.groups() if value is not None).strip()
+            if not href or href.lower().startswith(_SKIPPED_HREFS):
+                continue
+            link_count += 1
+            if base_host:
+                host = _link_host(href)
+                if host is None or host == base_host:
+                    internal_links += 1
+                else:
+                    external_links += 1
+        elif tag == "meta":
+            attrs = _attributes(match.group("attrs"))
+            content = attrs.get("content")
+            if content is None:
+                continue
+            if attrs.get("name", "").lower() == "description":
+                fields.setdefault("meta_description", content.strip()[:TEXT_MAX_LENGTH])
+            prop = attrs.get("property", "").lower()
+            if prop.startswith("og:"):
+                fields.setdefault("og_" + prop[3:].replace(":", "_"), content.strip()[:TEXT_MAX_LENGTH])
+        elif tag == "link":
+            if "canonical_url" in fields:
+                continue
+            attrs = _attributes(match.group("attrs"))
+            if "canonical" in attrs.get("rel", "").lower().split() and attrs.get("href"):
+                fields["canonical_url"] = attrs["href"].strip()[:TEXT_MAX_LENGTH]
+        else:
+            if tag == "h1":
+                h1_count += 1
+            field = "page_title" if tag == "title" else "h1"
+            if field in fields:
+                continue
+            close = _CLOSE_RE[tag].search(body, match.end())
+            if close is None:
+                continue
+            text = _clean_text(body[match.end():close.start()], TITLE_MAX_LENGTH if tag == "title" else TEXT_MAX_LENGTH)
+            if text:
+                fields[field] = text
+
+    fields["h1_count"] = h1_count
+    fields["link_count"] = link_count
+    if base_host:
+        fields["internal_links"] = internal_links
+        fields["external_links"] = external_links
+    return fields
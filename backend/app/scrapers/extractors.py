@@ -0,0 +1,308 @@
+"""Esquemas de extracción declarativos por ``scraper_key``.
+
+Cada esquema enumera las columnas que produce y de dónde sale cada una:
+
+* ``json``: ruta sobre la respuesta de Crawlbase (``body.products[0].price``; ``[*]``
+  recorre todos los elementos de una lista).
+* ``meta``: un campo de ``extract_html_metadata`` (``page_title``, ``og_image``...).
+* ``html``: expresión regular sobre el HTML; se usa el primer grupo.
+
+Los esquemas se compilan una sola vez al registrarse (al importar el módulo, es decir, en
+el arranque) y después solo se aplican. Como las columnas se conocen de antemano, el
+escritor de Excel no necesita muestrear filas para deducirlas.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
+
+from app.scrapers.extraction import extract_html_metadata
+
+FieldSource = Literal["json", "meta", "html"]
+FieldType = Literal["str", "int", "float", "bool", "count", "list"]
+
+LIST_SEPARATOR = " | "
+TEXT_MAX_LENGTH = 500
+
+_PATH_TOKEN_RE = re.compile(r"([^.\[\]]+)|\[(\d+|\*)\]")
+_NUMBER_RE = re.compile(r"-?\d+(?:[.,]\d+)*")
+_WILDCARD = object()
+
+
+class ExtractionSchemaError(Exception):
+    """Esquema de extracción mal declarado."""
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    name: str
+    selector: str
+    source: FieldSource = "json"
+    type: FieldType = "str"
+
+
+@dataclass(frozen=True)
+class ExtractionSchema:
+    key: str
+    description: str
+    fields: Tuple[FieldSpec, ...]
+    params: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class CompiledSchema:
+    key: str
+    description: str
+    columns: List[str]
+    params: Dict[str, str]
+    _extractors: List[Tuple[str, Callable[[Any, "_Context"], Any], Callable[[Any], Any]]]
+
+    def apply(self, data: Any, url: str = "") -> Dict[str, Any]:
+        """Aplica el esquema a la respuesta de Crawlbase y devuelve las columnas tipadas."""
+        context = _Context(data, url)
+        row: Dict[str, Any] = {}
+        for name, getter, caster in self._extractors:
+            try:
+                row[name] = caster(getter(data, context))
+            except (TypeError, ValueError):
+                row[name] = None
+        return row
+
+
+class _Context:
+    """Datos derivados de la respuesta que se calculan como mucho una vez por fila."""
+
+    def __init__(self, data: Any, url: str) -> None:
+        self._data = data
+        self._url = url
+        self._metadata: Optional[Dict[str, Any]] = None
+
+    @property
+    def html(self) -> str:
+        body = self._data.get("body") if isinstance(self._data, dict) else self._data
+        return body if isinstance(body, str) else ""
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            self._metadata = extract_html_metadata(self.html, base_url=self._url)
+        return self._metadata
+
+
+def _compile_path(selector: str) -> Callable[[Any, _Context], Any]:
+    steps: List[Any] = []
+    position = 0
+    for match in _PATH_TOKEN_RE.finditer(selector):
+        if selector[position:match.start()].strip("."):
+            raise ExtractionSchemaError(f"Ruta JSON inválida: {selector}")
+        position = match.end()
+        key, index = match.groups()
+        if key is not None:
+            steps.append(key)
+        elif index == "*":
+            steps.append(_WILDCARD)
+        else:
+            steps.append(int(index))
+    if not steps or selector[position:].strip("."):
+        raise ExtractionSchemaError(f"Ruta JSON inválida: {selector}")
+    fan_out = _WILDCARD in steps
+
+    def resolve(value: Any, steps: List[Any]) -> List[Any]:
+        for position, step in enumerate(steps):
+            if step is _WILDCARD:
+                if not isinstance(value, list):
+                    return []
+                rest = steps[position + 1:]
+                return [item for element in value for item in resolve(element, rest)]
+            if isinstance(step, int):
+                value = value[step] if isinstance(value, list) and -len(value) <= step < len(value) else None
+            else:
+                value = value.get(step) if isinstance(value, dict) else None
+            if value is None:
+                return []
+        return [value]
+
+    def getter(data: Any, context: _Context) -> Any:
+        values = resolve(data, steps)
+        if fan_out:
+            return values
+        return values[0] if values else None
+
+    return getter
+
+
+def _compile_regex(selector: str) -> Callable[[Any, _Context], Any]:
+    try:
+        pattern = re.compile(selector, re.IGNORECASE | re.DOTALL)
+    except re.error as e:
+        raise ExtractionSchemaError(f"Expresión regular inválida {selector!r}: {e}") from e
+    if pattern.groups < 1:
+        raise ExtractionSchemaError(f"La expresión {selector!r} necesita un grupo de captura")
+
+    def getter(data: Any, context: _Context) -> Any:
+        match = pattern.search(context.html)
+        return match.group(1).strip() if match else None
+
+    return getter
+
+
+def _compile_meta(selector: str) -> Callable[[Any, _Context], Any]:
+    def getter(data: Any, context: _Context) -> Any:
+        return context.metadata.get(selector)
+
+    return getter
+
+
+def _to_number(value: Any, kind: type) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return kind(value)
+    if isinstance(value, (int, float)):
+        return kind(value)
+    match = _NUMBER_RE.search(str(value))
+    if not match:
+        return None
+    text = match.group(0)
+    # "1,299.99" y "1.299,99": el último separador es el decimal si le siguen menos de 3 dígitos
+    last = max(text.rfind("."), text.rfind(","))
+    if last != -1 and len(text) - last - 1 != 3:
+        text = text[:last].replace(".", "").replace(",", "") + "." + text[last + 1:]
+    else:
+        text = text.replace(".", "").replace(",", "")
+    return kind(float(text))
+
+
+def _caster(field_type: FieldType) -> Callable[[Any], Any]:
+    if field_type == "str":
+        return lambda value: None if value is None else str(value)[:TEXT_MAX_LENGTH]
+    if field_type == "int":
+        return lambda value: _to_number(value, int)
+    if field_type == "float":
+        return lambda value: _to_number(value, float)
+    if field_type == "bool":
+        return lambda value: None if value is None else (
+            value.strip().lower() in ("1", "true", "yes", "si", "sí") if isinstance(value, str) else bool(value)
+        )
+    if field_type == "count":
+        return lambda value: len(value) if isinstance(value, list) else (0 if value is None else 1)
+    if field_type == "list":
+        return lambda value: LIST_SEPARATOR.join(str(item) for item in (value if isinstance(value, list) else [value]) if item is not None)
+    raise ExtractionSchemaError(f"Tipo de columna no soportado: {field_type}")
+
+
+_COMPILERS: Dict[str, Callable[[str], Callable[[Any, _Context], Any]]] = {
+    "json": _compile_path,
+    "meta": _compile_meta,
+    "html": _compile_regex,
+}
+
+
+def compile_schema(schema: ExtractionSchema) -> CompiledSchema:
+    extractors = []
+    seen = set()
+    for spec in schema.fields:
+        if spec.name in seen:
+            raise ExtractionSchemaError(f"Columna duplicada en el esquema {schema.key}: {spec.name}")
+        seen.add(spec.name)
+        compiler = _COMPILERS.get(spec.source)
+        if compiler is None:
+            raise ExtractionSchemaError(f"Origen no soportado en {schema.key}.{spec.name}: {spec.source}")
+        extractors.append((spec.name, compiler(spec.selector), _caster(spec.type)))
+    return CompiledSchema(
+        key=schema.key,
+        description=schema.description,
+        columns=[spec.name for spec in schema.fields],
+        params=dict(schema.params),
+        _extractors=extractors,
+    )
+
+
+_REGISTRY: Dict[str, CompiledSchema] = {}
+
+
+def register_schema(schema: ExtractionSchema) -> CompiledSchema:
+    compiled = compile_schema(schema)
+    _REGISTRY[schema.key] = compiled
+    return compiled
+
+
+def get_schema(scraper_key: str) -> Optional[CompiledSchema]:
+    return _REGISTRY.get(scraper_key)
+
+
+def list_schemas() -> List[CompiledSchema]:
+    return list(_REGISTRY.values())
+
+
+BUILTIN_SCHEMAS: Tuple[ExtractionSchema, ...] = (
+    ExtractionSchema(
+        key="amazon-serp",
+        description="Resultados de búsqueda de Amazon (scraper amazon-serp de Crawlbase).",
+        params={"scraper": "amazon-serp"},
+        fields=(
+            FieldSpec("products_count", "body.products[*]", type="count"),
+            FieldSpec("first_product", "body.products[0].name"),
+            FieldSpec("first_price", "body.products[0].price", type="float"),
+            FieldSpec("first_asin", "body.products[0].asin"),
+            FieldSpec("asins", "body.products[*].asin", type="list"),
+            FieldSpec("current_page", "body.pagination.currentPage", type="int"),
+            FieldSpec("total_pages", "body.pagination.totalPages", type="int"),
+        ),
+    ),
+    ExtractionSchema(
+        key="amazon-product-details",
+        description="Ficha de producto de Amazon (scraper amazon-product-details de Crawlbase).",
+        params={"scraper": "amazon-product-details"},
+        fields=(
+            FieldSpec("name", "body.name"),
+            FieldSpec("price", "body.price", type="float"),
+            FieldSpec("currency", "body.currency"),
+            FieldSpec("rating", "body.customerReview", type="float"),
+            FieldSpec("reviews", "body.customerReviewCount", type="int"),
+            FieldSpec("in_stock", "body.inStock", type="bool"),
+            FieldSpec("brand", "body.brand"),
+        ),
+    ),
+    ExtractionSchema(
+        key="walmart-serp",
+        description="Resultados de búsqueda de Walmart (scraper walmart-serp de Crawlbase).",
+        params={"scraper": "walmart-serp"},
+        fields=(
+            FieldSpec("products_count", "body.products[*]", type="count"),
+            FieldSpec("first_product", "body.products[0].title"),
+            FieldSpec("first_price", "body.products[0].price", type="float"),
+            FieldSpec("total_pages", "body.pagination.totalPages", type="int"),
+        ),
+    ),
+    ExtractionSchema(
+        key="google-serp",
+        description="Resultados orgánicos de Google (scraper google-serp de Crawlbase).",
+        params={"scraper": "google-serp"},
+        fields=(
+            FieldSpec("results_count", "body.searchResults[*]", type="count"),
+            FieldSpec("total_results", "body.numberOfResults", type="int"),
+            FieldSpec("first_title", "body.searchResults[0].title"),
+            FieldSpec("first_url", "body.searchResults[0].url"),
+            FieldSpec("result_urls", "body.searchResults[*].url", type="list"),
+        ),
+    ),
+    ExtractionSchema(
+        key="generic-extractor",
+        description="Metadatos del HTML de cualquier página.",
+        fields=(
+            FieldSpec("page_title", "page_title", source="meta"),
+            FieldSpec("meta_description", "meta_description", source="meta"),
+            FieldSpec("canonical_url", "canonical_url", source="meta"),
+            FieldSpec("og_title", "og_title", source="meta"),
+            FieldSpec("og_image", "og_image", source="meta"),
+            FieldSpec("h1", "h1", source="meta"),
+            FieldSpec("link_count", "link_count", source="meta", type="int"),
+        ),
+    ),
+)
+
+for _schema in BUILTIN_SCHEMAS:
+    register_schema(_schema)
@@ -0,0 +1,195 @@
+"""Diario append-only de corridas de scraping para poder reanudarlas.
+
+Cada corrida se registra en ``output/runs/<run_id>.jsonl``: una línea de cabecera con los
+parámetros y la lista de URLs, una línea por URL terminada (con la fila ya extraída) y una
+línea final cuando la corrida se cierra. Si el proceso muere a mitad de un lote, la
+reanudación solo vuelve a pedir las URLs que no aparecen en el diario. ``prune_runs`` aplica
+la retención (``SCRAPER_JOURNAL_MAX_RUNS`` y ``SCRAPER_JOURNAL_RETENTION_DAYS``) antes de
+abrir cada corrida nueva.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+FSYNC_EVERY = 50
+
+
+class RunJournalError(Exception):
+    """Error al leer o escribir el diario de una corrida."""
+
+
+class RunFinishedError(Exception):
+    """La corrida ya se cerró en el diario y no se puede reanudar."""
+
+
+@dataclass
+class JournalEntry:
+    index: int
+    success: bool
+    error: Optional[str]
+    row: Dict[str, Any]
+
+
+@dataclass
+class RunState:
+    run_id: str
+    header: Dict[str, Any]
+    completed: Dict[int, JournalEntry] = field(default_factory=dict)
+    summary: Optional[Dict[str, Any]] = None
+
+    @property
+    def urls(self) -> List[str]:
+        return self.header.get("urls", [])
+
+    @property
+    def total_urls(self) -> int:
+        # Las corridas de enlaces generados guardan el origen y el total, no la lista
+        return self.header.get("total_urls", len(self.urls))
+
+    @property
+    def finished(self) -> bool:
+        return self.summary is not None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "created_at": self.header.get("created_at"),
+            "profile_id": self.header.get("profile_id"),
+            "total_urls": self.total_urls,
+            "completed": len(self.completed),
+            "finished": self.finished,
+            "excel_path": (self.summary or {}).get("excel_path") or self.header.get("excel_path"),
+        }
+
+
+class RunJournal:
+    """Escritor thread-safe del diario; cada línea se vuelca al SO en cuanto se escribe."""
+
+    def __init__(self, path: Path, run_id: str) -> None:
+        self.path = path
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        self._pending_sync = 0
+        self._file = path.open("a", encoding="utf-8")
+
+    @classmethod
+    def create(cls, runs_dir: Path, header: Dict[str, Any], run_id: Optional[str] = None) -> "RunJournal":
+        runs_dir.mkdir(parents=True, exist_ok=True)
+        run_id = run_id or uuid.uuid4().hex
+        path = runs_dir / f"{run_id}.jsonl"
+        if path.exists():
+            raise RunJournalError(f"Ya existe una corrida con id {run_id}")
+        journal = cls(path, run_id)
+        journal._append({"type": "run", "run_id": run_id, "created_at": datetime.now().isoformat(timespec="seconds"), **header}, sync=True)
+        return journal
+
+    @classmethod
+    def reopen(cls, runs_dir: Path, run_id: str) -> "RunJournal":
+        path = runs_dir / f"{run_id}.jsonl"
+        if not path.exists():
+            raise RunJournalError(f"No existe la corrida {run_id}")
+        journal = cls(path, run_id)
+        # Si el corte dejó una línea a medias, las nuevas entradas empiezan en una línea limpia
+        with path.open("rb") as handle:
+            handle.seek(0, os.SEEK_END)
+            if handle.tell():
+                handle.seek(-1, os.SEEK_END)
+                if handle.read(1) != b"\n":
+                    journal._file.write("\n")
+        return journal
+
+    def record(self, index: int, success: bool, error: Optional[str], row: Dict[str, Any]) -> None:
+        self._append({"type": "url", "i": index, "ok": success, "error": error, "row": row})
+
+    def finish(self, summary: Dict[str, Any]) -> None:
+        self._append({"type": "finished", **summary}, sync=True)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+    def _append(self, payload: Dict[str, Any], sync: bool = False) -> None:
+        line = json.dumps(payload, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._pending_sync += 1
+            if sync or self._pending_sync >= FSYNC_EVERY:
+                os.fsync(self._file.fileno())
+                self._pending_sync = 0
+
+    def __enter__(self) -> "RunJournal":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def load_run(runs_dir: Path, run_id: str) -> RunState:
+    """Reconstruye el estado de una corrida; ignora una última línea truncada por un corte."""
+    path = runs_dir / f"{run_id}.jsonl"
+    if not path.exists():
+        raise RunJournalError(f"No existe la corrida {run_id}")
+
+    state: Optional[RunState] = None
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                payload = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            kind = payload.pop("type", None)
+            if kind == "run":
+                state = RunState(run_id=run_id, header=payload)
+            elif state is None:
+                break
+            elif kind == "url":
+                index = int(payload["i"])
+                state.completed[index] = JournalEntry(index, bool(payload["ok"]), payload.get("error"), payload["row"])
+            elif kind == "finished":
+                state.summary = payload
+
+    if state is None:
+        raise RunJournalError(f"El diario de la corrida {run_id} no tiene cabecera")
+    return state
+
+
+def list_runs(runs_dir: Path) -> List[Dict[str, Any]]:
+    if not runs_dir.exists():
+        return []
+    runs = []
+    for path in sorted(runs_dir.glob("*.jsonl"), key=lambda item: item.stat().st_mtime, reverse=True):
+        try:
+            runs.append(load_run(runs_dir, path.stem).describe())
+        except RunJournalError:
+            continue
+    return runs
+
+
+def prune_runs(runs_dir: Path, max_runs: int, max_age_days: int, now: Optional[datetime] = None) -> int:
+    """Borra los diarios que exceden la retención (por antigüedad y por cantidad); ``0`` desactiva cada límite.
+
+    Se conservan los más recientes según la fecha de modificación, que es la de la última
+    URL registrada, así una corrida en curso nunca es de las primeras en borrarse.
+    """
+    if not runs_dir.exists():
+        return 0
+    paths = sorted(runs_dir.glob("*.jsonl"), key=lambda item: item.stat().st_mtime, reverse=True)
+    expired = paths[max_runs:] if max_runs > 0 else []
+    if max_age_days > 0:
+        cutoff = ((now or datetime.now()) - timedelta(days=max_age_days)).timestamp()
+        expired += [path for path in paths[: len(paths) - len(expired)] if path.stat().st_mtime < cutoff]
+    for path in expired:
+        path.unlink(missing_ok=True)
+    return len(expired)
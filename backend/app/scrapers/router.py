@@ -1,14 +1,26 @@
 from __future__ import annotations
 
+import json
+from itertools import chain
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlmodel import Session
 
 from app.core.database import get_session
+from app.link_factory.service import LinkFactoryError, generate_links
 from app.profiles.service import ProfileService
+from app.projects.service import ProjectService
 from app.scrapers import schemas, service
+from app.scrapers.archive import ArchiveError
+from app.scrapers.columnar import MEDIA_TYPES
+from app.scrapers.extractors import list_schemas
+from app.scrapers.journal import RunFinishedError, RunJournalError
+from app.scrapers.sidecar import consolidate_workbook, has_parts
+from app.tasks.jobs import JobBackend, JobQueueError, get_job_queue
+from app.tasks.schemas import JobReadSchema
 
 router = APIRouter(prefix="/scrapers", tags=["scrapers"])
 
@@ -17,6 +29,10 @@ def get_profile_service(session: Session = Depends(get_session)) -> ProfileServi
     return ProfileService(session=session)
 
 
+def get_project_service(session: Session = Depends(get_session)) -> ProjectService:
+    return ProjectService(session=session)
+
+
 @router.post("/scrape", response_model=schemas.ScrapeResponseSchema)
 def scrape_urls_endpoint(
     payload: schemas.ScrapeRequestSchema,
@@ -33,6 +49,12 @@ def scrape_urls_endpoint(
             profile=profile,
             excel_path=payload.excel_path,
             sheet_name=payload.sheet_name,
+            max_concurrency=payload.max_concurrency,
+            output_mode=payload.output_mode,
+            retry_policy=service.build_retry_policy(payload.max_attempts),
+            cache_max_age=payload.cache_max_age,
+            scraper_key=payload.scraper_key,
+            archive=payload.archive,
         )
         
         return schemas.ScrapeResponseSchema(**result)
@@ -45,18 +67,236 @@ def scrape_urls_endpoint(
         )
 
 
+@router.post("/scrape/stream")
+def scrape_urls_stream_endpoint(
+    payload: schemas.ScrapeRequestSchema,
+    stream_format: Literal["ndjson", "sse"] = Query("ndjson", alias="format", description="ndjson o sse (Server-Sent Events)"),
+    profile_service: ProfileService = Depends(get_profile_service),
+) -> StreamingResponse:
+    """Scrapea las URLs emitiendo cada resultado y los contadores a medida que se completan.
+
+    Los eventos son ``start``, un ``result`` por URL (en orden de entrada), ``summary`` al
+    final y ``error`` si la corrida se interrumpe después de haber empezado a responder.
+    """
+    profile = profile_service.get(profile_id=payload.profile_id, include_tokens=True)
+    events = service.iter_scrape_events(
+        urls=payload.urls,
+        profile=profile,
+        excel_path=payload.excel_path,
+        sheet_name=payload.sheet_name,
+        max_concurrency=payload.max_concurrency,
+        output_mode=payload.output_mode,
+        retry_policy=service.build_retry_policy(payload.max_attempts),
+        cache_max_age=payload.cache_max_age,
+        scraper_key=payload.scraper_key,
+        archive=payload.archive,
+    )
+    # El primer evento valida la petición, así los errores aún pueden devolverse como 400
+    try:
+        first = next(events)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        _encode_events(chain([first], events), stream_format),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _encode_events(events: Iterator[Dict[str, Any]], stream_format: str) -> Iterator[str]:
+    try:
+        for event in events:
+            yield _format_event(event, stream_format)
+    except Exception as e:
+        yield _format_event({"type": "error", "detail": str(e)}, stream_format)
+
+
+def _format_event(event: Dict[str, Any], stream_format: str) -> str:
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    if stream_format == "sse":
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+@router.post("/jobs", response_model=JobReadSchema, status_code=status.HTTP_202_ACCEPTED)
+def submit_scrape_job(
+    payload: schemas.ScrapeRequestSchema,
+    profile_service: ProfileService = Depends(get_profile_service),
+    queue: JobBackend = Depends(get_job_queue),
+) -> JobReadSchema:
+    """Encola el scraping en segundo plano y devuelve el trabajo para consultar su progreso en /jobs."""
+    # Falla rápido (404) si el perfil no existe, antes de encolar
+    profile_service.get(profile_id=payload.profile_id, include_tokens=False)
+    try:
+        job = queue.submit("scrape", payload.model_dump())
+    except JobQueueError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)) from e
+    return JobReadSchema.from_job(job)
+
+
+@router.post("/links/jobs", response_model=JobReadSchema, status_code=status.HTTP_202_ACCEPTED)
+def submit_link_scrape_job(
+    payload: schemas.LinkScrapeRequestSchema,
+    profile_service: ProfileService = Depends(get_profile_service),
+    project_service: ProjectService = Depends(get_project_service),
+    queue: JobBackend = Depends(get_job_queue),
+) -> JobReadSchema:
+    """Encola el scraping de los enlaces de un preset (o del link_blueprint de un proyecto).
+
+    Las URLs se generan dentro del trabajo a medida que el pool las consume; la petición
+    solo lleva el preset y sus overrides.
+    """
+    request = _resolve_link_request(payload, profile_service, project_service)
+    return _submit_link_job(queue, request)
+
+
+@router.post("/links/jobs/sharded", response_model=List[JobReadSchema], status_code=status.HTTP_202_ACCEPTED)
+def submit_sharded_link_scrape_jobs(
+    payload: schemas.LinkScrapeRequestSchema,
+    shards: int = Query(..., ge=1, le=256, description="Número de trabajos en que se reparten las combinaciones"),
+    profile_service: ProfileService = Depends(get_profile_service),
+    project_service: ProjectService = Depends(get_project_service),
+    queue: JobBackend = Depends(get_job_queue),
+) -> List[JobReadSchema]:
+    """Encola un trabajo por parte; cada uno genera y scrapea solo su rango de combinaciones."""
+    request = _resolve_link_request(payload, profile_service, project_service)
+    return [
+        _submit_link_job(queue, request.model_copy(update={"shard_index": index, "shard_count": shards}))
+        for index in range(shards)
+    ]
+
+
+def _resolve_link_request(
+    payload: schemas.LinkScrapeRequestSchema,
+    profile_service: ProfileService,
+    project_service: ProjectService,
+) -> schemas.LinkScrapeRequestSchema:
+    resolved = payload.model_copy()
+    if payload.project_id is not None:
+        project = project_service.get(payload.project_id)
+        blueprint = project.link_blueprint or {}
+        resolved.preset_id = payload.preset_id or blueprint.get("preset_id") or project.scraper_key
+        resolved.overrides = payload.overrides if payload.overrides is not None else blueprint.get("overrides")
+        resolved.profile_id = payload.profile_id or project.profile_id
+    if not resolved.preset_id or resolved.profile_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indique preset_id y profile_id, o un project_id que los defina",
+        )
+    if (resolved.shard_index is None) != (resolved.shard_count is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="shard_index y shard_count van juntos")
+    shard = (resolved.shard_index, resolved.shard_count) if resolved.shard_count is not None else None
+    # Falla rápido si el preset o los overrides no son válidos (generar es perezoso y barato)
+    try:
+        generate_links(resolved.preset_id, overrides=resolved.overrides, shard=shard)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+    except LinkFactoryError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    profile_service.get(profile_id=resolved.profile_id, include_tokens=False)
+    return resolved
+
+
+def _submit_link_job(queue: JobBackend, request: schemas.LinkScrapeRequestSchema) -> JobReadSchema:
+    try:
+        job = queue.submit("scrape-links", request.model_dump(exclude={"project_id"}))
+    except JobQueueError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)) from e
+    return JobReadSchema.from_job(job)
+
+
+@router.get("/schemas", response_model=List[schemas.ExtractionSchemaReadSchema])
+def list_extraction_schemas() -> List[schemas.ExtractionSchemaReadSchema]:
+    """Esquemas de extracción registrados y las columnas que producen."""
+    return [
+        schemas.ExtractionSchemaReadSchema(
+            key=schema.key,
+            description=schema.description,
+            columns=schema.columns,
+            params=schema.params,
+        )
+        for schema in list_schemas()
+    ]
+
+
+@router.get("/archive", response_model=schemas.ArchiveStatsSchema)
+def archive_stats() -> schemas.ArchiveStatsSchema:
+    """Entradas y tamaño del archivo de cuerpos crudos."""
+    return schemas.ArchiveStatsSchema(**service.get_archive().stats())
+
+
+@router.post("/archive/extract", response_model=schemas.ScrapeResponseSchema)
+def extract_archive_endpoint(payload: schemas.ArchiveExtractRequestSchema) -> schemas.ScrapeResponseSchema:
+    """Re-extrae filas de las respuestas archivadas sin hacer peticiones a Crawlbase."""
+    try:
+        result = service.extract_archive(
+            urls=payload.urls,
+            excel_path=payload.excel_path,
+            sheet_name=payload.sheet_name,
+            output_mode=payload.output_mode,
+            scraper_key=payload.scraper_key,
+        )
+    except (ValueError, ArchiveError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    return schemas.ScrapeResponseSchema(**result)
+
+
+@router.get("/runs", response_model=List[schemas.RunSummarySchema])
+def list_runs_endpoint() -> List[schemas.RunSummarySchema]:
+    """Lista las corridas registradas en el diario y cuántas URLs completó cada una."""
+    return [schemas.RunSummarySchema(**run) for run in service.list_runs()]
+
+
+@router.post("/runs/{run_id}/resume", response_model=schemas.ScrapeResponseSchema)
+def resume_run_endpoint(
+    run_id: str,
+    max_concurrency: Optional[int] = Query(None, ge=1, description="Peticiones simultáneas máximas"),
+    profile_service: ProfileService = Depends(get_profile_service),
+) -> schemas.ScrapeResponseSchema:
+    """Reanuda una corrida interrumpida sin volver a scrapear las URLs ya completadas."""
+    try:
+        state = service.get_run(run_id)
+    except RunJournalError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+    profile = profile_service.get(profile_id=state.header["profile_id"], include_tokens=True)
+    try:
+        return schemas.ScrapeResponseSchema(**service.resume_run(run_id, profile, max_concurrency=max_concurrency))
+    except RunFinishedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
+    except (ValueError, RunJournalError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+
+@router.post("/consolidate", response_model=schemas.ConsolidateResponseSchema)
+def consolidate_excel_endpoint(
+    excel_path: str = Query(..., description="Libro lógico cuyas corridas sidecar se deben consolidar"),
+    force: bool = Query(False, description="Reconstruir aunque el consolidado esté al día"),
+) -> schemas.ConsolidateResponseSchema:
+    """Arma el libro consolidado a partir de las corridas guardadas en modo sidecar."""
+    try:
+        return schemas.ConsolidateResponseSchema(**service.consolidate_excel(excel_path, force=force))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+
+
 @router.get("/download")
 def download_excel(
     path: str = Query(..., description="Ruta del archivo Excel a descargar"),
 ) -> FileResponse:
-    """Descarga un archivo Excel generado por el scraping."""
+    """Descarga un archivo Excel (o Parquet/Feather) generado por el scraping."""
     excel_file = Path(path)
     
     # Si la ruta no es absoluta o no existe, buscar en el directorio output
     if not excel_file.is_absolute() or not excel_file.exists():
-        output_dir = Path(__file__).resolve().parents[2] / "output"
+        output_dir = service.OUTPUT_DIR
         excel_file = output_dir / excel_file.name if not excel_file.is_absolute() else excel_file
     
+    # Las salidas sidecar se consolidan bajo demanda al descargarlas
+    if has_parts(excel_file):
+        excel_file = consolidate_workbook(excel_file)
+    
     if not excel_file.exists():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -72,6 +312,9 @@ def download_excel(
     return FileResponse(
         path=str(excel_file),
         filename=excel_file.name,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        media_type=MEDIA_TYPES.get(
+            excel_file.suffix,
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        ),
     )
 
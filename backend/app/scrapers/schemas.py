@@ -1,15 +1,52 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
 
-class ScrapeRequestSchema(BaseModel):
-    urls: List[str] = Field(..., description="Lista de URLs a scrapear")
-    profile_id: int = Field(..., description="ID del perfil con credenciales")
+class ScrapeOptionsSchema(BaseModel):
     excel_path: Optional[str] = Field(None, description="Ruta del archivo Excel (opcional, si no se proporciona se crea uno nuevo)")
     sheet_name: Optional[str] = Field(None, description="Nombre de la hoja (opcional, si no se proporciona se genera automáticamente)")
+    max_concurrency: Optional[int] = Field(None, ge=1, description="Peticiones simultáneas máximas (opcional, por defecto la del perfil o la global)")
+    max_attempts: Optional[int] = Field(None, ge=1, le=10, description="Intentos máximos por URL (opcional, por defecto CRAWLBASE_RETRY_MAX_ATTEMPTS)")
+    scraper_key: Optional[str] = Field(
+        None,
+        description="Esquema de extracción a aplicar (p.ej. amazon-serp); sin él se aplanan los campos genéricamente",
+    )
+    cache_max_age: Optional[int] = Field(
+        None,
+        ge=0,
+        description="Antigüedad máxima en segundos de una respuesta cacheada (opcional, activa la caché; 0 fuerza a refrescar)",
+    )
+    archive: Optional[bool] = Field(
+        None,
+        description="Guardar los cuerpos crudos en el archivo para re-extraerlos sin volver a scrapear (por defecto SCRAPER_ARCHIVE_ENABLED)",
+    )
+    output_mode: Literal["workbook", "sidecar", "parquet", "feather"] = Field(
+        "workbook",
+        description=(
+            "workbook: escribe en el libro indicado; sidecar: guarda la corrida como parte independiente y consolida bajo demanda; "
+            "parquet/feather: archivo columnar (Parquet o Arrow IPC) en la misma ruta, requiere pyarrow"
+        ),
+    )
+
+
+class ScrapeRequestSchema(ScrapeOptionsSchema):
+    urls: List[str] = Field(..., description="Lista de URLs a scrapear")
+    profile_id: int = Field(..., description="ID del perfil con credenciales")
+
+
+class LinkScrapeRequestSchema(ScrapeOptionsSchema):
+    preset_id: Optional[str] = Field(None, description="Preset del link factory que genera las URLs")
+    overrides: Optional[Dict[str, List[str]]] = Field(None, description="Valores personalizados para las variables del preset")
+    project_id: Optional[int] = Field(
+        None,
+        description="Proyecto cuyo link_blueprint ({preset_id, overrides}) y perfil se usan si no se indican",
+    )
+    profile_id: Optional[int] = Field(None, description="ID del perfil con credenciales (por defecto el del proyecto)")
+    shard_index: Optional[int] = Field(None, ge=0, description="Parte de las combinaciones que scrapea este trabajo")
+    shard_count: Optional[int] = Field(None, ge=1, description="Número de partes en que se reparten las combinaciones")
 
 
 class ScrapeResponseSchema(BaseModel):
@@ -20,5 +57,45 @@ class ScrapeResponseSchema(BaseModel):
     excel_path: str
     sheet_name: str
     message: str
-    errors: Optional[List[Dict[str, Any]]] = None
+    errors: Optional[List[Dict[str, Any]]] = Field(
+        None, description="Muestra de los primeros errores (SCRAPER_SUMMARY_MAX_ERRORS); el total está en failed"
+    )
+    run_id: Optional[str] = Field(None, description="Identificador de la corrida para reanudarla si se interrumpe")
+    deduplicated: int = Field(0, description="Filas resueltas reutilizando la respuesta de una URL equivalente")
+
+
+class ConsolidateResponseSchema(BaseModel):
+    excel_path: str
+    sheets: List[str]
+
+
+class RunSummarySchema(BaseModel):
+    run_id: str
+    created_at: Optional[str] = None
+    profile_id: Optional[int] = None
+    total_urls: int
+    completed: int
+    finished: bool
+    excel_path: Optional[str] = None
+
+
+class ExtractionSchemaReadSchema(BaseModel):
+    key: str
+    description: str
+    columns: List[str]
+    params: Dict[str, str]
+
+
+class ArchiveExtractRequestSchema(BaseModel):
+    urls: Optional[List[str]] = Field(None, description="URLs a re-extraer (opcional, por defecto todo el archivo)")
+    scraper_key: Optional[str] = Field(None, description="Esquema de extracción a aplicar sobre los cuerpos archivados")
+    excel_path: Optional[str] = Field(None, description="Ruta del archivo de salida (opcional)")
+    sheet_name: Optional[str] = Field(None, description="Nombre de la hoja (opcional)")
+    output_mode: Literal["workbook", "sidecar", "parquet", "feather"] = Field("workbook")
+
 
+class ArchiveStatsSchema(BaseModel):
+    entries: int
+    capacity: int
+    segments: int
+    bytes: int
@@ -1,26 +1,54 @@
 from __future__ import annotations
 
-import json
 import logging
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from time import monotonic
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
 
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, PatternFill
-from openpyxl.utils import get_column_letter
-
-from app.crawlbase.client import CrawlbaseClient, CrawlbaseClientError
+from app.core.config import settings
+from app.crawlbase.cache import ResponseCache, get_response_cache
+from app.crawlbase.client import CrawlbaseClient, CrawlbaseClientError, CrawlbaseTransportError
+from app.crawlbase.retry import RetryPolicy
+from app.link_factory.service import LinkFactoryError, LinkSet, generate_links
 from app.profiles.schemas import ProfileReadSchema
+from app.scrapers.archive import ArchivedResponse, ArchiveError, ResponseArchive, open_archive
+from app.scrapers.columnar import COLUMNAR_FORMATS, ColumnarWriter
+from app.scrapers.excel import StreamingExcelWriter, WorkbookAppendWriter
+from app.scrapers.extraction import extract_html_metadata
+from app.scrapers.extractors import CompiledSchema, get_schema
+from app.scrapers.journal import JournalEntry, RunFinishedError, RunJournal, RunState, load_run, prune_runs
+from app.scrapers.journal import list_runs as list_journal_runs
+from app.scrapers.sidecar import SidecarRunWriter, consolidate_workbook, has_parts, load_manifest
+from app.scrapers.urls import find_duplicates
 
 logger = logging.getLogger(__name__)
 
+OUTPUT_DIR = Path(__file__).resolve().parents[2] / "output"
+
+# Columnas comunes a toda fila de resultado cuando se usa un esquema de extracción
+RESULT_COLUMNS = ["url", "success", "status_code", "error", "attempts", "latency_ms"]
+
+# Origen de las URLs de una corrida: una lista ya validada o enlaces generados bajo demanda
+UrlSource = Union[List[str], LinkSet]
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def scrape_url(client: CrawlbaseClient, url: str, params: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Scrapea una URL usando Crawlbase API.
 
-def scrape_url(client: CrawlbaseClient, url: str) -> Dict[str, Any]:
-    """Scrapea una URL usando Crawlbase API."""
+    Los reintentos los aplica la ``RetryPolicy`` del cliente; el resultado registra el número
+    de intentos y la latencia acumulada (incluidas las esperas de backoff). ``params`` se
+    añade a la petición (p.ej. ``scraper`` para los esquemas de extracción).
+    """
+    started = monotonic()
     try:
         # Usar el endpoint de crawling API
-        response = client.get("/", params={"url": url})
+        response = client.get("/", params={"url": url, **(params or {})})
         
         return {
             "url": url,
@@ -29,31 +57,123 @@ def scrape_url(client: CrawlbaseClient, url: str) -> Dict[str, Any]:
             "data": response.data,
             "headers": response.headers,
             "error": None,
+            "attempts": response.attempts,
+            "latency_ms": _elapsed_ms(started),
+            "cached": response.cached,
         }
+    except CrawlbaseTransportError as e:
+        logger.error(f"Error de red al scrapear {url}: {e}")
+        return _failed_result(url, str(e), attempts=e.attempts, latency_ms=_elapsed_ms(started))
     except CrawlbaseClientError as e:
         logger.error(f"Error de Crawlbase al scrapear {url}: {e}")
-        return {
-            "url": url,
-            "success": False,
-            "status_code": None,
-            "data": None,
-            "headers": {},
-            "error": str(e),
-        }
+        return _failed_result(url, str(e), latency_ms=_elapsed_ms(started))
     except Exception as e:
         logger.error(f"Error inesperado al scrapear {url}: {e}")
-        return {
-            "url": url,
-            "success": False,
-            "status_code": None,
-            "data": None,
-            "headers": {},
-            "error": str(e),
-        }
+        return _failed_result(url, str(e), latency_ms=_elapsed_ms(started))
+
+
+def _elapsed_ms(started: float) -> int:
+    return int((monotonic() - started) * 1000)
+
+
+def _failed_result(url: str, error: str, attempts: int = 1, latency_ms: int = 0) -> Dict[str, Any]:
+    return {
+        "url": url,
+        "success": False,
+        "status_code": None,
+        "data": None,
+        "headers": {},
+        "error": error,
+        "attempts": attempts,
+        "latency_ms": latency_ms,
+    }
+
+
+def build_retry_policy(max_attempts: Optional[int] = None) -> Optional[RetryPolicy]:
+    """Política de la configuración con ``max_attempts`` sobrescrito, o ``None`` para la por defecto."""
+    return RetryPolicy.from_settings(max_attempts=max_attempts) if max_attempts else None
+
+
+def _resolve_cache(cache_max_age: Optional[float] = None) -> Optional[ResponseCache]:
+    """Caché de respuestas si está activada globalmente o la petición fija un ``max_age``."""
+    if settings.crawlbase_cache_enabled or cache_max_age is not None:
+        return get_response_cache()
+    return None
 
 
-def _extract_data_from_response(scrape_result: Dict[str, Any]) -> Dict[str, Any]:
-    """Extrae datos estructurados de la respuesta de Crawlbase."""
+def _resolve_archive(archive: Optional[bool] = None) -> Optional[ResponseArchive]:
+    """Archivo de cuerpos crudos si la petición lo pide o, sin indicarlo, si está activado globalmente."""
+    enabled = settings.scraper_archive_enabled if archive is None else archive
+    return get_archive() if enabled else None
+
+
+def get_archive() -> ResponseArchive:
+    return open_archive(Path(settings.scraper_archive_dir), segment_max_bytes=settings.scraper_archive_segment_bytes)
+
+
+def _resolve_schema(scraper_key: Optional[str] = None) -> Optional[CompiledSchema]:
+    if not scraper_key:
+        return None
+    schema = get_schema(scraper_key)
+    if schema is None:
+        logger.warning(f"No hay esquema de extracción para {scraper_key}; se usará la extracción genérica")
+    return schema
+
+
+def _resolve_max_concurrency(profile: ProfileReadSchema, requested: Optional[int] = None) -> int:
+    """Determina cuántas peticiones simultáneas se permiten para el perfil.
+
+    Prioridad: valor explícito de la petición, ``max_concurrency`` en los metadatos
+    del perfil y, por último, ``SCRAPER_MAX_CONCURRENCY``. El resultado siempre queda
+    acotado por ``SCRAPER_MAX_CONCURRENCY_LIMIT``.
+    """
+    value: Any = requested
+    if not value and profile.metadata:
+        value = profile.metadata.get("max_concurrency")
+    if not value:
+        value = settings.scraper_max_concurrency
+    try:
+        concurrency = int(value)
+    except (TypeError, ValueError):
+        concurrency = settings.scraper_max_concurrency
+    return max(1, min(concurrency, settings.scraper_max_concurrency_limit))
+
+
+def _iter_in_order(func: Callable[[T], R], items: Iterable[T], max_in_flight: int) -> Iterator[R]:
+    """Aplica ``func`` sobre ``items`` con un pool acotado y entrega los resultados en orden.
+
+    Solo se encolan ``2 * max_in_flight`` tareas por delante del resultado que se está
+    consumiendo, de modo que la memoria no crece con el tamaño del lote.
+    """
+    if max_in_flight <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    window = max_in_flight * 2
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="scraper") as executor:
+        pending: Deque[Future[R]] = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _extract_data_from_response(
+    scrape_result: Dict[str, Any],
+    schema: Optional[CompiledSchema] = None,
+) -> Dict[str, Any]:
+    """Extrae datos estructurados de la respuesta de Crawlbase.
+
+    Con un ``schema`` las columnas son las declaradas por el esquema (tipadas); sin él se
+    aplanan genéricamente los campos de la respuesta.
+    """
     data = scrape_result.get("data", {})
     
     # Información básica
@@ -62,7 +182,13 @@ def _extract_data_from_response(scrape_result: Dict[str, Any]) -> Dict[str, Any]
         "status_code": scrape_result.get("status_code", ""),
         "success": scrape_result.get("success", False),
         "error": scrape_result.get("error"),
+        "attempts": scrape_result.get("attempts", 1),
+        "latency_ms": scrape_result.get("latency_ms", ""),
     }
+    if schema is not None:
+        if scrape_result.get("success"):
+            extracted.update(schema.apply(data, url=extracted["url"]))
+        return extracted
     
     # Extraer información adicional de headers si están disponibles
     headers = scrape_result.get("headers", {})
@@ -73,19 +199,13 @@ def _extract_data_from_response(scrape_result: Dict[str, Any]) -> Dict[str, Any]
     # Procesar el cuerpo de la respuesta
     if isinstance(data, dict):
         if "body" in data:
-            # Es HTML, extraer información básica
-            body = str(data.get("body", ""))
+            # Es HTML: metadatos en una pasada sobre el cuerpo, sin copiarlo
+            body = data.get("body") or ""
+            if not isinstance(body, str):
+                body = str(body)
             extracted["content_type"] = extracted.get("content_type", "text/html")
             extracted["content_length"] = len(body)
-            # Intentar extraer título si es HTML
-            if "<title>" in body:
-                try:
-                    title_start = body.find("<title>") + 7
-                    title_end = body.find("</title>", title_start)
-                    if title_end > title_start:
-                        extracted["page_title"] = body[title_start:title_end].strip()[:200]
-                except:
-                    pass
+            extracted.update(extract_html_metadata(body, base_url=extracted["url"]))
         else:
             # Es JSON, agregar campos relevantes
             for key, value in data.items():
@@ -98,31 +218,17 @@ def _extract_data_from_response(scrape_result: Dict[str, Any]) -> Dict[str, Any]
     return extracted
 
 
-def save_to_excel(
-    results: List[Dict[str, Any]],
-    excel_path: Optional[str] = None,
-    sheet_name: Optional[str] = None,
-) -> tuple[str, str]:
-    """Guarda los resultados del scraping en un archivo Excel.
-    
-    Args:
-        results: Lista de resultados del scraping
-        excel_path: Ruta del archivo Excel (si existe, se agrega una hoja; si no, se crea)
-        sheet_name: Nombre de la hoja (si no se proporciona, se genera automáticamente)
-    
-    Returns:
-        Tupla con (ruta_absoluta_del_excel, nombre_de_la_hoja)
-    """
+def _resolve_sheet_name(sheet_name: Optional[str] = None) -> str:
     # Generar nombre de hoja si no se proporciona
     if not sheet_name:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         sheet_name = f"Scraping_{timestamp}"
-    
-    # Limpiar nombre de hoja (Excel tiene límites)
-    sheet_name = sheet_name[:31]  # Excel limita a 31 caracteres
-    
-    # Determinar ruta del archivo
-    output_dir = Path(__file__).resolve().parents[2] / "output"
+    # Limpiar nombre de hoja (Excel limita a 31 caracteres)
+    return sheet_name[:31]
+
+
+def _resolve_excel_file(excel_path: Optional[str] = None) -> Path:
+    output_dir = OUTPUT_DIR
     output_dir.mkdir(exist_ok=True)
     
     if excel_path:
@@ -134,89 +240,85 @@ def save_to_excel(
         # Si no existe, crear en output_dir
         if not excel_file.exists() and excel_file.parent != output_dir:
             excel_file = output_dir / excel_file.name
-    else:
-        # Crear nuevo archivo
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        excel_file = output_dir / f"scraping_{timestamp}.xlsx"
-    
-    # Cargar o crear workbook
+        return excel_file
+
+    # Crear nuevo archivo
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return output_dir / f"scraping_{timestamp}.xlsx"
+
+
+def open_result_writer(
+    excel_path: Optional[str] = None,
+    sheet_name: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    output_mode: str = "workbook",
+    keep_types: bool = False,
+    run_id: Optional[str] = None,
+) -> StreamingExcelWriter | WorkbookAppendWriter | SidecarRunWriter | ColumnarWriter:
+    """Abre el destino Excel de una corrida.
+
+    Con ``output_mode="sidecar"`` la corrida se escribe como parte independiente del libro
+    lógico (ver ``app.scrapers.sidecar``); ``run_id`` permite que una reanudación reescriba
+    la parte de su corrida. En modo ``workbook`` los libros nuevos se escriben
+    en streaming (``write_only``) y si ``excel_path`` ya existe se agrega una hoja con
+    ``WorkbookAppendWriter``, que no tiene memoria acotada: retiene todas las filas de la
+    corrida y al cerrar recarga el libro completo. Para corridas grandes sobre un libro
+    existente conviene ``sidecar``. Los modos
+    ``parquet`` y ``feather`` escriben un archivo columnar junto a ``excel_path`` (misma
+    ruta con la extensión del formato), reemplazándolo si ya existe.
+    """
+    excel_file = _resolve_excel_file(excel_path)
+    final_sheet_name = _resolve_sheet_name(sheet_name)
+    if output_mode in COLUMNAR_FORMATS:
+        return ColumnarWriter(
+            excel_file.with_suffix(COLUMNAR_FORMATS[output_mode]),
+            final_sheet_name,
+            export_format=output_mode,
+            columns=columns,
+            keep_types=keep_types,
+        )
+    if output_mode == "sidecar":
+        return SidecarRunWriter(excel_file, final_sheet_name, columns=columns, keep_types=keep_types, run_id=run_id)
+    if output_mode != "workbook":
+        raise ValueError(f"Modo de salida no soportado: {output_mode}")
     if excel_file.exists():
-        wb = load_workbook(excel_file)
-        # Verificar si la hoja ya existe
-        if sheet_name in wb.sheetnames:
-            # Agregar sufijo numérico
-            counter = 1
-            original_name = sheet_name
-            while sheet_name in wb.sheetnames:
-                sheet_name = f"{original_name}_{counter}"
-                counter += 1
-    else:
-        wb = Workbook()
-        # Eliminar hoja por defecto si existe
-        if "Sheet" in wb.sheetnames:
-            wb.remove(wb["Sheet"])
-    
-    # Crear nueva hoja
-    ws = wb.create_sheet(sheet_name)
-    
-    # Preparar datos para Excel
-    if not results:
-        # Hoja vacía con headers
-        headers = ["URL", "Estado", "Código de Estado", "Error"]
-        ws.append(headers)
-    else:
-        # Extraer todas las claves únicas de los resultados
-        all_keys = set()
-        for result in results:
-            extracted = _extract_data_from_response(result)
-            all_keys.update(extracted.keys())
-        
-        # Ordenar claves (URL primero, luego el resto alfabéticamente)
-        sorted_keys = ["url", "success", "status_code", "error"]
-        for key in sorted(all_keys):
-            if key not in sorted_keys:
-                sorted_keys.append(key)
-        
-        # Escribir headers
-        ws.append(sorted_keys)
-        
-        # Escribir datos
-        for result in results:
-            extracted = _extract_data_from_response(result)
-            row = [extracted.get(key, "") for key in sorted_keys]
-            # Convertir objetos complejos a JSON string
-            row = [
-                json.dumps(cell) if isinstance(cell, (dict, list)) else str(cell)
-                for cell in row
-            ]
-            ws.append(row)
-    
-    # Formatear headers
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    
-    for cell in ws[1]:
-        cell.fill = header_fill
-        cell.font = header_font
-    
-    # Ajustar ancho de columnas
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+        return WorkbookAppendWriter(excel_file, final_sheet_name, columns=columns, keep_types=keep_types)
+    return StreamingExcelWriter(excel_file, final_sheet_name, columns=columns, keep_types=keep_types)
+
+
+def save_to_excel(
+    results: Iterable[Dict[str, Any]],
+    excel_path: Optional[str] = None,
+    sheet_name: Optional[str] = None,
+) -> tuple[str, str]:
+    """Guarda los resultados del scraping en un archivo Excel.
     
-    # Guardar archivo
-    wb.save(excel_file)
-    logger.info(f"Excel guardado en: {excel_file.absolute()}")
+    Args:
+        results: Resultados del scraping (cualquier iterable, se consume una sola vez)
+        excel_path: Ruta del archivo Excel (si existe, se agrega una hoja; si no, se crea)
+        sheet_name: Nombre de la hoja (si no se proporciona, se genera automáticamente)
     
-    return str(excel_file.absolute()), sheet_name
+    Returns:
+        Tupla con (ruta_absoluta_del_excel, nombre_de_la_hoja)
+    """
+    writer = open_result_writer(excel_path, sheet_name)
+    for result in results:
+        writer.write_row(_extract_data_from_response(result))
+    return writer.close()
+
+
+def consolidate_excel(excel_path: str, force: bool = False) -> Dict[str, Any]:
+    """Arma el libro consolidado de una salida ``sidecar``.
+
+    Returns:
+        Diccionario con la ruta absoluta del libro y las hojas que contiene
+    """
+    excel_file = _resolve_excel_file(excel_path)
+    if not has_parts(excel_file):
+        raise FileNotFoundError(f"No hay corridas sidecar para {excel_file}")
+    consolidated = consolidate_workbook(excel_file, force=force)
+    sheets = [name for part in load_manifest(excel_file)["parts"] if part["status"] == "done" for name in part["sheets"]]
+    return {"excel_path": str(consolidated.absolute()), "sheets": sheets}
 
 
 def scrape_urls(
@@ -224,12 +326,64 @@ def scrape_urls(
     profile: ProfileReadSchema,
     excel_path: Optional[str] = None,
     sheet_name: Optional[str] = None,
+    max_concurrency: Optional[int] = None,
+    output_mode: str = "workbook",
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    cache_max_age: Optional[float] = None,
+    scraper_key: Optional[str] = None,
+    archive: Optional[bool] = None,
 ) -> Dict[str, Any]:
     """Scrapea múltiples URLs y guarda los resultados en Excel.
+
+    Las URLs se procesan con un pool de hilos acotado (ver ``_resolve_max_concurrency``)
+    que comparte un único ``CrawlbaseClient``; los resultados conservan el orden de entrada.
+    ``on_progress`` recibe los contadores (total, processed, successful, failed) tras cada URL.
+    ``cache_max_age`` (segundos) activa la caché de respuestas para esta corrida aunque
+    ``CRAWLBASE_CACHE_ENABLED`` esté apagado; ``0`` fuerza a refrescar todas las URLs.
+    ``scraper_key`` selecciona un esquema de extracción (``app.scrapers.extractors``) que
+    fija columnas tipadas para el Excel. ``archive`` guarda el cuerpo crudo de cada respuesta
+    exitosa en el archivo de ``app.scrapers.archive`` (por defecto ``SCRAPER_ARCHIVE_ENABLED``)
+    para re-extraerlo después con ``extract_archive``.
     
     Returns:
         Diccionario con información del resultado del scraping
     """
+    return _drain(iter_scrape_events(
+        urls=urls,
+        profile=profile,
+        excel_path=excel_path,
+        sheet_name=sheet_name,
+        max_concurrency=max_concurrency,
+        output_mode=output_mode,
+        on_progress=on_progress,
+        retry_policy=retry_policy,
+        cache_max_age=cache_max_age,
+        scraper_key=scraper_key,
+        archive=archive,
+    ))
+
+
+def iter_scrape_events(
+    urls: List[str],
+    profile: ProfileReadSchema,
+    excel_path: Optional[str] = None,
+    sheet_name: Optional[str] = None,
+    max_concurrency: Optional[int] = None,
+    output_mode: str = "workbook",
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    cache_max_age: Optional[float] = None,
+    scraper_key: Optional[str] = None,
+    archive: Optional[bool] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Variante en streaming de ``scrape_urls``: genera los eventos de la corrida según ocurren.
+
+    Emite un evento ``start`` (tras validar la petición), un ``result`` por URL en orden de
+    entrada con la fila extraída y los contadores, y un ``summary`` final con el mismo
+    contenido que devuelve ``scrape_urls``. Si el consumidor abandona el generador, la
+    corrida queda a medias en el diario y puede reanudarse.
+    """
     if not profile.tokens:
         raise ValueError("El perfil no tiene tokens asociados")
     
@@ -252,58 +406,449 @@ def scrape_urls(
     if invalid_urls:
         logger.warning(f"Se encontraron {len(invalid_urls)} URLs inválidas que serán ignoradas")
     
-    results: List[Dict[str, Any]] = []
+    yield from _start_run(
+        valid_urls,
+        {"urls": valid_urls},
+        profile,
+        excel_path=excel_path,
+        sheet_name=sheet_name,
+        max_concurrency=max_concurrency,
+        output_mode=output_mode,
+        on_progress=on_progress,
+        retry_policy=retry_policy,
+        cache_max_age=cache_max_age,
+        scraper_key=scraper_key,
+        archive=archive,
+    )
+
+
+def scrape_links(
+    preset_id: str,
+    profile: ProfileReadSchema,
+    overrides: Optional[Dict[str, List[str]]] = None,
+    excel_path: Optional[str] = None,
+    sheet_name: Optional[str] = None,
+    max_concurrency: Optional[int] = None,
+    output_mode: str = "workbook",
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    cache_max_age: Optional[float] = None,
+    scraper_key: Optional[str] = None,
+    archive: Optional[bool] = None,
+    shard: Optional[Tuple[int, int]] = None,
+) -> Dict[str, Any]:
+    """Scrapea los enlaces de un preset del link factory sin materializar la lista.
+
+    Los enlaces se generan bajo demanda y el pool solo adelanta ``2 * concurrencia`` URLs
+    sobre la fila que se está escribiendo, así que la memoria no depende del número de
+    combinaciones. El diario guarda el preset y los overrides en lugar de las URLs; al
+    reanudar se regeneran en el mismo orden. Sin ``scraper_key`` se usa el del preset si
+    tiene esquema de extracción. Con ``shard=(índice, total)`` solo se scrapea esa parte de
+    las combinaciones (ver ``LinkSet.partition``) y el archivo de salida lleva el sufijo
+    ``_partNofM`` para que los workers no escriban en el mismo libro.
+    """
+    if not profile.tokens:
+        raise ValueError("El perfil no tiene tokens asociados")
+    link_source: Dict[str, Any] = {"preset_id": preset_id, "overrides": overrides or {}}
+    if shard is not None:
+        link_source["shard"] = list(shard)
+        excel_path = _shard_excel_path(excel_path, *shard)
+    source = {"link_source": link_source}
+    links, deduplicate = _resolve_source(source)
+    if not len(links):
+        raise ValueError("El preset no generó enlaces para scrapear")
+    if scraper_key is None and get_schema(links.preset.scraper_key) is not None:
+        scraper_key = links.preset.scraper_key
+
+    return _drain(_start_run(
+        links,
+        {**source, "total_urls": len(links)},
+        profile,
+        excel_path=excel_path,
+        sheet_name=sheet_name,
+        max_concurrency=max_concurrency,
+        output_mode=output_mode,
+        on_progress=on_progress,
+        retry_policy=retry_policy,
+        cache_max_age=cache_max_age,
+        scraper_key=scraper_key,
+        archive=archive,
+        deduplicate=deduplicate,
+    ))
+
+
+def _start_run(
+    urls: UrlSource,
+    source: Dict[str, Any],
+    profile: ProfileReadSchema,
+    excel_path: Optional[str],
+    sheet_name: Optional[str],
+    max_concurrency: Optional[int],
+    output_mode: str,
+    on_progress: Optional[Callable[[Dict[str, int]], None]],
+    retry_policy: Optional[RetryPolicy],
+    cache_max_age: Optional[float],
+    scraper_key: Optional[str],
+    archive: Optional[bool],
+    deduplicate: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """Registra la corrida en el diario (con ``source`` para poder reconstruir sus URLs) y la ejecuta."""
+    excel_file = _resolve_excel_file(excel_path)
+    final_sheet_name = _resolve_sheet_name(sheet_name)
+    journal = None
+    if settings.scraper_journal_enabled:
+        prune_runs(_runs_dir(), settings.scraper_journal_max_runs, settings.scraper_journal_retention_days)
+        journal = RunJournal.create(
+            _runs_dir(),
+            header={
+                "profile_id": profile.id,
+                **source,
+                "excel_path": str(excel_file),
+                "sheet_name": final_sheet_name,
+                "output_mode": output_mode,
+                "max_concurrency": max_concurrency,
+                "max_attempts": retry_policy.max_attempts if retry_policy else None,
+                "cache_max_age": cache_max_age,
+                "scraper_key": scraper_key,
+                "archive": archive,
+            },
+        )
+
+    yield from _run_events(
+        urls,
+        profile,
+        excel_path=str(excel_file),
+        sheet_name=final_sheet_name,
+        output_mode=output_mode,
+        concurrency=_resolve_max_concurrency(profile, max_concurrency),
+        retry_policy=retry_policy,
+        cache_max_age=cache_max_age,
+        schema=_resolve_schema(scraper_key),
+        archive=_resolve_archive(archive),
+        on_progress=on_progress,
+        journal=journal,
+        deduplicate=deduplicate,
+    )
+
+
+def _shard_excel_path(excel_path: Optional[str], index: int, count: int) -> Optional[str]:
+    if count <= 1:
+        return excel_path
+    base = Path(excel_path or _resolve_excel_file().name)
+    width = len(str(count))
+    return str(base.with_name(f"{base.stem}_part{index + 1:0{width}d}of{count}{base.suffix or '.xlsx'}"))
+
+
+def _resolve_source(header: Dict[str, Any]) -> tuple[UrlSource, bool]:
+    """URLs de una corrida a partir de su cabecera y si conviene buscar duplicados entre ellas."""
+    link_source = header.get("link_source")
+    if not link_source:
+        return header["urls"], True
+    shard = link_source.get("shard")
+    try:
+        _, links = generate_links(
+            link_source["preset_id"],
+            overrides=link_source.get("overrides"),
+            shard=tuple(shard) if shard else None,
+        )
+    except KeyError as e:
+        raise ValueError(str(e.args[0]) if e.args else str(e)) from e
+    except LinkFactoryError as e:
+        raise ValueError(str(e)) from e
+    # Con un patrón inyectivo los enlaces ya son distintos: no hace falta indexarlos todos
+    return links, not links.unique
+
+
+def resume_run(
+    run_id: str,
+    profile: ProfileReadSchema,
+    max_concurrency: Optional[int] = None,
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+) -> Dict[str, Any]:
+    """Reanuda una corrida interrumpida a partir de su diario.
+
+    Las URLs ya registradas no se vuelven a pedir; sus filas se toman del diario y se
+    combinan en orden con las nuevas al regenerar el Excel de la corrida.
+    """
+    state = get_run(run_id)
+    if state.finished:
+        raise RunFinishedError(f"La corrida {run_id} ya terminó")
+
+    header = state.header
+    urls, deduplicate = _resolve_source(header)
+    logger.info(f"Reanudando corrida {run_id}: {len(state.completed)}/{len(urls)} URLs ya completadas")
+    return _drain(_run_events(
+        urls,
+        profile,
+        excel_path=header["excel_path"],
+        sheet_name=header["sheet_name"],
+        output_mode=header.get("output_mode", "workbook"),
+        concurrency=_resolve_max_concurrency(profile, max_concurrency or header.get("max_concurrency")),
+        retry_policy=build_retry_policy(header.get("max_attempts")),
+        cache_max_age=header.get("cache_max_age"),
+        schema=_resolve_schema(header.get("scraper_key")),
+        archive=_resolve_archive(header.get("archive")),
+        on_progress=on_progress,
+        journal=RunJournal.reopen(_runs_dir(), run_id),
+        completed=state.completed,
+        deduplicate=deduplicate,
+    ))
+
+
+def extract_archive(
+    urls: Optional[List[str]] = None,
+    excel_path: Optional[str] = None,
+    sheet_name: Optional[str] = None,
+    output_mode: str = "workbook",
+    scraper_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Vuelve a extraer filas desde el archivo de cuerpos crudos, sin hacer peticiones.
+
+    Con ``urls`` se buscan solo esas URLs (en ese orden, O(1) cada una en el índice); sin
+    ellas se recorre el archivo completo en orden de almacenamiento. Las URLs que no estén
+    archivadas se reportan en ``errors``.
+    """
+    archive = get_archive()
+    schema = _resolve_schema(scraper_key)
+    writer = open_result_writer(
+        excel_path,
+        sheet_name,
+        columns=RESULT_COLUMNS + schema.columns if schema else None,
+        output_mode=output_mode,
+        keep_types=schema is not None,
+    )
     errors: List[Dict[str, Any]] = []
+    total = 0
+    if urls is None:
+        found: Iterable[tuple[str, Optional[ArchivedResponse]]] = (
+            (response.url, response) for response in archive.iter_responses()
+        )
+    else:
+        found = ((url, archive.get(url)) for url in urls)
+    for url, response in found:
+        total += 1
+        if response is None:
+            errors.append({"url": url, "error": "URL no archivada"})
+            continue
+        result = {
+            "url": response.url,
+            "success": response.status_code == 200,
+            "status_code": response.status_code,
+            "data": response.data,
+            "headers": response.headers,
+            "error": None,
+            "attempts": 0,
+            "latency_ms": 0,
+        }
+        writer.write_row(_extract_data_from_response(result, schema=schema))
+    excel_file, final_sheet_name = writer.close()
+    extracted = total - len(errors)
+    return {
+        "success": True,
+        "total_urls": total,
+        "successful": extracted,
+        "failed": len(errors),
+        "excel_path": excel_file,
+        "sheet_name": final_sheet_name,
+        "message": f"Re-extracción completada: {extracted} respuestas archivadas, {len(errors)} no encontradas",
+        "errors": errors if errors else None,
+    }
+
+
+def get_run(run_id: str) -> RunState:
+    return load_run(_runs_dir(), run_id)
+
+
+def list_runs() -> List[Dict[str, Any]]:
+    return list_journal_runs(_runs_dir())
+
+
+def _fan_out(entry: JournalEntry, index: int, url: str) -> JournalEntry:
+    """Copia el resultado de la primera aparición para una URL duplicada, conservando su texto original."""
+    return JournalEntry(index=index, success=entry.success, error=entry.error, row={**entry.row, "url": url})
+
+
+def _archive_result(archive: ResponseArchive, result: Dict[str, Any]) -> None:
+    # Una respuesta servida desde la caché ya se archivó cuando se pidió por primera vez
+    if result.get("cached") and result["url"] in archive:
+        return
+    try:
+        archive.put(result["url"], result["status_code"], result["data"], result.get("headers"))
+    except (OSError, ArchiveError, TypeError, ValueError) as e:
+        logger.error(f"No se pudo archivar la respuesta de {result['url']}: {e}")
+
+
+def _runs_dir() -> Path:
+    return OUTPUT_DIR / "runs"
+
+
+def _drain(events: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+    """Consume los eventos de una corrida y devuelve su resumen."""
+    summary: Dict[str, Any] = {}
+    for event in events:
+        if event["type"] == "summary":
+            summary = {key: value for key, value in event.items() if key != "type"}
+    return summary
+
+
+def _run_events(
+    urls: UrlSource,
+    profile: ProfileReadSchema,
+    excel_path: str,
+    sheet_name: str,
+    output_mode: str,
+    concurrency: int,
+    retry_policy: Optional[RetryPolicy],
+    on_progress: Optional[Callable[[Dict[str, int]], None]],
+    journal: Optional[RunJournal],
+    cache_max_age: Optional[float] = None,
+    schema: Optional[CompiledSchema] = None,
+    archive: Optional[ResponseArchive] = None,
+    completed: Optional[Dict[int, JournalEntry]] = None,
+    deduplicate: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    completed = completed or {}
+    errors: List[Dict[str, Any]] = []
+    successful = 0
+    processed = 0
+    total = len(urls)
+    # Las repeticiones no se piden: reutilizan la entrada de su primera aparición
+    duplicates = find_duplicates(urls) if settings.scraper_deduplicate_urls and deduplicate else {}
+    remaining_copies = Counter(duplicates.values())
+    shared: Dict[int, JournalEntry] = {}
+    if duplicates:
+        logger.info(f"{len(duplicates)} URLs duplicadas se resolverán con una sola petición")
     
     try:
-        with CrawlbaseClient(profile=profile) as client:
-            for i, url in enumerate(valid_urls, 1):
-                logger.info(f"Scrapeando URL {i}/{len(valid_urls)}: {url}")
-                try:
-                    result = scrape_url(client, url)
-                    results.append(result)
-                    
-                    if not result["success"]:
-                        errors.append({
-                            "url": url,
-                            "error": result.get("error", "Error desconocido"),
-                        })
-                except Exception as e:
-                    logger.error(f"Error inesperado scrapeando {url}: {e}")
-                    results.append({
-                        "url": url,
-                        "success": False,
-                        "status_code": None,
-                        "data": None,
-                        "headers": {},
-                        "error": str(e),
-                    })
-                    errors.append({
-                        "url": url,
-                        "error": str(e),
-                    })
+        writer = open_result_writer(
+            excel_path,
+            sheet_name,
+            columns=RESULT_COLUMNS + schema.columns if schema else None,
+            output_mode=output_mode,
+            keep_types=schema is not None,
+            run_id=journal.run_id if journal else None,
+        )
+    except ValueError:
+        if journal:
+            journal.close()
+        raise
     except Exception as e:
-        logger.error(f"Error crítico durante el scraping: {e}")
-        raise ValueError(f"Error durante el scraping: {str(e)}")
-    
-    # Guardar en Excel
+        if journal:
+            journal.close()
+        logger.error(f"Error preparando el Excel: {e}")
+        raise ValueError(f"Error guardando resultados en Excel: {str(e)}") from e
+
+    run_id = journal.run_id if journal else None
     try:
-        excel_file, final_sheet_name = save_to_excel(results, excel_path, sheet_name)
-        
-        successful = sum(1 for r in results if r["success"])
-        failed = len(results) - successful
-        
-        return {
+        yield {
+            "type": "start",
+            "run_id": run_id,
+            "total_urls": total,
+            "pending": total - len(completed),
+            "deduplicated": len(duplicates),
+        }
+        try:
+            with CrawlbaseClient(
+                profile=profile,
+                retry_policy=retry_policy,
+                cache=_resolve_cache(cache_max_age),
+                cache_max_age=cache_max_age,
+            ) as client:
+                def fetch(item: tuple[int, str]) -> JournalEntry:
+                    index, url = item
+                    logger.info(f"Scrapeando URL {index + 1}/{total}: {url}")
+                    try:
+                        if url.startswith(("http://", "https://")):
+                            result = scrape_url(client, url, params=schema.params if schema else None)
+                        else:
+                            # Solo ocurre con enlaces generados, que no se validan por adelantado
+                            result = _failed_result(url, "URL inválida")
+                    except Exception as e:
+                        logger.error(f"Error inesperado scrapeando {url}: {e}")
+                        result = _failed_result(url, str(e))
+                    if archive is not None and result["success"]:
+                        _archive_result(archive, result)
+                    entry = JournalEntry(
+                        index=index,
+                        success=bool(result["success"]),
+                        error=None if result["success"] else result.get("error") or "Error desconocido",
+                        row=_extract_data_from_response(result, schema=schema),
+                    )
+                    # Se registra al terminar cada URL, sin esperar a que llegue su turno de escritura
+                    if journal:
+                        journal.record(entry.index, entry.success, entry.error, entry.row)
+                    return entry
+
+                pending = (
+                    (index, url)
+                    for index, url in enumerate(urls)
+                    if index not in completed and index not in duplicates
+                )
+                fetched = _iter_in_order(fetch, pending, concurrency)
+                # Segunda pasada sobre el origen: las URLs se regeneran en lugar de guardarse
+                for index, url in enumerate(urls):
+                    source = duplicates.get(index)
+                    if source is None:
+                        entry = completed.get(index) or next(fetched)
+                        if remaining_copies.get(index):
+                            shared[index] = entry
+                    else:
+                        entry = _fan_out(shared[source], index, url)
+                        remaining_copies[source] -= 1
+                        if not remaining_copies[source]:
+                            del shared[source]
+                    # Cada fila se vuelca al Excel en cuanto llega, sin acumular cuerpos
+                    writer.write_row(entry.row)
+                    processed += 1
+                    if entry.success:
+                        successful += 1
+                    elif len(errors) < settings.scraper_summary_max_errors:
+                        # Solo una muestra: cada error ya sale en su evento ``result`` y en el diario
+                        errors.append({"url": entry.row.get("url", url), "error": entry.error})
+                    progress = {
+                        "total": total,
+                        "processed": processed,
+                        "successful": successful,
+                        "failed": processed - successful,
+                    }
+                    if on_progress:
+                        on_progress(progress)
+                    yield {
+                        "type": "result",
+                        "index": index,
+                        "success": entry.success,
+                        "error": entry.error,
+                        "row": entry.row,
+                        "progress": progress,
+                    }
+        except Exception as e:
+            logger.error(f"Error crítico durante el scraping: {e}")
+            raise ValueError(f"Error durante el scraping: {str(e)}") from e
+
+        # Guardar en Excel
+        try:
+            excel_file, final_sheet_name = writer.close()
+        except Exception as e:
+            logger.error(f"Error guardando en Excel: {e}")
+            raise ValueError(f"Error guardando resultados en Excel: {str(e)}") from e
+
+        failed = processed - successful
+        if journal:
+            journal.finish({"excel_path": excel_file, "sheet_name": final_sheet_name, "successful": successful, "failed": failed})
+        yield {
+            "type": "summary",
             "success": True,
-            "total_urls": len(valid_urls),
+            "total_urls": total,
             "successful": successful,
             "failed": failed,
             "excel_path": excel_file,
             "sheet_name": final_sheet_name,
             "message": f"Scraping completado: {successful} exitosos, {failed} fallidos",
             "errors": errors if errors else None,
+            "run_id": run_id,
+            "deduplicated": len(duplicates),
         }
-    except Exception as e:
-        logger.error(f"Error guardando en Excel: {e}")
-        raise ValueError(f"Error guardando resultados en Excel: {str(e)}")
-
+    finally:
+        # También si el consumidor corta el stream: lo registrado queda en disco para reanudar
+        if journal:
+            journal.close()
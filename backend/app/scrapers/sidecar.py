@@ -0,0 +1,242 @@
+"""Salida incremental por corridas (sidecar) y consolidación bajo demanda.
+
+Cada corrida se escribe como un libro independiente dentro de ``<libro>.parts/`` y se
+registra en ``manifest.json``. Agregar una corrida cuesta O(filas nuevas); el libro
+consolidado solo se arma cuando se solicita (descarga o ``/scrapers/consolidate``).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from slugify import slugify
+
+from app.scrapers.excel import HEADER_FILL, HEADER_FONT, StreamingExcelWriter, estimate_widths
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+WIDTH_SAMPLE_ROWS = 200
+
+_locks: Dict[Path, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(path: Path) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(path.resolve(), threading.Lock())
+
+
+def parts_dir_for(excel_file: Path) -> Path:
+    return excel_file.with_name(f"{excel_file.stem}.parts")
+
+
+def has_parts(excel_file: Path) -> bool:
+    return (parts_dir_for(excel_file) / MANIFEST_NAME).exists()
+
+
+def load_manifest(excel_file: Path) -> Dict[str, Any]:
+    manifest_path = parts_dir_for(excel_file) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {"workbook": excel_file.name, "next_sequence": 1, "parts": [], "consolidated": None}
+    return json.loads(manifest_path.read_text(encoding="utf-8"))
+
+
+def _save_manifest(excel_file: Path, manifest: Dict[str, Any]) -> None:
+    parts_dir = parts_dir_for(excel_file)
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = parts_dir / f"{MANIFEST_NAME}.tmp"
+    tmp_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, parts_dir / MANIFEST_NAME)
+
+
+def _sheet_names(manifest: Dict[str, Any]) -> List[str]:
+    return [name for part in manifest["parts"] for name in part["sheets"]]
+
+
+def _finished_parts(manifest: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [part for part in manifest["parts"] if part["status"] == "done"]
+
+
+def _adopt_existing_workbook(excel_file: Path, manifest: Dict[str, Any]) -> None:
+    """Mueve un libro previo (no consolidado por nosotros) a la carpeta de partes.
+
+    Es un ``rename``, no una copia: el contenido histórico queda como primera parte.
+    """
+    if not excel_file.exists() or manifest["consolidated"] is not None:
+        return
+    parts_dir = parts_dir_for(excel_file)
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    target = parts_dir / f"00000_base{excel_file.suffix}"
+    # read_only solo lee workbook.xml para obtener los nombres de hoja
+    workbook = load_workbook(excel_file, read_only=True)
+    sheets = list(workbook.sheetnames)
+    workbook.close()
+    os.replace(excel_file, target)
+    manifest["parts"].insert(
+        0, {"file": target.name, "sheets": sheets, "rows": None, "created_at": None, "status": "done"}
+    )
+    logger.info(f"Libro existente {excel_file} movido a {target} como parte base")
+
+
+class SidecarRunWriter:
+    """Escribe una corrida como parte nueva del libro lógico ``excel_file``.
+
+    Con ``run_id`` la parte queda asociada a la corrida del diario: si se reanuda una
+    corrida interrumpida se reescribe su parte a medias en lugar de reservar otra.
+    """
+
+    def __init__(
+        self,
+        excel_file: Path,
+        sheet_name: str,
+        columns: Optional[Sequence[str]] = None,
+        keep_types: bool = False,
+        run_id: Optional[str] = None,
+    ) -> None:
+        self.excel_file = excel_file
+        parts_dir = parts_dir_for(excel_file)
+        with _lock_for(excel_file):
+            manifest = load_manifest(excel_file)
+            _adopt_existing_workbook(excel_file, manifest)
+            interrupted = next(
+                (
+                    part
+                    for part in manifest["parts"]
+                    if run_id and part.get("run_id") == run_id and part["status"] == "writing"
+                ),
+                None,
+            )
+            if interrupted is not None:
+                part_name = interrupted["file"]
+                final_name = interrupted["sheets"][0]
+                (parts_dir / part_name).unlink(missing_ok=True)
+            else:
+                taken = set(_sheet_names(manifest))
+                final_name = sheet_name
+                counter = 1
+                while final_name in taken:
+                    final_name = f"{sheet_name}_{counter}"
+                    counter += 1
+                sequence = manifest["next_sequence"]
+                part_name = f"{sequence:05d}_{slugify(final_name) or 'hoja'}.xlsx"
+                # La parte se reserva al abrir para que corridas simultáneas no choquen
+                manifest["next_sequence"] = sequence + 1
+                part = {"file": part_name, "sheets": [final_name], "rows": None, "created_at": None, "status": "writing"}
+                if run_id:
+                    part["run_id"] = run_id
+                manifest["parts"].append(part)
+                _save_manifest(excel_file, manifest)
+
+        self.sheet_name = final_name
+        self.part_path = parts_dir / part_name
+        self._writer = StreamingExcelWriter(self.part_path, final_name, columns=columns, keep_types=keep_types)
+
+    @property
+    def rows_written(self) -> int:
+        return self._writer.rows_written
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        self._writer.write_row(row)
+
+    def close(self) -> tuple[str, str]:
+        """Cierra la parte y devuelve el libro lógico (no la parte) con el nombre de la hoja."""
+        _, sheet_name = self._writer.close()
+        with _lock_for(self.excel_file):
+            manifest = load_manifest(self.excel_file)
+            for part in manifest["parts"]:
+                if part["file"] == self.part_path.name:
+                    part.update(
+                        rows=self._writer.rows_written,
+                        created_at=datetime.now().isoformat(timespec="seconds"),
+                        status="done",
+                    )
+            _save_manifest(self.excel_file, manifest)
+        return str(self.excel_file.absolute()), sheet_name
+
+    def __enter__(self) -> "SidecarRunWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+
+
+def _copy_sheet(source_rows: Any, target: Any) -> None:
+    rows = iter(source_rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    header = ["" if value is None else str(value) for value in header]
+    sample: List[tuple] = []
+    for row in rows:
+        sample.append(row)
+        if len(sample) >= WIDTH_SAMPLE_ROWS:
+            break
+
+    as_text = [["" if value is None else str(value) for value in row] for row in sample]
+    for index, width in enumerate(estimate_widths(header, as_text), 1):
+        target.column_dimensions[get_column_letter(index)].width = width
+    cells = []
+    for title in header:
+        cell = WriteOnlyCell(target, value=title)
+        cell.fill = HEADER_FILL
+        cell.font = HEADER_FONT
+        cells.append(cell)
+    target.append(cells)
+    for row in sample:
+        target.append(list(row))
+    for row in rows:
+        target.append(list(row))
+
+
+def consolidate_workbook(excel_file: Path, force: bool = False) -> Path:
+    """Arma ``excel_file`` a partir de sus partes leyéndolas en streaming.
+
+    Si el libro consolidado ya refleja todas las partes se devuelve sin reescribirlo.
+    """
+    with _lock_for(excel_file):
+        manifest = load_manifest(excel_file)
+        parts = _finished_parts(manifest)
+        if not parts:
+            raise FileNotFoundError(f"No hay corridas registradas para {excel_file}")
+
+        consolidated = manifest.get("consolidated")
+        if (
+            not force
+            and consolidated
+            and consolidated.get("parts") == [part["file"] for part in parts]
+            and excel_file.exists()
+        ):
+            return excel_file
+
+        parts_dir = parts_dir_for(excel_file)
+        output = Workbook(write_only=True)
+        for part in parts:
+            source = load_workbook(parts_dir / part["file"], read_only=True)
+            try:
+                for sheet_name in part["sheets"]:
+                    _copy_sheet(source[sheet_name].iter_rows(values_only=True), output.create_sheet(sheet_name))
+            finally:
+                source.close()
+
+        tmp_path = excel_file.with_name(f".{excel_file.name}.tmp")
+        output.save(tmp_path)
+        os.replace(tmp_path, excel_file)
+
+        manifest["consolidated"] = {
+            "parts": [part["file"] for part in parts],
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        _save_manifest(excel_file, manifest)
+        logger.info(f"Libro consolidado en: {excel_file.absolute()} ({len(parts)} partes)")
+        return excel_file
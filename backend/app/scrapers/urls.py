@@ -0,0 +1,57 @@
+"""Canonicalización y deduplicación de URLs antes de scrapear.
+
+Dos URLs que solo difieren en el fragmento, el orden de los parámetros, la barra final,
+el puerto por defecto o las mayúsculas del host apuntan al mismo documento; se piden una
+sola vez y el resultado se replica en cada fila original.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Dict, Iterable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """Forma normalizada de ``url`` usada solo para comparar, nunca para pedir."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{host}"
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)), doseq=True)
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def url_digest(url: str) -> bytes:
+    """Huella de 16 bytes de la forma canónica; ocupa menos que la cadena en índices grandes."""
+    return hashlib.blake2b(canonicalize_url(url).encode("utf-8"), digest_size=16).digest()
+
+
+def find_duplicates(urls: Iterable[str]) -> Dict[int, int]:
+    """Mapea la posición de cada URL repetida a la de su primera aparición.
+
+    El índice guarda huellas ``blake2b`` en lugar de las URLs, así que listas de millones
+    de entradas caben en memoria sin copiar las cadenas.
+    """
+    first_seen: Dict[bytes, int] = {}
+    duplicates: Dict[int, int] = {}
+    for index, url in enumerate(urls):
+        source = first_seen.setdefault(url_digest(url), index)
+        if source != index:
+            duplicates[index] = source
+    return duplicates
@@ -1,2 +1,11 @@
 """Tareas asíncronas y workers de scraping."""
 
+from .jobs import Job, JobQueueError, JobStatus, get_job_queue, register_handler
+
+__all__ = [
+    "Job",
+    "JobQueueError",
+    "JobStatus",
+    "get_job_queue",
+    "register_handler",
+]
@@ -0,0 +1,38 @@
+"""Aplicación Celery para ejecutar trabajos en workers externos.
+
+Uso: ``celery -A app.tasks.celery_app worker``. Para pruebas sin Redis puede usarse
+``CELERY_BROKER_URL=memory://``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from celery import Celery
+
+from app.core.config import settings
+from app.tasks.jobs import get_handler
+
+celery_app = Celery(
+    "crawlbase_desktop",
+    broker=settings.celery_broker_url,
+    backend=settings.celery_result_backend,
+    include=["app.tasks.scraping"],
+)
+celery_app.conf.update(task_track_started=True, result_extended=True)
+
+
+@celery_app.task(bind=True, name="app.tasks.run_job")
+def run_job_task(self: Any, kind: str, params: Dict[str, Any], created_at: Optional[str] = None) -> Dict[str, Any]:
+    handler = get_handler(kind)
+    # ``kind`` y ``created_at`` viajan en cada estado para que la API pueda describir el trabajo
+    self.update_state(state="STARTED", meta={"kind": kind, "created_at": created_at, "progress": {}})
+
+    def progress(counters: Dict[str, int]) -> None:
+        self.update_state(state="PROGRESS", meta={"kind": kind, "created_at": created_at, "progress": counters})
+
+    result = handler(params, progress)
+    counters = {key: result[key] for key in ("successful", "failed") if key in result}
+    if "total_urls" in result:
+        counters["total"] = counters["processed"] = result["total_urls"]
+    return {"kind": kind, "created_at": created_at, "progress": counters, "result": result}
@@ -0,0 +1,225 @@
+"""Cola de trabajos en segundo plano con backend local (hilos) u opcional Celery/Redis."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Protocol
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[Dict[str, int]], None]
+JobHandler = Callable[[Dict[str, Any], ProgressCallback], Dict[str, Any]]
+
+_HANDLERS: Dict[str, JobHandler] = {}
+
+
+class JobQueueError(Exception):
+    """Error general de la cola de trabajos."""
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: JobStatus = JobStatus.QUEUED
+    total: int = 0
+    processed: int = 0
+    successful: int = 0
+    failed: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def artifact_path(self) -> Optional[str]:
+        return self.result.get("excel_path") if self.result else None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def apply_progress(self, counters: Dict[str, int]) -> None:
+        for key in ("total", "processed", "successful", "failed"):
+            if key in counters:
+                setattr(self, key, int(counters[key]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        payload = asdict(self)
+        payload["status"] = self.status.value
+        payload["artifact_path"] = self.artifact_path
+        return payload
+
+
+def register_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Registra la función que ejecuta los trabajos de tipo ``kind``."""
+
+    def decorator(handler: JobHandler) -> JobHandler:
+        _HANDLERS[kind] = handler
+        return handler
+
+    return decorator
+
+
+def get_handler(kind: str) -> JobHandler:
+    # Los handlers de scraping se registran al importar su módulo
+    from app.tasks import scraping  # noqa: F401
+
+    handler = _HANDLERS.get(kind)
+    if handler is None:
+        raise JobQueueError(f"No existe un handler para trabajos de tipo '{kind}'")
+    return handler
+
+
+class JobBackend(Protocol):
+    def submit(self, kind: str, params: Dict[str, Any]) -> Job: ...
+
+    def get(self, job_id: str) -> Optional[Job]: ...
+
+    def list(self) -> List[Job]: ...
+
+
+class LocalJobBackend:
+    """Ejecuta los trabajos en un pool de hilos del propio proceso.
+
+    La cola interna del ``ThreadPoolExecutor`` actúa como broker en memoria; es el backend
+    por defecto y el que se usa en pruebas. Solo se conservan los ``history_limit``
+    trabajos terminados más recientes.
+    """
+
+    def __init__(self, max_workers: int = 2, history_limit: int = 500) -> None:
+        self.history_limit = history_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Job:
+        handler = get_handler(kind)
+        job = Job(id=uuid.uuid4().hex, kind=kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, handler, params)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: Job, handler: JobHandler, params: Dict[str, Any]) -> None:
+        def progress(counters: Dict[str, int]) -> None:
+            with self._lock:
+                job.apply_progress(counters)
+
+        with self._lock:
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.utcnow()
+        try:
+            result = handler(params, progress)
+        except Exception as exc:
+            logger.error(f"Trabajo {job.id} ({job.kind}) falló: {exc}")
+            with self._lock:
+                job.status = JobStatus.FAILED
+                job.error = str(exc)
+                job.finished_at = datetime.utcnow()
+            return
+        with self._lock:
+            job.result = result
+            job.status = JobStatus.COMPLETED
+            job.finished_at = datetime.utcnow()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        for job_id in finished[: max(0, len(finished) - self.history_limit)]:
+            self._jobs.pop(job_id, None)
+
+
+_CELERY_STATES = {
+    "PENDING": JobStatus.QUEUED,
+    "RECEIVED": JobStatus.QUEUED,
+    "STARTED": JobStatus.RUNNING,
+    "PROGRESS": JobStatus.RUNNING,
+    "RETRY": JobStatus.RUNNING,
+    "SUCCESS": JobStatus.COMPLETED,
+    "FAILURE": JobStatus.FAILED,
+    "REVOKED": JobStatus.FAILED,
+}
+
+
+class CeleryJobBackend:
+    """Delega la ejecución en workers Celery (broker Redis por defecto).
+
+    El estado y los contadores de progreso viven en el result backend de Celery, por lo
+    que cualquier proceso de la API puede consultarlos.
+    """
+
+    def __init__(self) -> None:
+        from app.tasks.celery_app import celery_app, run_job_task
+
+        self._app = celery_app
+        self._task = run_job_task
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Job:
+        get_handler(kind)
+        job = Job(id=uuid.uuid4().hex, kind=kind)
+        created_at = job.created_at.isoformat()
+        # Se registra el trabajo antes de encolarlo: así ``get`` distingue un ID propio
+        # todavía en cola de uno que el result backend nunca vio
+        self._app.backend.store_result(job.id, {"kind": kind, "created_at": created_at, "progress": {}}, "PENDING")
+        self._task.apply_async(args=(kind, params), kwargs={"created_at": created_at}, task_id=job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        meta = self._app.backend.get_task_meta(job_id)
+        if "task_id" not in meta:
+            # El backend devuelve PENDING para cualquier ID desconocido sin guardar nada
+            return None
+        state = meta["status"]
+        info = meta.get("result") if isinstance(meta.get("result"), dict) else {}
+        job = Job(id=job_id, kind=info.get("kind", "unknown"), status=_CELERY_STATES.get(state, JobStatus.QUEUED))
+        if info.get("created_at"):
+            job.created_at = datetime.fromisoformat(info["created_at"])
+        job.apply_progress(info.get("progress", {}))
+        if state == "SUCCESS":
+            job.result = info.get("result")
+        elif state in ("FAILURE", "REVOKED"):
+            job.error = str(meta.get("result"))
+        return job
+
+    def list(self) -> List[Job]:
+        raise JobQueueError("El backend Celery no mantiene un listado de trabajos; consulte por ID")
+
+
+@lru_cache
+def get_job_queue() -> JobBackend:
+    backend = settings.task_backend.lower()
+    if backend == "celery":
+        return CeleryJobBackend()
+    if backend == "local":
+        return LocalJobBackend(max_workers=settings.task_workers, history_limit=settings.task_history_limit)
+    raise JobQueueError(f"Backend de tareas no soportado: {settings.task_backend}")
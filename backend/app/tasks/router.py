@@ -0,0 +1,24 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.tasks.jobs import JobBackend, JobQueueError, get_job_queue
+from app.tasks.schemas import JobReadSchema
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/", response_model=List[JobReadSchema])
+def list_jobs(queue: JobBackend = Depends(get_job_queue)) -> List[JobReadSchema]:
+    try:
+        return [JobReadSchema.from_job(job) for job in queue.list()]
+    except JobQueueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+@router.get("/{job_id}", response_model=JobReadSchema)
+def get_job(job_id: str, queue: JobBackend = Depends(get_job_queue)) -> JobReadSchema:
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabajo no encontrado")
+    return JobReadSchema.from_job(job)
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+from app.tasks.jobs import Job
+
+
+class JobReadSchema(BaseModel):
+    id: str
+    kind: str
+    status: str
+    total: int
+    processed: int
+    successful: int
+    failed: int
+    artifact_path: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @classmethod
+    def from_job(cls, job: Job) -> "JobReadSchema":
+        return cls(**job.to_dict())
@@ -0,0 +1,57 @@
+"""Handlers de trabajos de scraping."""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from app.core.database import session_scope
+from app.profiles.service import ProfileService
+from app.scrapers.schemas import LinkScrapeRequestSchema, ScrapeRequestSchema
+from app.scrapers.service import build_retry_policy, scrape_links, scrape_urls
+from app.tasks.jobs import ProgressCallback, register_handler
+
+
+@register_handler("scrape")
+def run_scrape_job(params: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    request = ScrapeRequestSchema(**params)
+    with session_scope() as session:
+        profile = ProfileService(session).get(profile_id=request.profile_id, include_tokens=True)
+
+    return scrape_urls(
+        urls=request.urls,
+        profile=profile,
+        excel_path=request.excel_path,
+        sheet_name=request.sheet_name,
+        max_concurrency=request.max_concurrency,
+        output_mode=request.output_mode,
+        retry_policy=build_retry_policy(request.max_attempts),
+        cache_max_age=request.cache_max_age,
+        scraper_key=request.scraper_key,
+        archive=request.archive,
+        on_progress=progress,
+    )
+
+
+@register_handler("scrape-links")
+def run_link_scrape_job(params: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    request = LinkScrapeRequestSchema(**params)
+    if not request.preset_id or request.profile_id is None:
+        raise ValueError("El trabajo necesita preset_id y profile_id")
+    with session_scope() as session:
+        profile = ProfileService(session).get(profile_id=request.profile_id, include_tokens=True)
+
+    return scrape_links(
+        preset_id=request.preset_id,
+        profile=profile,
+        overrides=request.overrides,
+        excel_path=request.excel_path,
+        sheet_name=request.sheet_name,
+        max_concurrency=request.max_concurrency,
+        output_mode=request.output_mode,
+        retry_policy=build_retry_policy(request.max_attempts),
+        cache_max_age=request.cache_max_age,
+        scraper_key=request.scraper_key,
+        archive=request.archive,
+        shard=(request.shard_index or 0, request.shard_count) if request.shard_count else None,
+        on_progress=progress,
+    )
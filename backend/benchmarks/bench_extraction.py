@@ -0,0 +1,89 @@
+"""Compara la extracción de metadatos HTML con la búsqueda por subcadena anterior.
+
+Uso (desde ``backend/``)::
+
+    python -m benchmarks.bench_extraction --sizes 50 500 5000 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.scrapers.extraction import extract_html_metadata  # noqa: E402
+
+
+def legacy_extract(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Implementación previa de ``_extract_data_from_response`` (solo la parte del HTML)."""
+    extracted: Dict[str, Any] = {}
+    body = str(data.get("body", ""))
+    extracted["content_length"] = len(body)
+    if "<title>" in body:
+        title_start = body.find("<title>") + 7
+        title_end = body.find("</title>", title_start)
+        if title_end > title_start:
+            extracted["page_title"] = body[title_start:title_end].strip()[:200]
+    return extracted
+
+
+def current_extract(data: Dict[str, Any]) -> Dict[str, Any]:
+    body = data.get("body") or ""
+    extracted = extract_html_metadata(body, base_url="https://example.com/")
+    extracted["content_length"] = len(body)
+    return extracted
+
+
+def build_page(blocks: int) -> str:
+    """Página sintética con cabecera típica y ``blocks`` bloques de contenido con enlaces."""
+    head = (
+        '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8">'
+        '<TITLE lang="es">Página de prueba</TITLE>'
+        '<meta name="description" content="Descripción de prueba">'
+        '<link rel="canonical" href="https://example.com/prueba">'
+        '<meta property="og:title" content="Prueba"><meta property="og:image" content="https://example.com/a.png">'
+        "</head><body><h1>Encabezado</h1>"
+    )
+    block = (
+        '<div class="item"><h2>Sección</h2><p>Texto de relleno con <b>negritas</b> y '
+        '<a href="/interno">un enlace interno</a> y <a href="https://otro.com/x">otro externo</a>.</p>'
+        '<img src="/img.png" alt="imagen"></div>'
+    )
+    return head + block * blocks + "</body></html>"
+
+
+def measure(func: Callable[[Dict[str, Any]], Dict[str, Any]], data: Dict[str, Any], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(data)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000], help="Bloques de contenido por página")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'KiB':>8} {'anterior ms':>12} {'actual ms':>10} {'MiB/s':>8}  campos")
+    for blocks in args.sizes:
+        data = {"body": build_page(blocks)}
+        size = len(data["body"].encode("utf-8"))
+        legacy = statistics.median(measure(legacy_extract, data, args.repeat))
+        current = statistics.median(measure(current_extract, data, args.repeat))
+        fields = len(current_extract(data)) - len(legacy_extract(data))
+        print(
+            f"{size / 1024:8.0f} {legacy * 1000:12.3f} {current * 1000:10.3f} "
+            f"{size / (1024 * 1024) / current:8.1f}  +{fields}"
+        )
+
+
+if __name__ == "__main__":
+    main()
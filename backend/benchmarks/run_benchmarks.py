@@ -0,0 +1,277 @@
+"""Benchmarks de los caminos calientes del backend con resultados en JSON.
+
+Cubre ``scrape_urls`` contra un servidor local que imita a Crawlbase (ver
+``benchmarks.stub_crawlbase``), ``save_to_excel``, ``generate_links``/``export_links``,
+``build_usage_summary`` y el descifrado de perfiles. Cada caso se repite ``--repeat`` veces
+y se guarda la mediana; con ``--compare`` se contrasta con una corrida previa y el proceso
+termina con código 1 si algún caso empeora más que ``--threshold``.
+
+Uso (desde ``backend/``)::
+
+    python -m benchmarks.run_benchmarks --output benchmarks/results/actual.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/base.json --threshold 0.15
+    python -m benchmarks.run_benchmarks --only scrape_urls export_links --quick
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+# La configuración se lee al importar la app: sin límites de tasa reales y con esperas de
+# reintento cortas, para medir el motor y no el token bucket.
+os.environ.setdefault("CRAWLBASE_RATE_LIMIT_RPS", json.dumps({"normal": 1e6, "javascript": 1e6}))
+os.environ.setdefault("CRAWLBASE_RATE_LIMIT_BURST", json.dumps({"normal": 1_000_000, "javascript": 1_000_000}))
+os.environ.setdefault("CRAWLBASE_RETRY_BASE_DELAY", "0.01")
+os.environ.setdefault("CRAWLBASE_RETRY_MAX_DELAY", "0.05")
+os.environ.setdefault("CRAWLBASE_CACHE_ENABLED", "false")
+os.environ.setdefault("SCRAPER_ARCHIVE_ENABLED", "false")
+
+from benchmarks.stub_crawlbase import StubCrawlbaseServer, StubProfile  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+@dataclass
+class Case:
+    name: str
+    items: int
+    run: Callable[[], Any]
+    setup: Optional[Callable[[], None]] = None
+
+
+def _profile(profile_id: int = 1) -> Any:
+    from app.profiles.schemas import ProfileReadSchema, ProfileTokensSchema
+
+    return ProfileReadSchema(
+        id=profile_id,
+        name="Benchmark",
+        description=None,
+        is_active=True,
+        default_product="crawling-api",
+        tags=[],
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+        tokens=ProfileTokensSchema(normal="bench-token"),
+        metadata={"max_concurrency": 16},
+    )
+
+
+def _synthetic_results(count: int) -> List[Dict[str, Any]]:
+    from benchmarks.stub_crawlbase import build_page
+
+    page = build_page("https://example.com/", 10)
+    return [
+        {
+            "url": f"https://example.com/item/{index}",
+            "success": index % 20 != 0,
+            "status_code": 200 if index % 20 else 503,
+            "data": {"body": page} if index % 20 else None,
+            "headers": {"content-type": "application/json"},
+            "error": None if index % 20 else "simulado",
+            "attempts": 1,
+            "latency_ms": 40,
+        }
+        for index in range(count)
+    ]
+
+
+def _usage_payload(domains: int) -> Dict[str, Any]:
+    return {
+        "totalSuccess": 125_000,
+        "totalFailed": 3_400,
+        "totalDue": 412.5,
+        "remainingCredits": 80_000,
+        "domainStats": [
+            {"domain": f"site{index}.example", "success": 1000 + index, "failed": index % 50, "totalRequests": 1000 + index * 2}
+            for index in range(domains)
+        ],
+    }
+
+
+def build_cases(workdir: Path, server: StubCrawlbaseServer, scale: float) -> List[Case]:
+    from app.analytics.service import build_usage_summary
+    from app.core.security import encrypt_value
+    from app.link_factory.service import export_links, generate_links
+    from app.profiles import models
+    from app.projects import models as _project_models  # noqa: F401  (registra Project para la relación)
+    from app.profiles.service import _to_schema
+    from app.scrapers import service
+
+    service.OUTPUT_DIR = workdir
+    scrape_count = max(10, int(400 * scale))
+    urls = [f"https://shop.example/p/{index}" for index in range(scrape_count)]
+    profile = _profile()
+
+    results = _synthetic_results(max(100, int(20_000 * scale)))
+    keywords = [f"keyword {index}" for index in range(max(10, int(300 * scale)))]
+    overrides = {"keyword": keywords, "page": [str(page) for page in range(1, 101)]}
+    _, links = generate_links("amazon-serp", overrides=overrides)
+
+    payload = _usage_payload(max(10, int(5_000 * scale)))
+    previous = _usage_payload(max(10, int(5_000 * scale)))
+    stored_profiles = [
+        models.Profile(
+            id=index,
+            name=f"Perfil {index}",
+            token_normal_enc=encrypt_value(f"normal-{index}"),
+            token_js_enc=encrypt_value(f"js-{index}"),
+            metadata_enc=encrypt_value(json.dumps({"max_concurrency": 8})),
+        )
+        for index in range(max(10, int(500 * scale)))
+    ]
+
+    def reset_scrape() -> None:
+        # Sin borrar el libro, cada repetición agregaría una hoja a un archivo creciente
+        (workdir / "bench_scrape.xlsx").unlink(missing_ok=True)
+        server.reset()
+
+    def scrape() -> Dict[str, Any]:
+        return service.scrape_urls(urls=urls, profile=profile, excel_path="bench_scrape.xlsx", max_concurrency=16)
+
+    def save() -> Any:
+        (workdir / "bench_save.xlsx").unlink(missing_ok=True)
+        return service.save_to_excel(results, excel_path="bench_save.xlsx", sheet_name="Bench")
+
+    return [
+        Case("scrape_urls", scrape_count, scrape, setup=reset_scrape),
+        Case("save_to_excel", len(results), save),
+        Case("generate_links", len(links), lambda: sum(1 for _ in generate_links("amazon-serp", overrides=overrides)[1])),
+        Case("export_links_csv", len(links), lambda: export_links(links, "csv")),
+        Case("export_links_xlsx", len(links), lambda: export_links(links, "xlsx")),
+        Case("build_usage_summary", len(payload["domainStats"]), lambda: build_usage_summary(payload, "crawling-api", previous)),
+        Case("profile_decrypt", len(stored_profiles), lambda: [_to_schema(item, include_tokens=True) for item in stored_profiles]),
+    ]
+
+
+def measure(case: Case, repeat: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        if case.setup:
+            case.setup()
+        case.run()
+    timings = []
+    for _ in range(repeat):
+        if case.setup:
+            case.setup()
+        started = time.perf_counter()
+        case.run()
+        timings.append(time.perf_counter() - started)
+    median = statistics.median(timings)
+    return {
+        "name": case.name,
+        "items": case.items,
+        "runs": repeat,
+        "median_s": round(median, 6),
+        "min_s": round(min(timings), 6),
+        "max_s": round(max(timings), 6),
+        "stdev_s": round(statistics.stdev(timings), 6) if len(timings) > 1 else 0.0,
+        "items_per_s": round(case.items / median, 1) if median else None,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Casos cuya mediana empeoró más que ``threshold`` (fracción) respecto a la base."""
+    previous = {case["name"]: case for case in baseline.get("cases", [])}
+    regressions = []
+    print(f"\n{'caso':<22} {'base ms':>10} {'actual ms':>10} {'cambio':>8}")
+    for case in current["cases"]:
+        before = previous.get(case["name"])
+        if not before or not before["median_s"]:
+            print(f"{case['name']:<22} {'-':>10} {case['median_s'] * 1000:10.2f} {'nuevo':>8}")
+            continue
+        change = case["median_s"] / before["median_s"] - 1
+        flag = "  <-- regresión" if change > threshold else ""
+        print(f"{case['name']:<22} {before['median_s'] * 1000:10.2f} {case['median_s'] * 1000:10.2f} {change:+8.1%}{flag}")
+        if change > threshold:
+            regressions.append(case["name"])
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--quick", action="store_true", help="Tamaños reducidos (10%%) para una comprobación rápida")
+    parser.add_argument("--only", nargs="+", help="Ejecutar solo estos casos")
+    parser.add_argument("--output", type=Path, help="Archivo JSON de resultados (por defecto results/<fecha>.json)")
+    parser.add_argument("--compare", type=Path, help="Resultados previos con los que comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Empeoramiento tolerado antes de fallar")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Mediana de latencia del servidor simulado")
+    parser.add_argument("--error-rate", type=float, default=0.06, help="Fracción total de respuestas con error")
+    args = parser.parse_args()
+
+    stub_profile = StubProfile(
+        latency_median_ms=args.latency_ms,
+        rate_limited=args.error_rate / 3,
+        unavailable=args.error_rate / 3,
+        crawl_failed=args.error_rate / 6,
+        not_found=args.error_rate / 6,
+    )
+    scale = 0.1 if args.quick else 1.0
+
+    import app.crawlbase.client as crawlbase_client
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp, StubCrawlbaseServer(stub_profile) as server:
+        crawlbase_client.BASE_URL = server.base_url
+        cases = build_cases(Path(tmp), server, scale)
+        if args.only:
+            cases = [case for case in cases if case.name in args.only]
+
+        print(f"{'caso':<22} {'items':>8} {'mediana ms':>11} {'items/s':>12}")
+        measured = []
+        for case in cases:
+            result = measure(case, args.repeat, args.warmup)
+            measured.append(result)
+            print(f"{case.name:<22} {case.items:>8} {result['median_s'] * 1000:11.2f} {result['items_per_s'] or 0:12.1f}")
+        stub_stats = dict(server.stats)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "stub": {**stub_profile.to_dict(), "last_run_statuses": stub_stats},
+        "cases": measured,
+    }
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nResultados guardados en {output}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold)
+        if regressions:
+            print(f"Regresiones por encima del {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
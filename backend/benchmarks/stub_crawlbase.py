@@ -0,0 +1,157 @@
+"""Servidor HTTP local que imita el Crawling API de Crawlbase para los benchmarks.
+
+Responde ``GET /?token=...&url=...`` con el mismo JSON que Crawlbase (``original_status``,
+``pc_status``, ``url`` y ``body``) tras una latencia log-normal, y devuelve errores
+transitorios (429, 503, 520) o definitivos (404) según las tasas configuradas. Cada respuesta
+se decide a partir de la URL, el número de intento y la semilla, así que dos corridas con la
+misma configuración reciben la misma secuencia de latencias y errores por URL.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+@dataclass(frozen=True)
+class StubProfile:
+    """Distribución de latencias y errores del servidor simulado."""
+
+    latency_median_ms: float = 40.0
+    latency_sigma: float = 0.5
+    rate_limited: float = 0.02
+    unavailable: float = 0.02
+    crawl_failed: float = 0.01
+    not_found: float = 0.01
+    body_blocks: int = 40
+    seed: int = 1234
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "latency_median_ms": self.latency_median_ms,
+            "latency_sigma": self.latency_sigma,
+            "rate_limited": self.rate_limited,
+            "unavailable": self.unavailable,
+            "crawl_failed": self.crawl_failed,
+            "not_found": self.not_found,
+            "body_blocks": self.body_blocks,
+            "seed": self.seed,
+        }
+
+
+def build_page(url: str, blocks: int) -> str:
+    head = (
+        f"<!DOCTYPE html><html><head><title>Página {url}</title>"
+        '<meta name="description" content="Página simulada para benchmarks">'
+        f'<link rel="canonical" href="{url}"></head><body><h1>Resultados</h1>'
+    )
+    block = (
+        '<div class="item"><h2>Producto</h2><p>Descripción con <a href="/interno">enlace interno</a> '
+        'y <a href="https://otro.example/x">externo</a>.</p><span class="price">$19.99</span></div>'
+    )
+    return head + block * blocks + "</body></html>"
+
+
+class StubCrawlbaseServer:
+    """``ThreadingHTTPServer`` en un hilo de fondo; úselo como context manager."""
+
+    def __init__(self, profile: Optional[StubProfile] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.profile = profile or StubProfile()
+        self.stats: Counter[str] = Counter()
+        self._attempts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-crawlbase", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubCrawlbaseServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=5)
+
+    def __enter__(self) -> "StubCrawlbaseServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    def reset(self) -> None:
+        """Reinicia los contadores para que la siguiente corrida repita la misma secuencia."""
+        with self._lock:
+            self._attempts.clear()
+            self.stats.clear()
+
+    def decide(self, url: str) -> Tuple[int, float]:
+        """Estado HTTP y latencia (segundos) del siguiente intento sobre ``url``."""
+        with self._lock:
+            self._attempts[url] += 1
+            attempt = self._attempts[url]
+        seed = hashlib.blake2b(f"{self.profile.seed}:{url}:{attempt}".encode("utf-8"), digest_size=8).digest()
+        rng = random.Random(int.from_bytes(seed, "little"))
+        profile = self.profile
+        latency = profile.latency_median_ms * math.exp(rng.gauss(0.0, profile.latency_sigma)) / 1000
+        roll = rng.random()
+        for status, rate in (
+            (429, profile.rate_limited),
+            (503, profile.unavailable),
+            (520, profile.crawl_failed),
+            (404, profile.not_found),
+        ):
+            if roll < rate:
+                return status, latency
+            roll -= rate
+        return 200, latency
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                query = parse_qs(urlsplit(self.path).query)
+                url = query.get("url", [""])[0]
+                status, latency = server.decide(url)
+                time.sleep(latency)
+                if status == 200:
+                    payload = {
+                        "original_status": 200,
+                        "pc_status": 200,
+                        "url": url,
+                        "body": build_page(url, server.profile.body_blocks),
+                    }
+                else:
+                    payload = {"original_status": status, "pc_status": status, "url": url, "error": "simulado"}
+                body = json.dumps(payload).encode("utf-8")
+                with server._lock:
+                    server.stats[str(status)] += 1
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+                return None
+
+        return Handler
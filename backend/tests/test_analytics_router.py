@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.analytics import router as analytics
+from app.crawlbase.client import CrawlbaseClientError, CrawlbaseResponse
+from app.profiles.schemas import ProfileReadSchema, ProfileTokensSchema
+
+
+def make_profile(profile_id: int, is_active: bool = True) -> ProfileReadSchema:
+    return ProfileReadSchema(
+        id=profile_id,
+        name=f"Perfil {profile_id}",
+        description=None,
+        is_active=is_active,
+        default_product="crawling-api",
+        tags=[],
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+        tokens=ProfileTokensSchema(normal=f"token-{profile_id}"),
+        metadata=None,
+    )
+
+
+class DummyProfileService:
+    def __init__(self, profiles: list[ProfileReadSchema]) -> None:
+        self.profiles = profiles
+
+    def list(self, include_tokens: bool = False) -> list[ProfileReadSchema]:  # noqa: FBT002
+        return self.profiles
+
+
+class DummyAsyncCrawlbaseClient:
+    in_flight = 0
+    peak = 0
+    calls = 0
+
+    def __init__(self, profile: ProfileReadSchema) -> None:
+        self.profile = profile
+
+    async def __aenter__(self) -> "DummyAsyncCrawlbaseClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        return None
+
+    async def get_account_snapshot(self, product: str, include_previous: bool = False) -> CrawlbaseResponse:
+        cls = DummyAsyncCrawlbaseClient
+        cls.calls += 1
+        cls.in_flight += 1
+        cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            cls.in_flight -= 1
+        if self.profile.id == 3:
+            raise CrawlbaseClientError("Token inválido")
+        if self.profile.id == 6:
+            raise ValueError("Respuesta inesperada")
+        data = {
+            "totalSuccess": 10 * self.profile.id,
+            "totalFailed": self.profile.id,
+            "domainStats": [{"domain": "amazon.com", "success": 10 * self.profile.id, "failed": self.profile.id}],
+        }
+        return CrawlbaseResponse(status_code=200, data=data, headers={})
+
+
+def create_test_app(monkeypatch, profiles: list[ProfileReadSchema]) -> TestClient:
+    app = FastAPI()
+    app.include_router(analytics.router, prefix="/api")
+    service = DummyProfileService(profiles)
+    app.dependency_overrides[analytics.get_profile_service] = lambda: service
+
+    DummyAsyncCrawlbaseClient.in_flight = DummyAsyncCrawlbaseClient.peak = DummyAsyncCrawlbaseClient.calls = 0
+    monkeypatch.setattr(analytics, "AsyncCrawlbaseClient", DummyAsyncCrawlbaseClient)
+    monkeypatch.setattr(analytics.settings, "usage_history_enabled", False)
+    monkeypatch.setattr(analytics.settings, "dashboard_aggregate_concurrency", 2)
+    monkeypatch.setattr(analytics, "usage_cache", analytics.UsageSnapshotCache(ttl=60))
+    return TestClient(app)
+
+
+def test_aggregate_usage_merges_profiles_and_reports_errors(monkeypatch) -> None:
+    profiles = [make_profile(1), make_profile(2), make_profile(3), make_profile(4), make_profile(5, is_active=False)]
+    api = create_test_app(monkeypatch, profiles)
+
+    response = api.get("/api/dashboard/usage/aggregate")
+
+    assert response.status_code == 200
+    payload = response.json()
+    by_profile = {entry["profile_id"]: entry for entry in payload["profiles"]}
+    assert set(by_profile) == {1, 2, 3, 4}
+    assert by_profile[3]["ok"] is False
+    assert by_profile[3]["error"] == "Token inválido"
+    assert payload["errors"] == 1
+
+    aggregate = payload["aggregates"]["crawling-api"]
+    assert aggregate["profiles_ok"] == 3
+    assert aggregate["profiles_failed"] == 1
+    assert aggregate["summary"]["total_success"] == 70
+    assert aggregate["summary"]["domains"][0]["success"] == 70
+    assert DummyAsyncCrawlbaseClient.peak <= 2
+
+
+def test_aggregate_usage_reuses_cache_and_flags_unknown_profiles(monkeypatch) -> None:
+    api = create_test_app(monkeypatch, [make_profile(1), make_profile(2)])
+
+    first = api.get("/api/dashboard/usage/aggregate", params={"profile_ids": [1, 9]})
+    second = api.get("/api/dashboard/usage/aggregate", params={"profile_ids": [1]})
+
+    entries = {entry["profile_id"]: entry for entry in first.json()["profiles"]}
+    assert entries[9]["status_code"] == 404
+    assert entries[1]["cached"] is False
+    assert second.json()["profiles"][0]["cached"] is True
+    assert DummyAsyncCrawlbaseClient.calls == 1
+
+
+def test_aggregate_usage_reports_unexpected_errors_per_profile(monkeypatch) -> None:
+    api = create_test_app(monkeypatch, [make_profile(1), make_profile(6)])
+
+    response = api.get("/api/dashboard/usage/aggregate")
+
+    assert response.status_code == 200
+    payload = response.json()
+    by_profile = {entry["profile_id"]: entry for entry in payload["profiles"]}
+    assert by_profile[1]["ok"] is True
+    assert by_profile[6]["ok"] is False
+    assert by_profile[6]["status_code"] == 502
+    assert by_profile[6]["error"] == "Respuesta inesperada"
+    assert payload["errors"] == 1
@@ -3,6 +3,7 @@ from app.analytics.service import (
     build_usage_summary,
     DomainUsage,
     UsageSummary,
+    merge_usage_summaries,
 )
 
 
@@ -55,3 +56,41 @@ def test_dashboard_payload_structure() -> None:
     assert payload["series"]["status"][0]["label"] == "Éxitos"
     assert len(payload["series"]["domains"]) == 2
 
+
+
+def test_merge_usage_summaries_combines_domains_and_trend() -> None:
+    previous = {"totalSuccess": 100, "totalFailed": 20, "totalDue": 20.0}
+    first = build_usage_summary(sample_payload(), product="crawling-api", previous_payload=previous)
+    second = build_usage_summary(
+        {
+            "totalSuccess": 80,
+            "totalFailed": 20,
+            "totalDue": 10.0,
+            "domainStats": [{"domain": "walmart.com", "totalRequests": 100, "success": 80, "failed": 20}],
+        },
+        product="crawling-api",
+        previous_payload={"totalSuccess": 50, "totalFailed": 10, "totalDue": 5.0},
+    )
+
+    merged = merge_usage_summaries([first, second], product="crawling-api")
+
+    assert merged.total_success == 200
+    assert merged.total_failed == 50
+    assert merged.total_due == 34.5
+    assert merged.remaining_credits == 880
+    assert merged.success_rate == 80.0
+    assert [domain.domain for domain in merged.domains] == ["walmart.com", "amazon.com"]
+    assert merged.domains[0].success == 110
+    assert merged.domains[0].success_rate == 73.33
+    assert merged.trend is not None
+    assert merged.trend.total_success_delta == 50
+    assert merged.trend.success_rate_delta == round(80.0 - 83.33, 2)
+    assert first.domains[1].success == 30
+
+
+def test_merge_usage_summaries_skips_trend_when_incomplete() -> None:
+    with_trend = build_usage_summary(sample_payload(), product="crawling-api", previous_payload={"totalSuccess": 1})
+    without_trend = build_usage_summary(sample_payload(), product="crawling-api")
+
+    assert merge_usage_summaries([with_trend, without_trend], product="crawling-api").trend is None
+    assert merge_usage_summaries([], product="crawling-api").total_success == 0
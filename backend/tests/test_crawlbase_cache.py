@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import httpx
+
+from app.crawlbase.cache import ResponseCache
+from app.crawlbase.client import CrawlbaseClient
+from app.crawlbase.retry import NO_RETRY
+from app.profiles.schemas import ProfileReadSchema, ProfileTokensSchema
+
+
+def build_profile(profile_id: int = 1) -> ProfileReadSchema:
+    return ProfileReadSchema(
+        id=profile_id,
+        name="Perfil Demo",
+        description=None,
+        is_active=True,
+        default_product="crawling-api",
+        tags=[],
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+        tokens=ProfileTokensSchema(normal="normal-token"),
+        metadata=None,
+    )
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_client_serves_repeated_urls_from_cache(tmp_path) -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        return httpx.Response(200, json={"body": "<html>same</html>"})
+
+    clock = FakeClock()
+    cache = ResponseCache(tmp_path, max_bytes=1_000_000, default_ttl=60, clock=clock)
+    http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    with CrawlbaseClient(profile=build_profile(50), http_client=http_client, retry_policy=NO_RETRY, cache=cache) as client:
+        first = client.get("/", params={"url": "https://example.com/a"})
+        second = client.get("/", params={"url": "https://example.com/a"})
+        client.get("/", params={"url": "https://example.com/b"})
+        clock.now += 61
+        expired = client.get("/", params={"url": "https://example.com/a"})
+
+    assert len(calls) == 3
+    assert first.cached is False and second.cached is True
+    assert second.data == first.data
+    assert expired.cached is False
+    # Ambas URLs devuelven el mismo documento: un solo blob compartido
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["blobs"] == 1
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path) -> None:
+    clock = FakeClock()
+    cache = ResponseCache(tmp_path, max_bytes=10**9, default_ttl=3600, clock=clock)
+    for index in range(3):
+        clock.now += 1
+        cache.put(f"k{index}", 200, {"body": f"documento {index} " + "x" * 200}, {})
+    blob_size = cache.stats()["bytes"] // 3
+
+    clock.now += 1
+    assert cache.get("k0") is not None
+    cache.max_bytes = blob_size * 3
+    clock.now += 1
+    cache.put("k3", 200, {"body": "documento 3 " + "x" * 200}, {})
+
+    assert cache.get("k1") is None
+    assert cache.get("k0") is not None
+    assert cache.get("k3") is not None
+    assert cache.get("k0", max_age=0) is None
+
+
+def test_cache_keeps_running_byte_total_across_reopen(tmp_path) -> None:
+    clock = FakeClock()
+    cache = ResponseCache(tmp_path, max_bytes=10**9, default_ttl=3600, clock=clock)
+    for index in range(4):
+        clock.now += 1
+        cache.put(f"k{index}", 200, {"body": f"documento {index} " + "y" * 300}, {})
+    cache.put("k0", 200, {"body": "reemplazo"}, {})
+    on_disk = sum(path.stat().st_size for path in tmp_path.rglob("*") if path.is_file() and path.parent != tmp_path)
+    total = cache.stats()["bytes"]
+    cache.close()
+
+    assert total == on_disk
+    assert not list(tmp_path.rglob("*.tmp"))
+    reopened = ResponseCache(tmp_path, max_bytes=10**9, default_ttl=3600, clock=clock)
+    assert reopened.stats()["bytes"] == total
+    reopened.clear()
+    assert reopened.stats()["bytes"] == 0
@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+
+from app.crawlbase.client import AsyncCrawlbaseClient, CrawlbaseClient, CrawlbaseTransportError
+from app.crawlbase.pool import CrawlbaseClientPool
+from app.crawlbase.retry import RetryPolicy
+from app.profiles.schemas import ProfileReadSchema, ProfileTokensSchema
+from app.scrapers.service import scrape_url
+
+
+def build_profile(profile_id: int = 1) -> ProfileReadSchema:
+    return ProfileReadSchema(
+        id=profile_id,
+        name="Perfil Demo",
+        description=None,
+        is_active=True,
+        default_product="crawling-api",
+        tags=[],
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+        tokens=ProfileTokensSchema(normal="normal-token"),
+        metadata=None,
+    )
+
+
+def account_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"token": request.url.params["token"], "product": request.url.params["product"]})
+
+
+def test_async_client_fetches_account_snapshot() -> None:
+    async def run() -> dict:
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(account_handler))
+        async with AsyncCrawlbaseClient(profile=build_profile(), http_client=http_client) as client:
+            response = await client.get_account_snapshot(product="crawling-api")
+        assert not http_client.is_closed, "El cliente inyectado no debe cerrarse"
+        await http_client.aclose()
+        return response.data
+
+    assert asyncio.run(run()) == {"token": "normal-token", "product": "crawling-api"}
+
+
+def test_client_uses_configured_timeout_unless_overridden(monkeypatch) -> None:
+    monkeypatch.setattr("app.crawlbase.client.settings.crawlbase_timeout", 7.5)
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.extensions["timeout"]["read"])
+        return account_handler(request)
+
+    http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    with CrawlbaseClient(profile=build_profile(), http_client=http_client) as client:
+        client.get_account_snapshot(product="crawling-api")
+    with CrawlbaseClient(profile=build_profile(), http_client=http_client, timeout=3.0) as client:
+        client.get_account_snapshot(product="crawling-api")
+
+    assert seen == [7.5, 3.0]
+
+
+def test_pool_reuses_connections_per_profile(monkeypatch) -> None:
+    pool = CrawlbaseClientPool()
+    monkeypatch.setattr("app.crawlbase.client.client_pool", pool)
+
+    standalone = CrawlbaseClient(profile=build_profile())
+    standalone.close()
+    assert standalone._client.is_closed
+
+    pool.start()
+    with CrawlbaseClient(profile=build_profile()) as first:
+        shared = first._client
+    with CrawlbaseClient(profile=build_profile()) as second:
+        assert second._client is shared
+    assert not shared.is_closed
+    assert pool.get_client(2) is not shared
+
+    pool.close()
+    assert shared.is_closed
+    assert not pool.started
+
+
+def test_client_retries_retryable_status_codes() -> None:
+    statuses = iter([503, 520, 200])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(next(statuses), json={"body": "<html></html>"})
+
+    http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    policy = RetryPolicy(max_attempts=3, base_delay=0)
+    with CrawlbaseClient(profile=build_profile(99), http_client=http_client, retry_policy=policy) as client:
+        result = scrape_url(client, "https://example.com")
+
+    assert result["success"] is True
+    assert result["attempts"] == 3
+    assert result["latency_ms"] >= 0
+
+
+def test_client_gives_up_after_max_attempts_on_network_errors() -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        raise httpx.ConnectError("connection refused", request=request)
+
+    http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    policy = RetryPolicy(max_attempts=2, base_delay=0)
+    with CrawlbaseClient(profile=build_profile(99), http_client=http_client, retry_policy=policy) as client:
+        with pytest.raises(CrawlbaseTransportError) as excinfo:
+            client.get("/", params={"url": "https://example.com"})
+        result = scrape_url(client, "https://example.com")
+
+    assert excinfo.value.attempts == 2
+    assert len(calls) == 4
+    assert result["success"] is False
+    assert result["attempts"] == 2
+
+
+def test_retry_policy_respects_total_budget() -> None:
+    policy = RetryPolicy(max_attempts=5, base_delay=1, total_timeout=2)
+
+    assert policy.next_delay(1, elapsed=0.0, retry_after=1.5) == 1.5
+    assert policy.next_delay(2, elapsed=1.0, retry_after=1.5) is None
+    assert policy.attempt_timeout_for(30.0, elapsed=1.5) == 0.5
+    assert policy.next_delay(5, elapsed=0.0) is None
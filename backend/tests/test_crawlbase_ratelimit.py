@@ -0,0 +1,199 @@
+import asyncio
+import threading
+from datetime import datetime
+
+import httpx
+
+from app.crawlbase.client import CrawlbaseClient
+from app.crawlbase.ratelimit import ConcurrencyGovernor, RateLimiterRegistry, TokenBucket
+from app.crawlbase.retry import NO_RETRY
+from app.profiles.schemas import ProfileReadSchema, ProfileTokensSchema
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def build_profile(metadata: dict | None = None) -> ProfileReadSchema:
+    return ProfileReadSchema(
+        id=7,
+        name="Perfil Demo",
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+        tokens=ProfileTokensSchema(normal="normal-token", javascript="js-token"),
+        metadata=metadata,
+    )
+
+
+def test_token_bucket_allows_burst_then_paces() -> None:
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0.5
+    assert bucket.metrics.waits == 1
+    assert bucket.metrics.wait_seconds == 0.5
+
+
+def test_token_bucket_backs_off_on_throttling_and_recovers() -> None:
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=1, clock=clock, sleep=clock.sleep)
+
+    bucket.observe(429, retry_after=3)
+    assert bucket.rate == 5
+    assert bucket.metrics.throttled == 1
+    assert bucket.acquire() == 3
+
+    for _ in range(10):
+        bucket.observe(200)
+    assert bucket.rate == 10
+
+
+def test_registry_keys_by_profile_and_token_type(monkeypatch) -> None:
+    registry = RateLimiterRegistry()
+    monkeypatch.setattr("app.crawlbase.client.rate_limiters", registry)
+    profile = build_profile(metadata={"rate_limits": {"javascript": {"rps": 1, "burst": 3}}})
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status_code = 429 if request.url.params["token"] == "js-token" else 200
+        return httpx.Response(status_code, json={})
+
+    http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    with CrawlbaseClient(profile=profile, http_client=http_client, retry_policy=NO_RETRY) as client:
+        client.get("/", params={"url": "https://example.com"})
+        client.get("/", params={"url": "https://example.com"}, token="js-token")
+
+    snapshot = {item["token_type"]: item for item in registry.snapshot(profile_id=7)}
+    assert snapshot["normal"]["acquired"] == 1
+    assert snapshot["normal"]["throttled"] == 0
+    assert snapshot["javascript"]["burst"] == 3
+    assert snapshot["javascript"]["throttled"] == 1
+    assert snapshot["javascript"]["rate"] == 0.5
+
+
+def test_governor_returns_permit_of_cancelled_async_waiter() -> None:
+    governor = ConcurrencyGovernor(1)
+
+    async def scenario() -> None:
+        async with governor.slot_async():
+            waiter = asyncio.ensure_future(_hold(governor))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        assert governor.in_flight == 0
+        async with governor.slot_async():
+            assert governor.in_flight == 1
+
+    asyncio.run(scenario())
+
+    assert governor.in_flight == 0
+
+
+def test_governor_recovers_permit_cancelled_during_handoff() -> None:
+    governor = ConcurrencyGovernor(1)
+
+    async def scenario() -> None:
+        holder = governor.slot_async()
+        await holder.__aenter__()
+        waiter = asyncio.ensure_future(_hold(governor))
+        await asyncio.sleep(0)
+        # El permiso se cede al waiter y se cancela antes de que llegue a recogerlo
+        await holder.__aexit__(None, None, None)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+
+    assert governor.in_flight == 0
+
+
+def test_governor_hands_permits_between_threads_and_coroutines() -> None:
+    governor = ConcurrencyGovernor(1)
+    released = threading.Event()
+
+    def worker() -> None:
+        with governor.slot():
+            released.wait(1)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+
+    async def scenario() -> int:
+        while governor.in_flight == 0:
+            await asyncio.sleep(0.001)
+        released.set()
+        async with governor.slot_async():
+            return governor.in_flight
+
+    assert asyncio.run(scenario()) == 1
+    thread.join(1)
+    assert governor.in_flight == 0
+
+
+async def _hold(governor: ConcurrencyGovernor) -> None:
+    async with governor.slot_async():
+        await asyncio.sleep(1)
+
+
+def test_governor_records_queue_time_for_threads_and_coroutines() -> None:
+    clock = FakeClock()
+    governor = ConcurrencyGovernor(1, clock=clock)
+    holding = threading.Event()
+    release = threading.Event()
+
+    def holder() -> None:
+        with governor.slot():
+            holding.set()
+            release.wait(1)
+            clock.now += 2
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    holding.wait(1)
+
+    async def acquire() -> None:
+        async with governor.slot_async():
+            pass
+
+    async def scenario() -> None:
+        waiter = asyncio.ensure_future(acquire())
+        await asyncio.sleep(0)
+        release.set()
+        await waiter
+
+    asyncio.run(scenario())
+    thread.join(1)
+
+    assert governor.metrics.waits == 1
+    assert governor.metrics.wait_seconds == 2
+
+
+def test_registry_applies_edited_profile_limits() -> None:
+    registry = RateLimiterRegistry()
+    limiter = registry.for_profile(build_profile(metadata={"max_in_flight": 1, "rate_limits": {"normal": {"rps": 5}}}))
+    with limiter.governor.slot():
+        edited = registry.for_profile(
+            build_profile(metadata={"max_in_flight": 3, "rate_limits": {"normal": {"rps": 2, "burst": 4}}})
+        )
+        assert edited.governor is limiter.governor
+        assert edited.governor.max_in_flight == 3
+        assert edited.governor.in_flight == 1
+
+    snapshot = registry.snapshot(profile_id=7)[0]
+    assert (snapshot["base_rate"], snapshot["rate"], snapshot["burst"]) == (2.0, 2.0, 4)
+    assert (snapshot["max_in_flight"], snapshot["in_flight"], snapshot["queue_waits"]) == (3, 0, 0)
+
+    registry.for_profile(build_profile(metadata={"max_in_flight": 1}))
+    assert limiter.governor.max_in_flight == 1
+    assert limiter.governor.in_flight == 0
@@ -1,4 +1,9 @@
-from app.analytics.service import UsageSnapshotCache
+import asyncio
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.analytics.backends import RedisSnapshotBackend, SQLiteSnapshotBackend
+from app.analytics.service import SingleFlight, UsageSnapshotCache
 
 
 def test_usage_cache_returns_independent_copies(monkeypatch) -> None:
@@ -36,3 +41,195 @@ def test_usage_cache_expires_entries(monkeypatch) -> None:
     tick["value"] = 3.0
     assert cache.get(("profile", 1)) is None
 
+
+
+def test_usage_cache_shares_snapshot_without_copying() -> None:
+    cache = UsageSnapshotCache(ttl=10)
+    stored = cache.set(("profile", 1), {"value": "año"})
+
+    assert cache.get_snapshot(("profile", 1)) is stored
+    assert stored.body == '{"value":"año"}'.encode("utf-8")
+    assert cache.stats()["hits"] == 1
+
+
+def test_usage_cache_evicts_least_recently_used(monkeypatch) -> None:
+    monkeypatch.setattr("app.analytics.service.monotonic", lambda: 0.0)
+
+    cache = UsageSnapshotCache(ttl=10, max_entries=2)
+    cache.set(("profile", 1), {"value": 1})
+    cache.set(("profile", 2), {"value": 2})
+    cache.get_snapshot(("profile", 1))
+    cache.set(("profile", 3), {"value": 3})
+
+    assert cache.get(("profile", 2)) is None
+    assert cache.get(("profile", 1)) == {"value": 1}
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["misses"] == 1
+
+
+def test_usage_cache_respects_byte_limit() -> None:
+    cache = UsageSnapshotCache(ttl=10, max_bytes=40)
+    cache.set(("profile", 1), {"value": "x" * 10})
+    cache.set(("profile", 2), {"value": "y" * 10})
+    cache.set(("profile", 3), {"value": "z" * 100})
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["bytes"] <= 40
+    assert cache.get(("profile", 2)) == {"value": "y" * 10}
+    assert cache.get(("profile", 3)) is None
+
+
+def test_usage_cache_sweep_removes_expired_entries(monkeypatch) -> None:
+    tick = {"value": 0.0}
+    monkeypatch.setattr("app.analytics.service.monotonic", lambda: tick["value"])
+
+    cache = UsageSnapshotCache(ttl=2)
+    cache.set(("profile", 1), {"value": 1})
+    tick["value"] = 1.0
+    cache.set(("profile", 2), {"value": 2})
+
+    tick["value"] = 2.5
+    assert cache.sweep() == 1
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["expirations"] == 1
+
+
+def test_usage_cache_serves_stale_entries_only_when_allowed(monkeypatch) -> None:
+    tick = {"value": 0.0}
+    monkeypatch.setattr("app.analytics.service.monotonic", lambda: tick["value"])
+
+    cache = UsageSnapshotCache(ttl=2, stale_ttl=5)
+    cache.set(("profile", 1), {"value": 1})
+
+    tick["value"] = 3.0
+    assert cache.get_snapshot(("profile", 1)) is None
+    stale = cache.get_snapshot(("profile", 1), allow_stale=True)
+    assert stale is not None
+    assert not cache.is_fresh(stale)
+    assert cache.stats()["stale_hits"] == 1
+
+    tick["value"] = 8.0
+    assert cache.get_snapshot(("profile", 1), allow_stale=True) is None
+
+
+def test_single_flight_coalesces_concurrent_calls() -> None:
+    calls = []
+
+    async def fetch() -> dict:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": len(calls)}
+
+    async def scenario() -> list:
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.run(("profile", 1), fetch) for _ in range(5)))
+        assert not flight.in_flight(("profile", 1))
+        results.append(await flight.run(("profile", 1), fetch))
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert results[:5] == [{"value": 1}] * 5
+    assert results[5] == {"value": 2}
+    assert len(calls) == 2
+
+
+def test_single_flight_refresh_runs_in_background_once() -> None:
+    calls = []
+
+    async def fetch() -> None:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+
+    async def scenario() -> None:
+        flight = SingleFlight()
+        flight.refresh("key", fetch)
+        flight.refresh("key", fetch)
+        assert flight.in_flight("key")
+        await flight.run("key", fetch)
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 1
+
+
+def test_sqlite_backend_shares_snapshots_between_caches(tmp_path) -> None:
+    path = tmp_path / "dashboard.sqlite"
+    worker_a = UsageSnapshotCache(ttl=60, backend=SQLiteSnapshotBackend(path))
+    worker_b = UsageSnapshotCache(ttl=60, backend=SQLiteSnapshotBackend(path))
+
+    worker_a.set(("profile", 1, False), {"value": 42, "headers": {"x": "1"}})
+
+    assert worker_b.get(("profile", 1, False)) == {"value": 42, "headers": {"x": "1"}}
+    assert worker_b.stats()["backend_hits"] == 1
+    assert worker_b.stats()["entries"] == 1
+
+    worker_b.clear()
+    assert worker_a.backend.get('["profile",1,false]') is None
+
+
+def test_sqlite_backend_enforces_ttl(tmp_path) -> None:
+    tick = {"value": 100.0}
+    backend = SQLiteSnapshotBackend(tmp_path / "dashboard.sqlite", clock=lambda: tick["value"])
+    backend.set("a", b"{}", stored_at=100.0, ttl=5)
+    backend.set("b", b"{}", stored_at=100.0, ttl=50)
+
+    assert backend.get("a") == (b"{}", 100.0)
+    tick["value"] = 106.0
+    assert backend.get("a") is None
+    tick["value"] = 200.0
+    assert backend.purge() == 1
+
+
+def test_redis_backend_degrades_when_unreachable() -> None:
+    backend = RedisSnapshotBackend("redis://127.0.0.1:1/0")
+    cache = UsageSnapshotCache(ttl=60, backend=backend)
+
+    cache.set(("profile", 1), {"value": 1})
+
+    assert cache.get(("profile", 1)) == {"value": 1}
+    assert backend.get("missing") is None
+
+
+class FailingRedisClient:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def get(self, key: str) -> bytes:
+        self.calls += 1
+        raise RedisConnectionError("sin conexión")
+
+    def set(self, key: str, value: bytes, px: int) -> None:
+        self.calls += 1
+        raise RedisConnectionError("sin conexión")
+
+
+def test_redis_backend_backs_off_after_an_error(monkeypatch) -> None:
+    tick = {"value": 0.0}
+    monkeypatch.setattr("app.analytics.backends.monotonic", lambda: tick["value"])
+    client = FailingRedisClient()
+    cache = UsageSnapshotCache(ttl=60, backend=RedisSnapshotBackend("redis://unused", client=client, backoff=10))
+
+    cache.set(("profile", 1), {"value": 1})
+    assert cache.get(("profile", 2)) is None
+    assert client.calls == 1
+    assert cache.stats()["backend_available"] is False
+
+    tick["value"] = 11.0
+    assert cache.get(("profile", 2)) is None
+    assert client.calls == 2
+
+
+def test_sqlite_backend_errors_degrade_to_memory(tmp_path) -> None:
+    backend = SQLiteSnapshotBackend(tmp_path / "dashboard.sqlite")
+    cache = UsageSnapshotCache(ttl=60, backend=backend)
+    backend.close()
+
+    cache.set(("profile", 1), {"value": 1})
+
+    assert cache.get(("profile", 1)) == {"value": 1}
+    assert cache.get(("profile", 2)) is None
+    assert not backend.available
@@ -1,4 +1,10 @@
-from app.link_factory.service import generate_links
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.link_factory.router import router as link_factory_router
+from app.link_factory.service import export_links, generate_links
 
 
 def test_generate_links_walmart_custom_values() -> None:
@@ -15,3 +21,88 @@ def test_generate_links_walmart_custom_values() -> None:
     assert len(links) == 2
     assert all("nintendo%20switch" in link or "nintendo switch" in link for link in links)
 
+
+
+def test_generate_links_is_lazy_with_exact_total() -> None:
+    keywords = [f"kw{index}" for index in range(1000)]
+    _, links = generate_links("amazon-serp", overrides={"keyword": keywords + ["kw0"], "page": [str(n) for n in range(1, 1001)]})
+
+    assert len(links) == 1_000_000
+    assert links.unique
+    assert links.preview(2) == ["https://www.amazon.com/s?k=kw0&page=1", "https://www.amazon.com/s?k=kw0&page=2"]
+
+
+def test_generate_links_dedups_only_ambiguous_patterns() -> None:
+    # El separador "--" aparece dentro de un valor, así que dos combinaciones dan el mismo enlace
+    _, links = generate_links(
+        "eventbrite-events-list",
+        overrides={"country_code": ["us", "us--new"], "city": ["new--york", "york"], "topic": ["ai"], "page": ["1"]},
+    )
+
+    assert not links.unique
+    assert len(links) == 3
+    assert len(list(links)) == 3
+
+
+def test_generate_links_detects_separator_overlapping_values() -> None:
+    # "us-" + "--" + "x" y "us" + "--" + "-x" producen el mismo "us---x"
+    _, links = generate_links(
+        "eventbrite-events-list",
+        overrides={"country_code": ["us-", "us"], "city": ["-x", "x"], "topic": ["ai"], "page": ["1"]},
+    )
+
+    assert not links.unique
+    assert len(links) == 3
+    assert len(set(links)) == len(list(links)) == 3
+
+
+def test_export_links_streams_same_content() -> None:
+    _, links = generate_links("instagram-hashtag")
+
+    _, content, _ = export_links(links, "json")
+    assert json.loads(content) == {"links": list(links)}
+    _, content, _ = export_links(links, "csv")
+    assert content.decode("utf-8").splitlines() == ["url", *links]
+    _, content, _ = export_links(links, "xlsx")
+    assert content[:2] == b"PK"
+
+
+def test_export_endpoint_streams_gzip_jsonl() -> None:
+    app = FastAPI()
+    app.include_router(link_factory_router)
+    client = TestClient(app)
+
+    response = client.post(
+        "/link-factory/export",
+        params={"preset_id": "walmart-serp", "export_format": "jsonl", "gzip": "true"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["x-total-links"] == "8"
+    # httpx descomprime según Content-Encoding
+    lines = response.text.splitlines()
+    assert len(lines) == 8
+    assert json.loads(lines[0])["url"].startswith("https://www.walmart.com/search?q=laptop")
+
+
+def test_partitions_cover_combinations_without_overlap() -> None:
+    overrides = {"country_code": ["us", "mx", "ca"], "city": ["a", "b"], "topic": ["ai", "ml"], "page": ["1", "2", "3"]}
+    _, links = generate_links("eventbrite-events-list", overrides=overrides)
+    everything = list(links)
+
+    parts = [list(generate_links("eventbrite-events-list", overrides=overrides, shard=(index, 5))[1]) for index in range(5)]
+
+    assert [link for part in parts for link in part] == everything
+    assert links.link_at(17) == everything[17]
+    assert list(links.slice(7, 30)) == everything[7:30]
+    assert len(links.partition(4, 5)) == len(parts[4])
+
+
+def test_partitions_of_ambiguous_patterns_split_by_digest() -> None:
+    overrides = {"country_code": ["us", "us--new"], "city": ["new--york", "york", "b"], "topic": ["ai"], "page": ["1"]}
+    _, links = generate_links("eventbrite-events-list", overrides=overrides)
+
+    parts = [list(links.partition(index, 3)) for index in range(3)]
+
+    assert sorted(link for part in parts for link in part) == sorted(links)
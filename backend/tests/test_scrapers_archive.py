@@ -0,0 +1,41 @@
+from app.scrapers.archive import CODEC_ZLIB, ResponseArchive
+
+
+def test_archive_round_trips_bodies_by_canonical_url(tmp_path) -> None:
+    with ResponseArchive(tmp_path / "archive") as archive:
+        archive.put("https://Example.com/a/?b=2&a=1", 200, {"body": "<html>A</html>"}, {"content-type": "text/html"})
+
+        found = archive.get("https://example.com/a?a=1&b=2#top")
+        assert found is not None
+        assert found.data == {"body": "<html>A</html>"}
+        assert found.headers == {"content-type": "text/html"}
+        assert archive.get("https://example.com/missing") is None
+
+
+def test_archive_grows_index_and_rolls_segments(tmp_path) -> None:
+    archive = ResponseArchive(tmp_path / "archive", segment_max_bytes=200, initial_capacity=8)
+    archive.codec = CODEC_ZLIB
+    urls = [f"https://example.com/{index}" for index in range(40)]
+    for url in urls:
+        archive.put(url, 200, {"body": f"<html>{url}</html>"})
+    archive.put(urls[0], 200, {"body": "<html>nuevo</html>"})
+    archive.close()
+
+    reopened = ResponseArchive(tmp_path / "archive")
+    stats = reopened.stats()
+    assert stats["entries"] == 40
+    assert stats["capacity"] >= 64
+    assert stats["segments"] > 1
+    assert reopened.get(urls[0]).data == {"body": "<html>nuevo</html>"}
+    assert [response.url for response in reopened.iter_responses()] == urls[1:] + urls[:1]
+
+
+def test_archive_reads_without_pread(tmp_path, monkeypatch) -> None:
+    # Windows no tiene ``os.pread``
+    monkeypatch.delattr("os.pread", raising=False)
+    with ResponseArchive(tmp_path / "archive") as archive:
+        archive.put("https://example.com/a", 200, {"body": "<html>A</html>"})
+        archive.put("https://example.com/b", 200, {"body": "<html>B</html>"})
+
+        assert archive.get("https://example.com/b").data == {"body": "<html>B</html>"}
+        assert [response.url for response in archive.iter_responses()] == ["https://example.com/a", "https://example.com/b"]
@@ -0,0 +1,79 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from pyarrow import ipc  # noqa: E402
+
+from app.link_factory.service import export_links  # noqa: E402
+from app.scrapers.columnar import ColumnarWriter  # noqa: E402
+
+
+def test_parquet_writer_flushes_row_groups_with_dictionary_columns(tmp_path) -> None:
+    writer = ColumnarWriter(tmp_path / "out.parquet", "Hoja", batch_size=2)
+    for index in range(5):
+        writer.write_row({
+            "url": f"https://a/{index}",
+            "success": True,
+            "status_code": 200,
+            "error": None,
+            "content_type": "text/html",
+        })
+    path, sheet_name = writer.close()
+
+    parquet = pq.ParquetFile(path)
+    assert sheet_name == "Hoja"
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.num_rows == 5
+    assert pa.types.is_dictionary(table.schema.field("status_code").type)
+    assert table.column("status_code").to_pylist() == ["200"] * 5
+    assert table.column("extra").to_pylist() == [None] * 5
+
+
+def test_feather_writer_keeps_types_and_moves_unknown_keys_to_extra(tmp_path) -> None:
+    columns = ["url", "success", "status_code", "error", "price"]
+    writer = ColumnarWriter(tmp_path / "out.arrow", "Hoja", export_format="feather", columns=columns, keep_types=True)
+    writer.write_row({"url": "https://a", "success": True, "status_code": 200, "error": None, "price": 9.5})
+    writer.write_row({"url": "https://b", "success": False, "status_code": 500, "error": "boom", "rank": 3})
+    path, _ = writer.close()
+
+    table = ipc.open_file(path).read_all()
+    assert table.column("price").to_pylist() == [9.5, None]
+    assert table.column("status_code").to_pylist() == [200, 500]
+    assert table.column("extra").to_pylist() == [None, '{"rank": 3}']
+
+
+def test_columnar_writer_without_rows_leaves_valid_file(tmp_path) -> None:
+    path, _ = ColumnarWriter(tmp_path / "empty.parquet", "Hoja").close()
+
+    assert pq.read_table(path).column_names == ["url", "success", "status_code", "error"]
+
+
+def test_export_links_as_parquet() -> None:
+    filename, content, mimetype = export_links(["https://a", "https://b"], "parquet")
+
+    assert filename == "links.parquet"
+    assert mimetype == "application/vnd.apache.parquet"
+    assert pq.read_table(pa.BufferReader(content)).column("url").to_pylist() == ["https://a", "https://b"]
+
+
+
+def test_typed_columns_keep_values_that_do_not_fit_later_batches(tmp_path) -> None:
+    writer = ColumnarWriter(tmp_path / "out.parquet", "Hoja", batch_size=2, keep_types=True)
+    writer.write_row({"url": "https://a", "price": 10, "stock": 1.5})
+    writer.write_row({"url": "https://b", "price": 12, "stock": 2})
+    writer.write_row({"url": "https://c", "price": "19.99", "stock": "3.25"})
+    writer.write_row({"url": "https://d", "price": "N/A", "stock": "agotado"})
+    path, _ = writer.close()
+
+    table = pq.read_table(path)
+    assert pa.types.is_integer(table.schema.field("price").type)
+    assert table.column("price").to_pylist() == [10, 12, None, None]
+    assert table.column("stock").to_pylist() == [1.5, 2.0, 3.25, None]
+    assert table.column("extra").to_pylist() == [
+        None,
+        None,
+        '{"price": "19.99"}',
+        '{"price": "N/A", "stock": "agotado"}',
+    ]
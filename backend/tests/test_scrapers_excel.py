@@ -0,0 +1,83 @@
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from app.scrapers.excel import StreamingExcelWriter, WorkbookAppendWriter
+from app.scrapers.sidecar import SidecarRunWriter, consolidate_workbook, load_manifest, parts_dir_for
+
+
+def read_sheet(path: str, sheet_name: str) -> list[tuple]:
+    return list(load_workbook(path)[sheet_name].iter_rows(values_only=True))
+
+
+def test_streaming_writer_infers_columns_from_full_batch(tmp_path) -> None:
+    writer = StreamingExcelWriter(tmp_path / "out.xlsx", "Hoja", sample_size=10)
+    writer.write_row({"url": "https://a", "success": True, "status_code": 200, "error": None, "page_title": "A"})
+    writer.write_row({"url": "https://b", "success": False, "status_code": 500, "error": "boom"})
+    path, sheet_name = writer.close()
+
+    rows = read_sheet(path, sheet_name)
+    assert rows[0] == ("url", "success", "status_code", "error", "page_title")
+    assert rows[1] == ("https://a", "True", "200", "None", "A")
+    assert rows[2][4] is None
+
+
+def test_streaming_writer_moves_unknown_keys_to_extra_after_sampling(tmp_path) -> None:
+    writer = StreamingExcelWriter(tmp_path / "out.xlsx", "Hoja", sample_size=1)
+    writer.write_row({"url": "https://a", "success": True, "status_code": 200, "error": None})
+    writer.write_row({"url": "https://b", "success": True, "status_code": 200, "error": None, "price": "9.99"})
+    path, sheet_name = writer.close()
+
+    rows = read_sheet(path, sheet_name)
+    assert rows[0][-1] == "extra"
+    assert rows[2][-1] == '{"price": "9.99"}'
+    assert writer.rows_written == 2
+
+
+def test_append_writer_adds_unique_sheet(tmp_path) -> None:
+    path, _ = StreamingExcelWriter(tmp_path / "out.xlsx", "Hoja").close()
+
+    writer = WorkbookAppendWriter(tmp_path / "out.xlsx", "Hoja")
+    writer.write_row({"url": "https://a", "success": True, "status_code": 200, "error": None})
+    _, sheet_name = writer.close()
+
+    assert sheet_name == "Hoja_1"
+    assert load_workbook(path).sheetnames == ["Hoja", "Hoja_1"]
+
+
+def test_sidecar_runs_append_parts_and_consolidate(tmp_path) -> None:
+    base = StreamingExcelWriter(tmp_path / "shared.xlsx", "Historico")
+    base.write_row({"url": "https://old", "success": True, "status_code": 200, "error": None})
+    base.close()
+
+    for name in ("Run", "Run"):
+        writer = SidecarRunWriter(tmp_path / "shared.xlsx", name)
+        writer.write_row({"url": f"https://{name}", "success": True, "status_code": 200, "error": None})
+        excel_path, _ = writer.close()
+        # Se informa el libro lógico: es lo que aceptan /download y /consolidate
+        assert Path(excel_path) == (tmp_path / "shared.xlsx").absolute()
+        assert writer.part_path.parent == parts_dir_for(tmp_path / "shared.xlsx")
+
+    assert not (tmp_path / "shared.xlsx").exists(), "El libro previo se adopta como parte base"
+    consolidated = consolidate_workbook(tmp_path / "shared.xlsx")
+
+    workbook = load_workbook(consolidated)
+    assert workbook.sheetnames == ["Historico", "Run", "Run_1"]
+    assert workbook["Run_1"]["A2"].value == "https://Run"
+    assert consolidate_workbook(tmp_path / "shared.xlsx") == consolidated
+
+
+def test_sidecar_resume_rewrites_the_interrupted_part(tmp_path) -> None:
+    interrupted = SidecarRunWriter(tmp_path / "book.xlsx", "Run", run_id="abc")
+    interrupted.write_row({"url": "https://a", "success": True, "status_code": 200, "error": None})
+    # El proceso muere sin cerrar la parte: queda "writing" en el manifiesto
+
+    resumed = SidecarRunWriter(tmp_path / "book.xlsx", "Run", run_id="abc")
+    assert resumed.part_path == interrupted.part_path
+    for url in ("https://a", "https://b"):
+        resumed.write_row({"url": url, "success": True, "status_code": 200, "error": None})
+    resumed.close()
+
+    manifest = load_manifest(tmp_path / "book.xlsx")
+    assert [(part["status"], part["rows"]) for part in manifest["parts"]] == [("done", 2)]
+    assert load_workbook(consolidate_workbook(tmp_path / "book.xlsx"))["Run"]["A3"].value == "https://b"
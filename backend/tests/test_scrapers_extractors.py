@@ -0,0 +1,51 @@
+import pytest
+
+from app.scrapers.extractors import ExtractionSchema, ExtractionSchemaError, FieldSpec, compile_schema, get_schema
+
+
+def test_amazon_serp_schema_produces_typed_columns() -> None:
+    schema = get_schema("amazon-serp")
+    data = {
+        "body": {
+            "products": [
+                {"name": "Kindle", "price": "$1,299.99", "asin": "B01"},
+                {"name": "Echo", "price": "$49.99", "asin": "B02"},
+            ],
+            "pagination": {"currentPage": "2", "totalPages": 7},
+        }
+    }
+
+    row = schema.apply(data)
+
+    assert row == {
+        "products_count": 2,
+        "first_product": "Kindle",
+        "first_price": 1299.99,
+        "first_asin": "B01",
+        "asins": "B01 | B02",
+        "current_page": 2,
+        "total_pages": 7,
+    }
+    assert schema.params == {"scraper": "amazon-serp"}
+    assert schema.apply({"body": {}})["products_count"] == 0
+
+
+def test_schema_sources_and_validation() -> None:
+    schema = compile_schema(
+        ExtractionSchema(
+            key="demo",
+            description="",
+            fields=(
+                FieldSpec("title", "page_title", source="meta"),
+                FieldSpec("sku", r'data-sku="([^"]+)"', source="html"),
+                FieldSpec("rating", r"(\d+,\d) estrellas", source="html", type="float"),
+            ),
+        )
+    )
+    html = '<title>Producto</title><div data-sku="X-1">4,5 estrellas</div>'
+
+    assert schema.apply({"body": html}) == {"title": "Producto", "sku": "X-1", "rating": 4.5}
+    with pytest.raises(ExtractionSchemaError):
+        compile_schema(ExtractionSchema(key="roto", description="", fields=(FieldSpec("x", "body..[a"),)))
+    with pytest.raises(ExtractionSchemaError):
+        compile_schema(ExtractionSchema(key="roto", description="", fields=(FieldSpec("x", "sin grupo", source="html"),)))
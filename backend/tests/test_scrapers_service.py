@@ -0,0 +1,359 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from openpyxl import load_workbook
+
+from app.crawlbase.client import CrawlbaseResponse
+from app.profiles.schemas import ProfileReadSchema, ProfileTokensSchema
+from app.scrapers import service
+
+
+def build_profile(metadata: dict | None = None) -> ProfileReadSchema:
+    return ProfileReadSchema(
+        id=1,
+        name="Perfil Demo",
+        description=None,
+        is_active=True,
+        default_product="crawling-api",
+        tags=[],
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+        tokens=ProfileTokensSchema(normal="normal-token"),
+        metadata=metadata,
+    )
+
+
+class DummyCrawlbaseClient:
+    def __init__(self, profile: ProfileReadSchema) -> None:
+        self.profile = profile
+        self.in_flight = 0
+        self.max_seen = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "DummyCrawlbaseClient":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        return None
+
+    def get(self, path: str, params: dict | None = None) -> CrawlbaseResponse:
+        url = params["url"]
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_seen = max(self.max_seen, self.in_flight)
+        # Las primeras URLs tardan más para forzar que terminen fuera de orden.
+        time.sleep(0.05 if url.endswith("/0") else 0.01)
+        with self._lock:
+            self.in_flight -= 1
+        if "fail" in url:
+            return CrawlbaseResponse(status_code=500, data={"error": "boom"}, headers={})
+        if "raise" in url:
+            raise RuntimeError("network down")
+        return CrawlbaseResponse(status_code=200, data={"body": "<html></html>"}, headers={})
+
+
+def run_scrape(monkeypatch, tmp_path, urls: list[str], **kwargs) -> tuple[dict, list, DummyCrawlbaseClient]:
+    holder: dict[str, DummyCrawlbaseClient] = {}
+
+    def fake_client(profile: ProfileReadSchema, **kwargs) -> DummyCrawlbaseClient:
+        holder["instance"] = DummyCrawlbaseClient(profile)
+        return holder["instance"]
+
+    monkeypatch.setattr("app.scrapers.service.CrawlbaseClient", fake_client)
+    monkeypatch.setattr("app.scrapers.service.OUTPUT_DIR", tmp_path)
+    result = service.scrape_urls(urls=urls, profile=build_profile(), **kwargs)
+    sheet = load_workbook(result["excel_path"])[result["sheet_name"]]
+    rows = list(sheet.iter_rows(values_only=True))
+    saved = [dict(zip(rows[0], row)) for row in rows[1:]]
+    return result, saved, holder["instance"]
+
+
+def test_scrape_urls_concurrent_preserves_order(monkeypatch, tmp_path) -> None:
+    urls = [f"https://example.com/{i}" for i in range(12)]
+    result, saved, client = run_scrape(monkeypatch, tmp_path, urls, max_concurrency=4)
+
+    assert [row["url"] for row in saved] == urls
+    assert result["successful"] == 12
+    assert 1 < client.max_seen <= 4
+
+
+def test_scrape_urls_keeps_error_accounting(monkeypatch, tmp_path) -> None:
+    urls = ["https://example.com/0", "https://example.com/fail", "https://example.com/raise", "ftp://bad"]
+    result, saved, _ = run_scrape(monkeypatch, tmp_path, urls, max_concurrency=3)
+
+    assert result["total_urls"] == 3
+    assert result["successful"] == 1
+    assert result["failed"] == 2
+    assert [error["url"] for error in result["errors"]] == [
+        "https://example.com/fail",
+        "https://example.com/raise",
+    ]
+
+
+def test_scrape_urls_caps_the_error_sample(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(service.settings, "scraper_summary_max_errors", 2)
+    urls = [f"https://example.com/fail/{i}" for i in range(5)] + ["https://example.com/0"]
+    result, _, _ = run_scrape(monkeypatch, tmp_path, urls, max_concurrency=3)
+
+    assert result["failed"] == 5
+    assert [error["url"] for error in result["errors"]] == urls[:2]
+
+
+def test_resolve_max_concurrency_prefers_request_then_profile() -> None:
+    profile = build_profile(metadata={"max_concurrency": 3})
+
+    assert service._resolve_max_concurrency(profile, 5) == 5
+    assert service._resolve_max_concurrency(profile) == 3
+    assert service._resolve_max_concurrency(profile, 10_000) == service.settings.scraper_max_concurrency_limit
+
+
+def test_resume_run_only_fetches_pending_urls(monkeypatch, tmp_path) -> None:
+    urls = [f"https://example.com/{i}" for i in range(5)]
+    fetched: list[str] = []
+
+    class RecordingClient(DummyCrawlbaseClient):
+        def get(self, path: str, params: dict | None = None) -> CrawlbaseResponse:
+            fetched.append(params["url"])
+            return super().get(path, params)
+
+    monkeypatch.setattr("app.scrapers.service.CrawlbaseClient", lambda profile, **kwargs: RecordingClient(profile))
+    monkeypatch.setattr("app.scrapers.service.OUTPUT_DIR", tmp_path)
+
+    # Simula una corrida que murió tras completar las URLs 0 y 3
+    journal = service.RunJournal.create(
+        tmp_path / "runs",
+        header={
+            "profile_id": 1,
+            "urls": urls,
+            "excel_path": str(tmp_path / "resumed.xlsx"),
+            "sheet_name": "Resultados",
+            "output_mode": "workbook",
+            "max_concurrency": 2,
+            "max_attempts": 1,
+        },
+    )
+    for index in (0, 3):
+        journal.record(index, True, None, {"url": urls[index], "status_code": 200})
+    journal.close()
+    with (tmp_path / "runs" / f"{journal.run_id}.jsonl").open("a", encoding="utf-8") as handle:
+        handle.write('{"type": "url", "i": 4, "ok": tr')
+
+    result = service.resume_run(journal.run_id, build_profile())
+
+    assert sorted(fetched) == [urls[1], urls[2], urls[4]]
+    assert result["successful"] == 5
+    assert result["run_id"] == journal.run_id
+    sheet = load_workbook(result["excel_path"])[result["sheet_name"]]
+    assert [row[0] for row in sheet.iter_rows(min_row=2, values_only=True)] == urls
+    assert service.list_runs()[0]["finished"] is True
+    with pytest.raises(service.RunFinishedError):
+        service.resume_run(journal.run_id, build_profile())
+
+
+def test_prune_runs_applies_count_and_age_limits(tmp_path) -> None:
+    import os
+
+    from app.scrapers.journal import prune_runs
+
+    runs_dir = tmp_path / "runs"
+    now = datetime(2024, 6, 1, 12, 0)
+    for age_days in range(5):
+        journal = service.RunJournal.create(runs_dir, header={"profile_id": 1, "urls": []}, run_id=f"run{age_days}")
+        journal.close()
+        stamp = now.timestamp() - age_days * 86400
+        os.utime(journal.path, (stamp, stamp))
+
+    assert prune_runs(runs_dir, max_runs=4, max_age_days=0, now=now) == 1
+    assert prune_runs(runs_dir, max_runs=0, max_age_days=2, now=now) == 1
+    assert sorted(path.stem for path in runs_dir.glob("*.jsonl")) == ["run0", "run1", "run2"]
+
+
+def test_canonicalize_url_ignores_trivial_differences() -> None:
+    from app.scrapers.urls import canonicalize_url
+
+    assert canonicalize_url("HTTPS://Example.com:443/a/?b=2&a=1#top") == "https://example.com/a?a=1&b=2"
+    assert canonicalize_url("http://example.com") == "http://example.com/"
+    assert canonicalize_url("http://example.com:8080/a") != canonicalize_url("http://example.com/a")
+
+
+def test_scrape_urls_fetches_duplicates_once(monkeypatch, tmp_path) -> None:
+    urls = [
+        "https://example.com/a?x=1&y=2",
+        "https://EXAMPLE.com/a/?y=2&x=1#section",
+        "https://example.com/fail",
+        "https://example.com/a?x=1&y=2",
+        "https://example.com/fail/",
+    ]
+    result, saved, client = run_scrape(monkeypatch, tmp_path, urls, max_concurrency=2)
+
+    assert client.calls == 2
+    assert result["deduplicated"] == 3
+    assert [row["url"] for row in saved] == urls
+    assert result["successful"] == 3
+    assert [error["url"] for error in result["errors"]] == [urls[2], urls[4]]
+
+
+def test_stream_endpoint_emits_ndjson_events(monkeypatch, tmp_path) -> None:
+    import json
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.scrapers.router import get_profile_service, router
+
+    class StubProfileService:
+        def get(self, profile_id: int, include_tokens: bool = False) -> ProfileReadSchema:
+            return build_profile()
+
+    monkeypatch.setattr("app.scrapers.service.CrawlbaseClient", lambda profile, **kwargs: DummyCrawlbaseClient(profile))
+    monkeypatch.setattr("app.scrapers.service.OUTPUT_DIR", tmp_path)
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_profile_service] = StubProfileService
+    api = TestClient(app)
+
+    urls = [f"https://example.com/{i}" for i in range(3)] + ["https://example.com/fail"]
+    response = api.post("/api/scrapers/scrape/stream", json={"urls": urls, "profile_id": 1})
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [event["type"] for event in events] == ["start", "result", "result", "result", "result", "summary"]
+    assert [event["row"]["url"] for event in events[1:-1]] == urls
+    assert events[-2]["progress"] == {"total": 4, "processed": 4, "successful": 3, "failed": 1}
+    assert events[-1]["failed"] == 1
+
+    invalid = api.post("/api/scrapers/scrape/stream?format=sse", json={"urls": ["ftp://bad"], "profile_id": 1})
+    assert invalid.status_code == 400
+
+
+def test_extract_html_metadata_reads_head_and_links_in_one_pass() -> None:
+    body = (
+        '<html><head><TITLE lang="es"> Hola &amp; adiós </TITLE>'
+        '<meta name="Description" content="Resumen"/><meta property="og:image" content="/a.png">'
+        '<link rel="canonical" href="https://example.com/p"></head><body>'
+        "<script>var tpl = '<a href=\"/falso\">';</script><!-- <a href=\"/comentado\"> -->"
+        '<h1>Uno <b>dos</b></h1><h1>Otro</h1>'
+        '<a href="/interno">a</a><A HREF="https://otro.com/x">b</A><a href="#arriba">c</a>'
+        "</body></html>"
+    )
+    row = service._extract_data_from_response({
+        "url": "https://example.com/p",
+        "status_code": 200,
+        "success": True,
+        "data": {"body": body},
+    })
+
+    assert row["page_title"] == "Hola & adiós"
+    assert row["meta_description"] == "Resumen"
+    assert row["canonical_url"] == "https://example.com/p"
+    assert row["og_image"] == "/a.png"
+    assert row["h1"] == "Uno dos"
+    assert row["h1_count"] == 2
+    assert (row["link_count"], row["internal_links"], row["external_links"]) == (2, 1, 1)
+
+
+def test_scrape_urls_with_schema_writes_declared_typed_columns(monkeypatch, tmp_path) -> None:
+    seen_params: list[dict] = []
+
+    class SerpClient(DummyCrawlbaseClient):
+        def get(self, path: str, params: dict | None = None) -> CrawlbaseResponse:
+            seen_params.append(params)
+            body = {"products": [{"name": "Kindle", "price": "$89.99", "asin": "B01"}], "pagination": {"totalPages": 3}}
+            return CrawlbaseResponse(status_code=200, data={"body": body}, headers={})
+
+    monkeypatch.setattr("app.scrapers.service.CrawlbaseClient", lambda profile, **kwargs: SerpClient(profile))
+    monkeypatch.setattr("app.scrapers.service.OUTPUT_DIR", tmp_path)
+    result = service.scrape_urls(["https://www.amazon.com/s?k=kindle"], build_profile(), scraper_key="amazon-serp")
+
+    sheet = load_workbook(result["excel_path"])[result["sheet_name"]]
+    header, row = list(sheet.iter_rows(values_only=True))
+    saved = dict(zip(header, row))
+    assert seen_params[0]["scraper"] == "amazon-serp"
+    assert list(header[:6]) == service.RESULT_COLUMNS
+    assert saved["first_price"] == 89.99
+    assert saved["total_pages"] == 3
+    assert saved["status_code"] == 200
+
+
+def test_scrape_urls_parquet_output_mode(monkeypatch, tmp_path) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr("app.scrapers.service.CrawlbaseClient", lambda profile, **kwargs: DummyCrawlbaseClient(profile))
+    monkeypatch.setattr("app.scrapers.service.OUTPUT_DIR", tmp_path)
+    urls = [f"https://example.com/{i}" for i in range(3)]
+    result = service.scrape_urls(urls=urls, profile=build_profile(), excel_path="run.xlsx", output_mode="parquet")
+
+    assert result["excel_path"].endswith("run.parquet")
+    assert pq.read_table(result["excel_path"]).column("url").to_pylist() == urls
+
+
+def test_extract_archive_reparses_without_scraping(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(service.settings, "scraper_archive_dir", str(tmp_path / "archive"))
+    urls = [f"https://example.com/{i}" for i in range(3)]
+    run_scrape(monkeypatch, tmp_path, urls + ["https://example.com/fail"], archive=True)
+    monkeypatch.setattr("app.scrapers.service.CrawlbaseClient", None)
+
+    result = service.extract_archive(urls=urls + ["https://example.com/fail"], excel_path="again.xlsx")
+    rows = list(load_workbook(result["excel_path"])[result["sheet_name"]].iter_rows(values_only=True))
+
+    assert [row[0] for row in rows[1:]] == urls
+    assert result["errors"] == [{"url": "https://example.com/fail", "error": "URL no archivada"}]
+
+
+def test_scrape_links_streams_generated_urls_and_resumes_from_source(monkeypatch, tmp_path) -> None:
+    fetched: list[str] = []
+
+    class RecordingClient(DummyCrawlbaseClient):
+        def get(self, path: str, params: dict | None = None) -> CrawlbaseResponse:
+            fetched.append(params["url"])
+            return super().get(path, params)
+
+    monkeypatch.setattr("app.scrapers.service.CrawlbaseClient", lambda profile, **kwargs: RecordingClient(profile))
+    monkeypatch.setattr("app.scrapers.service.OUTPUT_DIR", tmp_path)
+    overrides = {"hashtag": ["a", "b", "c"]}
+    expected = [f"https://www.instagram.com/explore/tags/{tag}/" for tag in "abc"]
+
+    result = service.scrape_links("instagram-hashtag", build_profile(), overrides=overrides, max_concurrency=2)
+
+    sheet = load_workbook(result["excel_path"])[result["sheet_name"]]
+    assert [row[0] for row in sheet.iter_rows(min_row=2, values_only=True)] == expected
+    state = service.get_run(result["run_id"])
+    assert "urls" not in state.header
+    assert state.describe()["total_urls"] == 3
+
+    # Una corrida de enlaces interrumpida regenera sus URLs desde el preset al reanudarse
+    journal = service.RunJournal.create(
+        tmp_path / "runs",
+        header={
+            "profile_id": 1,
+            "link_source": {"preset_id": "instagram-hashtag", "overrides": overrides},
+            "total_urls": 3,
+            "excel_path": str(tmp_path / "links.xlsx"),
+            "sheet_name": "Enlaces",
+        },
+    )
+    journal.record(1, True, None, {"url": expected[1], "status_code": 200})
+    journal.close()
+    fetched.clear()
+
+    resumed = service.resume_run(journal.run_id, build_profile())
+
+    assert sorted(fetched) == [expected[0], expected[2]]
+    assert resumed["successful"] == 3
+
+
+def test_scrape_links_shard_writes_its_own_part(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr("app.scrapers.service.CrawlbaseClient", lambda profile, **kwargs: DummyCrawlbaseClient(profile))
+    monkeypatch.setattr("app.scrapers.service.OUTPUT_DIR", tmp_path)
+    overrides = {"hashtag": ["a", "b", "c", "d"]}
+
+    results = [
+        service.scrape_links("instagram-hashtag", build_profile(), overrides=overrides, excel_path="tags.xlsx", shard=(index, 2))
+        for index in range(2)
+    ]
+
+    assert [result["excel_path"].rsplit("/", 1)[-1] for result in results] == ["tags_part1of2.xlsx", "tags_part2of2.xlsx"]
+    assert [result["total_urls"] for result in results] == [2, 2]
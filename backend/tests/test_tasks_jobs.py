@@ -0,0 +1,116 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.tasks.scraping  # noqa: F401  registra el handler real antes de sustituirlo
+from app.scrapers.router import get_profile_service
+from app.scrapers.router import router as scrapers_router
+from app.tasks import jobs
+from app.tasks.jobs import JobStatus, LocalJobBackend, get_job_queue
+from app.tasks.router import router as tasks_router
+
+
+def wait_until_finished(backend: LocalJobBackend, job_id: str, timeout: float = 5.0) -> jobs.Job:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = backend.get(job_id)
+        if job and job.is_finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError("El trabajo no terminó a tiempo")
+
+
+def test_local_backend_reports_progress_and_result(monkeypatch) -> None:
+    release = threading.Event()
+
+    def handler(params, progress):
+        progress({"total": 2, "processed": 1, "successful": 1, "failed": 0})
+        release.wait(timeout=5)
+        return {"excel_path": "/tmp/out.xlsx", "total_urls": 2}
+
+    monkeypatch.setitem(jobs._HANDLERS, "dummy", handler)
+    backend = LocalJobBackend(max_workers=1)
+    job = backend.submit("dummy", {})
+
+    time.sleep(0.05)
+    running = backend.get(job.id)
+    assert running.status == JobStatus.RUNNING
+    assert (running.total, running.processed) == (2, 1)
+
+    release.set()
+    finished = wait_until_finished(backend, job.id)
+    assert finished.status == JobStatus.COMPLETED
+    assert finished.artifact_path == "/tmp/out.xlsx"
+    backend.shutdown()
+
+
+def test_local_backend_records_failures(monkeypatch) -> None:
+    def handler(params, progress):
+        raise ValueError("La lista de URLs está vacía")
+
+    monkeypatch.setitem(jobs._HANDLERS, "dummy", handler)
+    backend = LocalJobBackend(max_workers=1)
+    finished = wait_until_finished(backend, backend.submit("dummy", {}).id)
+
+    assert finished.status == JobStatus.FAILED
+    assert finished.error == "La lista de URLs está vacía"
+    backend.shutdown()
+
+
+def test_submit_scrape_job_returns_immediately(monkeypatch) -> None:
+    received: dict = {}
+
+    def handler(params, progress):
+        received.update(params)
+        return {"excel_path": "/tmp/out.xlsx", "total_urls": 1, "successful": 1, "failed": 0}
+
+    class DummyProfileService:
+        def get(self, profile_id: int, include_tokens: bool = True):  # noqa: FBT002
+            return None
+
+    monkeypatch.setitem(jobs._HANDLERS, "scrape", handler)
+    backend = LocalJobBackend(max_workers=1)
+    app = FastAPI()
+    app.include_router(scrapers_router, prefix="/api")
+    app.include_router(tasks_router, prefix="/api")
+    app.dependency_overrides[get_job_queue] = lambda: backend
+    app.dependency_overrides[get_profile_service] = DummyProfileService
+    api = TestClient(app)
+
+    response = api.post("/api/scrapers/jobs", json={"urls": ["https://example.com"], "profile_id": 1})
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    wait_until_finished(backend, job_id)
+    status_payload = api.get(f"/api/jobs/{job_id}").json()
+    assert status_payload["status"] == "completed"
+    assert status_payload["artifact_path"] == "/tmp/out.xlsx"
+    assert received["urls"] == ["https://example.com"]
+    assert api.get("/api/jobs/unknown").status_code == 404
+    backend.shutdown()
+
+
+def test_celery_backend_returns_none_for_unknown_ids(monkeypatch) -> None:
+    from celery import Celery
+
+    sent: list = []
+
+    class RecordingTask:
+        def apply_async(self, args, kwargs, task_id):
+            sent.append((args, kwargs, task_id))
+
+    monkeypatch.setitem(jobs._HANDLERS, "dummy", lambda params, progress: {})
+    backend = jobs.CeleryJobBackend.__new__(jobs.CeleryJobBackend)
+    backend._app = Celery("tests", broker="memory://", backend="cache+memory://")
+    backend._task = RecordingTask()
+
+    assert backend.get("desconocido") is None
+
+    job = backend.submit("dummy", {"urls": []})
+    queued = backend.get(job.id)
+    assert queued.status == JobStatus.QUEUED
+    assert queued.kind == "dummy"
+    assert queued.created_at == job.created_at
+    assert sent[0][1] == {"created_at": job.created_at.isoformat()}
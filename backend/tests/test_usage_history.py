@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.analytics.history import prune_history, query_history, record_usage
+from app.analytics.models import UsageSample
+from app.analytics.service import build_usage_summary
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine, tables=[UsageSample.__table__])
+    with Session(engine) as session:
+        yield session
+
+
+def summary(success: int, failed: int):
+    return build_usage_summary(
+        {
+            "totalSuccess": success,
+            "totalFailed": failed,
+            "totalDue": success * 0.01,
+            "remainingCredits": 1000 - success,
+            "domainStats": [{"domain": "amazon.com", "success": success, "failed": failed}],
+        },
+        product="crawling-api",
+    )
+
+
+def test_record_usage_keeps_one_row_per_bucket(session) -> None:
+    base = datetime(2024, 5, 1, 10, 5, tzinfo=timezone.utc)
+    record_usage(session, 1, "crawling-api", summary(100, 10), now=base)
+    record_usage(session, 1, "crawling-api", summary(150, 12), now=base + timedelta(minutes=30))
+    record_usage(session, 1, "crawling-api", summary(180, 20), now=base + timedelta(hours=1))
+
+    rows = session.exec(select(UsageSample).where(UsageSample.domain == "")).all()
+    hourly = sorted((row for row in rows if row.resolution == "hour"), key=lambda row: row.bucket)
+    daily = [row for row in rows if row.resolution == "day"]
+
+    assert [(row.bucket.hour, row.success, row.samples) for row in hourly] == [(10, 150, 2), (11, 180, 1)]
+    assert len(daily) == 1
+    assert daily[0].success == 180
+    assert daily[0].samples == 3
+
+
+def test_query_history_returns_deltas_and_domain_series(session) -> None:
+    base = datetime(2024, 5, 30, 0, 0, tzinfo=timezone.utc)
+    record_usage(session, 1, "crawling-api", summary(100, 10), now=base)
+    record_usage(session, 1, "crawling-api", summary(160, 15), now=base + timedelta(days=1))
+    record_usage(session, 1, "crawling-api", summary(20, 1), now=base + timedelta(days=2))
+    record_usage(session, 2, "crawling-api", summary(999, 9), now=base)
+
+    history = query_history(
+        session,
+        profile_id=1,
+        product="crawling-api",
+        resolution="day",
+        start=base,
+        end=base + timedelta(days=3),
+    )
+
+    totals = history["totals"]
+    assert [point["success_delta"] for point in totals] == [0, 60, 20]
+    assert totals[1]["failed_delta"] == 5
+    assert totals[1]["remaining_credits"] == 840
+    assert [point["success"] for point in history["domains"]["amazon.com"]] == [100, 160, 20]
+
+    without_domains = query_history(
+        session, 1, "crawling-api", start=base, end=base + timedelta(days=3), include_domains=False
+    )
+    assert without_domains["domains"] == {}
+
+
+def test_prune_history_applies_retention_per_resolution(session, monkeypatch) -> None:
+    monkeypatch.setattr("app.analytics.history.settings.usage_history_hourly_retention_days", 1)
+    monkeypatch.setattr("app.analytics.history.settings.usage_history_daily_retention_days", 10)
+    now = datetime(2024, 5, 20, 12, 0, tzinfo=timezone.utc)
+    record_usage(session, 1, "crawling-api", summary(10, 1), now=now - timedelta(days=5))
+
+    removed = prune_history(session, now=now)
+    session.commit()
+
+    remaining = session.exec(select(UsageSample)).all()
+    assert removed == 2
+    assert {row.resolution for row in remaining} == {"day"}